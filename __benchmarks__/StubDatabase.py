@@ -0,0 +1,102 @@
+import contextlib
+from datetime import datetime
+from typing import AsyncIterator, Iterable, List, Optional, Sequence, Union
+
+from src.boot.Config import IConfig
+from src.boot.IDatabase import IDatabase, split_rows, written_table
+from src.boot.MemoryDatabase import MemoryRecord
+from src.tools.exceptions import RowNotFound
+
+
+def make_records(columns: Sequence[str], rows: Iterable[tuple]) -> List[MemoryRecord]:
+    """
+    Wrap tuples of values to MemoryRecord objects sharing one columns index
+    :param columns: Columns names
+    :type columns: Sequence[str]
+    :param rows: Tuples of values in columns order
+    :type rows: Iterable[tuple]
+    :return: Records
+    :rtype: List[MemoryRecord]
+    """
+    index = {column: position for position, column in enumerate(columns)}
+    return [MemoryRecord(index, tuple(row)) for row in rows]
+
+
+class StubDatabase(IDatabase):
+    def __init__(self, config: IConfig, records: Sequence[MemoryRecord] = ()) -> None:
+        """
+        In-process IDatabase answering every query with the same records and keeping inserted rows in a list,
+        rows are converted the same way Database does, so benchmarks measure client side costs only
+        :param config: IConfig-like object, not used to connect anywhere
+        :type config: IConfig
+        :param records: Records returned by every fetch
+        :type records: Sequence[MemoryRecord]
+        """
+        super().__init__(config)
+        self.records = list(records)
+        self.inserted: List[tuple] = []
+
+    async def connect(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    async def fetchOne(self, query: str, *args: Union[str, int, bool, datetime], raw: bool = False):
+        with self._observe(query) as event:
+            if not self.records:
+                raise RowNotFound
+            row = self.records[0]
+            if event is not None:
+                event.acquired()
+                event.executed()
+            if not raw:
+                row = tuple(row.items())
+            if event is not None:
+                event.decoded()
+                event.rows = 1
+            return row
+
+    async def fetchMany(self, query: str, *args: Union[str, int, bool, datetime], raw: bool = False):
+        with self._observe(query) as event:
+            rows = self.records
+            if event is not None:
+                event.acquired()
+                event.executed()
+            rows = list(rows) if raw else [tuple(r.items()) for r in rows]
+            if event is not None:
+                event.decoded()
+                event.rows = len(rows)
+            return rows
+
+    async def stream(self, query: str, *args: Union[str, int, bool, datetime], batch_size: int = 100,
+                     batches: bool = False, raw: bool = False) -> AsyncIterator:
+        assert batch_size > 0, 'batch_size must be positive'
+        for start in range(0, len(self.records), batch_size):
+            rows = self.records[start:start + batch_size]
+            decoded = rows if raw else [tuple(r.items()) for r in rows]
+            if batches:
+                yield decoded
+            else:
+                for r in decoded:
+                    yield r
+
+    @contextlib.asynccontextmanager
+    async def transaction(self) -> AsyncIterator[None]:
+        yield
+
+    async def insert(self, query: str, *args: Union[str, int, bool, datetime]) -> None:
+        with self._observe(query):
+            self.inserted.append(args)
+        self._notify_write(written_table(query))
+
+    async def insert_many(self, table: str, rows, columns: Optional[Sequence[str]] = None,
+                          chunk_size: int = 10000) -> None:
+        assert chunk_size > 0, 'chunk_size must be positive'
+        columns, records = split_rows(rows, columns)
+        with self._observe('COPY ' + table) as event:
+            self.inserted.extend(records)
+            if event is not None:
+                event.rows = len(records)
+        if records:
+            self._notify_write(table.rpartition('.')[2])
@@ -0,0 +1,40 @@
+"""
+Compares UserModel hydration from asyncpg.Record against the tuple of (name, value) pairs path.
+Needs database from TestConfig.TEST_CONFIG, run with: python -m __benchmarks__.bench_from_row
+"""
+import asyncio
+import timeit
+
+from __tests__.TestConfig import TestConfig
+from src.boot.Database import Database
+from src.models.UserModel import UserModel
+
+ROW_COUNT = 10000
+REPEAT = 5
+QUERY = "SELECT i AS id, 'user' || i AS username, 'secret' AS password, 'user' || i || '@mail.ru' AS email, " \
+        "true AS active FROM generate_series(1, $1) AS i"
+
+
+async def fetch_records():
+    db = Database(TestConfig())
+    await db.connect()
+    try:
+        return await db.fetchMany(QUERY, ROW_COUNT, raw=True)
+    finally:
+        await db.close()
+
+
+def main() -> None:
+    records = asyncio.run(fetch_records())
+    cases = (
+        ('tuple of pairs', lambda: [UserModel.from_row(tuple(r.items())) for r in records]),
+        ('from_row(record)', lambda: [UserModel.from_row(r) for r in records]),
+        ('from_records', lambda: UserModel.from_records(records)),
+    )
+    for name, case in cases:
+        elapsed = min(timeit.repeat(case, number=1, repeat=REPEAT))
+        print('{:<18} rows={:<6} {:8.4f}s {:10.0f} rows/s'.format(name, ROW_COUNT, elapsed, ROW_COUNT / elapsed))
+
+
+if __name__ == '__main__':
+    main()
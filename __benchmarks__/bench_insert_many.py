@@ -0,0 +1,55 @@
+"""
+Compares Database.insert_many against looping over Database.insert.
+Needs database from TestConfig.TEST_CONFIG, run with: python -m __benchmarks__.bench_insert_many
+"""
+import asyncio
+import time
+
+from __tests__.TestConfig import TestConfig
+from src.boot.Database import Database
+from src.models.UserModel import UserModel
+
+ROW_COUNTS = (100, 1000, 10000)
+
+
+def make_rows(count: int):
+    return [UserModel(id=i, username='user{}'.format(i), password='secret', email='user{}@mail.ru'.format(i)).to_row()
+            for i in range(count)]
+
+
+async def bench_insert_loop(db: Database, rows) -> float:
+    # arguments are built before timing, as insert loop of suite does
+    args = [tuple(value for _, value in row) for row in rows]
+    started = time.perf_counter()
+    for row_args in args:
+        await db.insert('INSERT INTO bench_users(id, username, password, email, active) VALUES($1, $2, $3, $4, $5)',
+                        *row_args)
+    return time.perf_counter() - started
+
+
+async def bench_insert_many(db: Database, rows) -> float:
+    started = time.perf_counter()
+    await db.insert_many('bench_users', rows)
+    return time.perf_counter() - started
+
+
+async def main() -> None:
+    db = Database(TestConfig())
+    await db.connect()
+    try:
+        for count in ROW_COUNTS:
+            rows = make_rows(count)
+            for name, bench in (('insert loop', bench_insert_loop), ('insert_many', bench_insert_many)):
+                await db._pool.execute('CREATE TABLE bench_users(id bigint, username text, password text, '
+                                       'email text, active boolean)')
+                try:
+                    elapsed = await bench(db, rows)
+                finally:
+                    await db._pool.execute('DROP TABLE bench_users')
+                print('{:<12} rows={:<6} {:8.3f}s {:10.0f} rows/s'.format(name, count, elapsed, count / elapsed))
+    finally:
+        await db.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,262 @@
+"""
+Reproducible benchmarks of model (de)serialization and Database hot paths, with JSON results and baseline diff.
+Runs offline against StubDatabase by default, --backend postgres uses database from TestConfig.TEST_CONFIG.
+
+    python -m __benchmarks__.suite --output bench.json
+    python -m __benchmarks__.suite --baseline bench.json --threshold 0.15
+
+Exits with status 1 if some case is slower than baseline by more than threshold.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import sys
+import time
+import timeit
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from __benchmarks__.StubDatabase import StubDatabase, make_records
+from __tests__.TestConfig import TestConfig
+from src.boot.Database import Database, IDatabase
+from src.models.IBaseModel import IBaseModel
+from src.models.UserModel import UserModel
+
+ROW_COUNTS = (100, 1000, 10000)
+QUICK_ROW_COUNTS = (100, 1000)
+WIDTHS = (5, 20, 50)
+FETCH_ONE_CALLS = 1000
+USERS_QUERY = "SELECT i AS id, 'user' || i AS username, 'secret' AS password, 'user' || i || '@mail.ru' AS email, " \
+              "true AS active FROM generate_series(1, $1) AS i"
+
+
+class Case(NamedTuple):
+    name: str
+    rows: int
+    run: Callable[[], object]
+    setup: Optional[Callable[[], object]] = None
+
+
+def make_model(width: int) -> type:
+    """
+    Model with width integer fields f0..fN, sharing UserModel implementation of from_row, to_row and to_dict
+    :param width: Number of fields
+    :type width: int
+    :return: Model class
+    :rtype: type
+    """
+    if width == len(UserModel.field_names()):
+        return UserModel
+    names = ['f{}'.format(i) for i in range(width)]
+    source = 'def __init__(self, {}):\n    {}\n'.format(
+        ', '.join('{}: int = 0'.format(name) for name in names),
+        '\n    '.join('self.{0} = {0}'.format(name) for name in names))
+    namespace: dict = {}
+    exec(source, namespace)
+    return type('Wide{}Model'.format(width), (IBaseModel,), dict(
+        __init__=namespace['__init__'], from_row=classmethod(UserModel.from_row.__func__),
+        to_dict=UserModel.to_dict, to_row=UserModel.to_row))
+
+
+def make_values(model: type, count: int) -> List[tuple]:
+    if model is UserModel:
+        return [(i, 'user{}'.format(i), 'secret', 'user{}@mail.ru'.format(i), True) for i in range(count)]
+    width = len(model.field_names())
+    return [tuple(range(i, i + width)) for i in range(count)]
+
+
+def model_cases(row_counts: Iterable[int]) -> List[Case]:
+    cases = []
+    for width in WIDTHS:
+        model = make_model(width)
+        for count in row_counts:
+            values = make_values(model, count)
+            records = make_records(model.field_names(), values)
+            pairs = [tuple(record.items()) for record in records]
+            models = [model(*row) for row in values]
+            tag = '[w={},n={}]'.format(width, count)
+            cases += [
+                Case('model.from_row' + tag, count, lambda m=model, p=pairs: [m.from_row(row) for row in p]),
+                Case('model.from_record' + tag, count, lambda m=model, r=records: [m.from_record(row) for row in r]),
+                Case('model.from_records' + tag, count, lambda m=model, r=records: m.from_records(r)),
+                Case('model.decoder.decode_many' + tag, count, lambda m=model, r=records: m.decoder().decode_many(r)),
+                Case('model.to_row' + tag, count, lambda ms=models: [m.to_row() for m in ms]),
+                Case('model.to_dict' + tag, count, lambda ms=models: [m.to_dict() for m in ms]),
+            ]
+    return cases
+
+
+def database_cases(db: IDatabase, loop: asyncio.AbstractEventLoop, row_counts: Iterable[int],
+                   prepare: Callable[[int], object]) -> List[Case]:
+    """
+    Cases of Database calls with UserModel rows, prepare(count) is called untimed before every run of case
+    """
+    async def fetch_one() -> None:
+        for _ in range(FETCH_ONE_CALLS):
+            UserModel.from_row(await db.fetchOne(USERS_QUERY, 1))
+
+    async def stream(count: int) -> List[IBaseModel]:
+        return [model async for model in UserModel.stream_from_query(db, USERS_QUERY, count, batch_size=1000)]
+
+    async def insert_loop(rows: List[tuple]) -> None:
+        for row in rows:
+            await db.insert('INSERT INTO bench_users(id, username, password, email, active) '
+                            'VALUES($1, $2, $3, $4, $5)', *row)
+
+    def run(coroutine_factory: Callable[[], object]) -> Callable[[], object]:
+        return lambda: loop.run_until_complete(coroutine_factory())
+
+    cases = [Case('db.fetchOne[x{}]'.format(FETCH_ONE_CALLS), FETCH_ONE_CALLS, run(fetch_one), lambda: prepare(1))]
+    for count in row_counts:
+        values = make_values(UserModel, count)
+        rows = [UserModel(*row).to_row() for row in values]
+        tag = '[n={}]'.format(count)
+        setup = (lambda c=count: prepare(c))
+        cases += [
+            Case('db.fetchMany+from_row' + tag, count, run(
+                lambda c=count: _from_rows(db.fetchMany(USERS_QUERY, c))), setup),
+            Case('db.fetchMany(raw)+from_records' + tag, count, run(
+                lambda c=count: _from_records(db.fetchMany(USERS_QUERY, c, raw=True))), setup),
+            Case('db.stream+from_records' + tag, count, run(lambda c=count: stream(c)), setup),
+            Case('db.insert' + tag, count, run(lambda v=values: insert_loop(v)), setup),
+            Case('db.insert_many' + tag, count, run(lambda r=rows: db.insert_many('bench_users', r)), setup),
+        ]
+    return cases
+
+
+async def _from_rows(fetch) -> List[IBaseModel]:
+    return [UserModel.from_row(row) for row in await fetch]
+
+
+async def _from_records(fetch) -> List[IBaseModel]:
+    return UserModel.from_records(await fetch)
+
+
+def measure(case: Case, repeat: int) -> dict:
+    """
+    Best and median of repeat runs, after one untimed warm-up run, setup is called untimed before every run
+    :param case: Benchmark case
+    :type case: Case
+    :param repeat: Number of timed runs
+    :type repeat: int
+    :return: dict with rows, min, median and rows_per_second
+    :rtype: dict
+    """
+    if case.setup is not None:
+        case.setup()
+    case.run()
+    timings = timeit.repeat(case.run, setup=case.setup or 'pass', number=1, repeat=repeat)
+    best = min(timings)
+    return dict(rows=case.rows, min=best, median=statistics.median(timings),
+                rows_per_second=case.rows / best if best else float('inf'))
+
+
+def compare(baseline: Dict[str, dict], current: Dict[str, dict],
+            threshold: float) -> List[Tuple[str, Optional[float], Optional[float], Optional[float], str]]:
+    """
+    Diff of best timings, status is regression or improvement when change is over threshold,
+    new and missing for cases present in one of results only
+    :param baseline: Results of stored run
+    :type baseline: Dict[str, dict]
+    :param current: Results of this run
+    :type current: Dict[str, dict]
+    :param threshold: Relative change treated as noise, 0.15 is 15 percent
+    :type threshold: float
+    :return: (name, baseline min, current min, relative change, status) for every case
+    :rtype: List[Tuple[str, Optional[float], Optional[float], Optional[float], str]]
+    """
+    diff = []
+    for name in list(current) + [name for name in baseline if name not in current]:
+        before = baseline.get(name, {}).get('min')
+        after = current.get(name, {}).get('min')
+        if before is None:
+            diff.append((name, None, after, None, 'new'))
+        elif after is None:
+            diff.append((name, before, None, None, 'missing'))
+        else:
+            change = after / before - 1 if before else 0.0
+            status = 'regression' if change > threshold else 'improvement' if change < -threshold else 'ok'
+            diff.append((name, before, after, change, status))
+    return diff
+
+
+async def connect(backend: str, count: int) -> Tuple[IDatabase, Callable[[int], object]]:
+    if backend == 'stub':
+        db = StubDatabase(TestConfig(), make_records(UserModel.field_names(), make_values(UserModel, count)))
+        records = list(db.records)
+
+        def prepare(rows: int) -> None:
+            db.records = records[:rows]
+            db.inserted.clear()
+        return db, prepare
+    db = Database(TestConfig())
+    await db.connect()
+    await db._pool.execute('CREATE TABLE IF NOT EXISTS bench_users(id bigint, username text, password text, '
+                           'email text, active boolean)')
+    loop = asyncio.get_running_loop()
+
+    def truncate(rows: int) -> None:
+        # inserts of every run start from empty table, so timings do not depend on runs order
+        loop.run_until_complete(db._pool.execute('TRUNCATE bench_users'))
+    return db, truncate
+
+
+async def disconnect(db: IDatabase) -> None:
+    if isinstance(db, Database):
+        await db._pool.execute('DROP TABLE IF EXISTS bench_users')
+    await db.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backend', choices=('stub', 'postgres'), default='stub')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--filter', default='', help='run only cases containing this substring')
+    parser.add_argument('--quick', action='store_true', help='skip largest row count')
+    parser.add_argument('--output', help='write JSON results to this file')
+    parser.add_argument('--baseline', help='compare with JSON results from this file')
+    parser.add_argument('--threshold', type=float, default=0.15)
+    args = parser.parse_args(argv)
+    row_counts = QUICK_ROW_COUNTS if args.quick else ROW_COUNTS
+
+    loop = asyncio.new_event_loop()
+    db, prepare = loop.run_until_complete(connect(args.backend, max(row_counts)))
+    results = {}
+    try:
+        for case in model_cases(row_counts) + database_cases(db, loop, row_counts, prepare):
+            if args.filter in case.name:
+                results[case.name] = result = measure(case, args.repeat)
+                print('{:<40} {:10.6f}s {:12.0f} rows/s'.format(case.name, result['min'], result['rows_per_second']))
+    finally:
+        loop.run_until_complete(disconnect(db))
+        loop.close()
+
+    report = dict(meta=dict(backend=args.backend, repeat=args.repeat, python=platform.python_version(),
+                            implementation=platform.python_implementation(), machine=platform.machine(),
+                            created=time.strftime('%Y-%m-%dT%H:%M:%S%z')),
+                  results=results)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2, sort_keys=True)
+    if not args.baseline:
+        return 0
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    if baseline['meta'].get('backend') != args.backend:
+        print('warning: baseline was measured with {} backend'.format(baseline['meta'].get('backend')), file=sys.stderr)
+    stored = {name: result for name, result in baseline['results'].items() if args.filter in name}
+    regressions = 0
+    print()
+    for name, before, after, change, status in compare(stored, results, args.threshold):
+        if change is None:
+            print('{:<40} {:>10} {:>10} {:>8} {}'.format(name, '-' if before is None else '{:.6f}'.format(before),
+                                                          '-' if after is None else '{:.6f}'.format(after), '', status))
+        else:
+            print('{:<40} {:10.6f} {:10.6f} {:+7.1%} {}'.format(name, before, after, change, status))
+        regressions += status == 'regression'
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -5,6 +5,8 @@ class TestConfig(IConfig):
     MOCK_CONFIG = dict(port=1222, db_host='1271', db_port=3211, db_name='SSSSS',
                        db_user='fff',
                        db_password='asdasd')
+    MOCK_DEFAULTS = dict(db_replicas=[], db_min_size=10, db_max_size=10, db_max_queries=50000,
+                         db_max_inactive_lifetime=300.0, db_command_timeout=None, db_statement_cache_size=100)
     TEST_CONFIG = dict(port=8080, db_host='127.0.0.1', db_port=5432, db_name='vas_ostrov_test',
                        db_user='vas_ostrov_user_test',
                        db_password='zxfvsef')
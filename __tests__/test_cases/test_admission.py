@@ -0,0 +1,130 @@
+import asyncio
+import unittest
+
+from __tests__.TestConfig import TestConfig
+from src.boot.Admission import Admission
+from src.boot.Config import Config
+from src.boot.Database import Database
+from src.tools.exceptions import AcquireTimeout, PoolOverloaded
+
+
+class AdmissionTestCase(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def test_lower_lanes_are_admitted_first(self):
+        admission = Admission(1)
+        order = []
+
+        async def call(name, lane):
+            await admission.acquire(lane)
+            order.append(name)
+            await asyncio.sleep(0)
+            admission.release()
+
+        async def main():
+            await admission.acquire()
+            tasks = [asyncio.ensure_future(call(name, lane))
+                     for name, lane in (('bulk1', 1), ('read1', 0), ('bulk2', 1), ('read2', 0))]
+            await asyncio.sleep(0)
+            self.assertEqual(admission.info()['lanes'], [2, 2])
+            admission.release()
+            await asyncio.gather(*tasks)
+
+        self.loop.run_until_complete(main())
+        self.assertEqual(order, ['read1', 'read2', 'bulk1', 'bulk2'])
+        info = admission.info()
+        self.assertEqual((info['active'], info['queued'], info['max_queued'], info['admitted']), (0, 0, 4, 5))
+
+    def test_full_queue_rejects_and_wait_times_out(self):
+        admission = Admission(1, max_queue=1, timeout=0.05)
+
+        async def main():
+            await admission.acquire()
+            waiter = asyncio.ensure_future(admission.acquire())
+            await asyncio.sleep(0)
+            with self.assertRaises(PoolOverloaded):
+                await admission.acquire()
+            with self.assertRaises(AcquireTimeout):
+                await waiter
+            self.assertEqual(admission.queued, 0)
+            admission.release()
+            await admission.acquire()
+            admission.release()
+
+        self.loop.run_until_complete(main())
+        info = admission.info()
+        self.assertEqual((info['rejected'], info['timeouts'], info['active']), (1, 1, 0))
+
+    def test_cancelled_waiter_passes_slot_on(self):
+        admission = Admission(1)
+
+        async def main():
+            await admission.acquire()
+            first = asyncio.ensure_future(admission.acquire())
+            second = asyncio.ensure_future(admission.acquire())
+            await asyncio.sleep(0)
+            admission.release()
+            # slot is handed to first waiter, which is cancelled before it runs
+            first.cancel()
+            await asyncio.gather(first, return_exceptions=True)
+            await asyncio.wait_for(second, 1)
+            admission.release()
+
+        self.loop.run_until_complete(main())
+        self.assertEqual(admission.info()['active'], 0)
+
+    def test_database_sheds_load(self):
+        config = Config(**dict(TestConfig.TEST_CONFIG, db_min_size=1, db_max_size=1))
+        db = Database(config, max_queue=1, acquire_timeout=0.1)
+        self.loop.run_until_complete(db.connect())
+
+        async def main():
+            slow = asyncio.ensure_future(db.fetchOne('SELECT pg_sleep(0.5)'))
+            await asyncio.sleep(0.05)
+            queued = asyncio.ensure_future(db.fetchOne('SELECT 1'))
+            await asyncio.sleep(0)
+            self.assertEqual(db.pool_info()[0]['queued'], 1)
+            with self.assertRaises(PoolOverloaded):
+                await db.fetchOne('SELECT 2')
+            with self.assertRaises(AcquireTimeout):
+                await queued
+            await slow
+            return await db.fetchOne('SELECT 3 AS i')
+
+        try:
+            self.assertEqual(self.loop.run_until_complete(main()), (('i', 3),))
+            info = db.admission_info()[0]
+            self.assertEqual((info['name'], info['rejected'], info['timeouts'], info['active'], info['queued']),
+                             ('primary', 1, 1, 0, 0))
+        finally:
+            self.loop.run_until_complete(db.close())
+
+    def test_database_priority(self):
+        config = Config(**dict(TestConfig.TEST_CONFIG, db_min_size=1, db_max_size=1))
+        db = Database(config)
+        self.loop.run_until_complete(db.connect())
+        order = []
+
+        async def read(name, lane=None):
+            if lane is None:
+                await db.fetchOne('SELECT 1')
+            else:
+                with db.priority(lane):
+                    await db.fetchOne('SELECT 1')
+            order.append(name)
+
+        async def main():
+            slow = asyncio.ensure_future(db.fetchOne('SELECT pg_sleep(0.2)'))
+            await asyncio.sleep(0.05)
+            tasks = [asyncio.ensure_future(read('bulk', Database.BULK)), asyncio.ensure_future(read('interactive'))]
+            await asyncio.gather(slow, *tasks)
+
+        try:
+            self.loop.run_until_complete(main())
+            self.assertEqual(order, ['interactive', 'bulk'])
+        finally:
+            self.loop.run_until_complete(db.close())
@@ -0,0 +1,49 @@
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from __benchmarks__ import suite
+from __benchmarks__.StubDatabase import make_records
+
+
+class BenchmarksTestCase(unittest.TestCase):
+    def test_compare(self):
+        baseline = {'a': {'min': 1.0}, 'b': {'min': 1.0}, 'c': {'min': 1.0}, 'gone': {'min': 1.0}}
+        current = {'a': {'min': 1.1}, 'b': {'min': 1.5}, 'c': {'min': 0.5}, 'added': {'min': 1.0}}
+        diff = {name: (change, status) for name, _, _, change, status in suite.compare(baseline, current, 0.15)}
+        self.assertEqual(diff['a'][1], 'ok')
+        self.assertAlmostEqual(diff['b'][0], 0.5)
+        self.assertEqual(diff['b'][1], 'regression')
+        self.assertEqual(diff['c'][1], 'improvement')
+        self.assertEqual(diff['added'], (None, 'new'))
+        self.assertEqual(diff['gone'], (None, 'missing'))
+
+    def test_wide_model(self):
+        model = suite.make_model(20)
+        self.assertEqual(len(model.field_names()), 20)
+        record = make_records(model.field_names(), [tuple(range(20))])[0]
+        instance = model.from_row(record)
+        self.assertEqual(instance.to_row(), tuple(record.items()))
+        self.assertEqual(model.from_row(instance.to_row()).to_dict(), instance.to_dict())
+
+    def test_stub_run_and_baseline(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'bench.json')
+            with redirect_stdout(StringIO()):
+                self.assertEqual(suite.main(['--quick', '--repeat', '1', '--filter', '[n=100]', '--output', output]), 0)
+            with open(output) as file:
+                report = json.load(file)
+            self.assertEqual(report['meta']['backend'], 'stub')
+            self.assertIn('db.insert_many[n=100]', report['results'])
+            self.assertEqual(report['results']['db.fetchMany+from_row[n=100]']['rows'], 100)
+            report['results']['db.insert_many[n=100]']['min'] = 1e-9
+            with open(output, 'w') as file:
+                json.dump(report, file)
+            with redirect_stdout(StringIO()) as printed:
+                code = suite.main(['--quick', '--repeat', '1', '--filter', '[n=100]', '--baseline', output])
+            self.assertEqual(code, 1)
+            self.assertRegex(printed.getvalue(), r'db\.insert_many\[n=100\] .* regression')
+            self.assertNotIn(' new', printed.getvalue())
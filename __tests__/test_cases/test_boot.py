@@ -0,0 +1,86 @@
+import asyncio
+import subprocess
+import sys
+import time
+import unittest
+
+from __tests__.TestConfig import TestConfig
+from src.boot.Boot import Boot
+from src.boot.Database import Database
+from src.boot.MemoryDatabase import MemoryDatabase
+
+
+class BootTestCase(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def test_models_do_not_import_database_driver(self):
+        code = 'import sys, src.models.UserModel, src.models.CachedUserRepository, src.models.UserLoader; ' \
+               'assert "asyncpg" not in sys.modules'
+        subprocess.run([sys.executable, '-c', code], check=True)
+
+    def test_boot_connects_database(self):
+        boot = Boot(TestConfig.from_env)
+
+        async def main():
+            async with boot as db:
+                self.assertTrue(boot.ready.is_set())
+                self.assertIsInstance(db, Database)
+                return await db.fetchOne('SELECT 1 AS i')
+
+        self.assertEqual(self.loop.run_until_complete(main()), (('i', 1),))
+        self.assertFalse(boot.ready.is_set())
+        self.assertIsNone(boot.db)
+        self.assertEqual(set(boot.timings), {'config', 'import src.boot.Database', 'connect', 'total'})
+
+    def test_startup_hooks_run_concurrently(self):
+        async def warm_cache(config):
+            await asyncio.sleep(0.1)
+
+        async def load_templates(config):
+            await asyncio.sleep(0.1)
+
+        boot = Boot(TestConfig.from_env, lambda config: MemoryDatabase(config), [warm_cache, load_templates])
+        started = time.perf_counter()
+        self.loop.run_until_complete(boot.start())
+        self.assertLess(time.perf_counter() - started, 0.19)
+        self.assertEqual(set(boot.timings), {'config', 'connect', 'warm_cache', 'load_templates', 'total'})
+        self.loop.run_until_complete(boot.stop())
+
+    def test_failed_boot_closes_database(self):
+        closed = []
+
+        class ClosingDatabase(MemoryDatabase):
+            async def close(self):
+                closed.append(True)
+
+        async def broken(config):
+            raise RuntimeError('broken')
+
+        boot = Boot(TestConfig.from_env, ClosingDatabase, [broken])
+        self.assertRaises(RuntimeError, self.loop.run_until_complete, boot.start())
+        self.assertEqual(closed, [True])
+        self.assertIsNone(boot.db)
+        self.assertFalse(boot.ready.is_set())
+
+    def test_partially_connected_database_is_closed(self):
+        databases = []
+
+        class PartialDatabase(Database):
+            async def warm_up(self):
+                raise RuntimeError('warm up failed')
+
+        def database_factory(config):
+            databases.append(PartialDatabase(config, warm_up=True))
+            return databases[0]
+
+        boot = Boot(TestConfig.from_env, database_factory)
+        self.assertRaises(RuntimeError, self.loop.run_until_complete, boot.start())
+        self.assertNotIn('connect', boot.timings)
+        self.assertTrue(databases[0]._pool.is_closing())
+        self.assertIsNone(boot.db)
+        # database which never connected can be closed too
+        self.loop.run_until_complete(Database(TestConfig()).close())
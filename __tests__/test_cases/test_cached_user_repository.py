@@ -0,0 +1,113 @@
+import asyncio
+import unittest
+
+from __tests__.TestConfig import TestConfig
+from __tests__.users_table import create_users, drop_users
+from src.boot.Database import Database
+from src.models.CachedUserRepository import CachedUserRepository
+from src.tools.exceptions import RowNotFound
+
+class CachedUserRepositoryTestCase(unittest.TestCase):
+    def setUp(self):
+        self.db = Database(TestConfig())
+        self.loop = asyncio.new_event_loop()
+        self.loop.run_until_complete(self.db.connect())
+        self.loop.run_until_complete(create_users(self.db, 3))
+
+    def tearDown(self):
+        self.loop.run_until_complete(drop_users(self.db))
+        self.loop.run_until_complete(self.db.close())
+        self.loop.close()
+
+    def test_lookups_are_cached_by_every_key(self):
+        repo = CachedUserRepository(self.db)
+        user = self.loop.run_until_complete(repo.get_by_id(1))
+        self.assertEqual(user.username, 'user1')
+        self.assertIs(self.loop.run_until_complete(repo.get_by_id(1)), user)
+        self.assertIs(self.loop.run_until_complete(repo.get_by_username('user1')), user)
+        self.assertIs(self.loop.run_until_complete(repo.get_by_email('user1@kr.ru')), user)
+        info = repo.info()
+        self.assertEqual((info['hits'], info['misses'], info['size']), (3, 1, 3))
+
+    def test_missing_user_is_not_cached(self):
+        repo = CachedUserRepository(self.db)
+        self.assertRaises(RowNotFound, self.loop.run_until_complete, future=repo.get_by_id(10))
+        self.assertEqual(repo.info()['size'], 0)
+
+    def test_insert_invalidates_cache(self):
+        repo = CachedUserRepository(self.db)
+        self.loop.run_until_complete(repo.get_by_id(1))
+        self.loop.run_until_complete(self.db.insert("INSERT INTO users VALUES(5, 'user5', '', 'user5@kr.ru', true)"))
+        self.assertEqual(repo.info()['size'], 0)
+        self.assertEqual(repo.info()['invalidations'], 1)
+        repo.close()
+        self.loop.run_until_complete(repo.get_by_id(1))
+        self.loop.run_until_complete(self.db.insert_many('users', [(6, 'user6', '', 'user6@kr.ru', True)]))
+        self.assertEqual(repo.info()['size'], 3)
+
+    def test_only_writes_to_model_table_invalidate_cache(self):
+        self.loop.run_until_complete(self.db.insert('CREATE TABLE other_users(id int)'))
+        repo = CachedUserRepository(self.db)
+        try:
+            self.loop.run_until_complete(repo.get_by_id(1))
+            self.loop.run_until_complete(self.db.insert('INSERT INTO other_users VALUES(1)'))
+            self.loop.run_until_complete(self.db.insert_many('Other_Users', [(2,)]))
+            self.assertEqual(repo.info()['invalidations'], 0)
+            self.assertEqual(repo.info()['size'], 3)
+            self.loop.run_until_complete(self.db.insert('UPDATE PUBLIC.USERS SET active = false WHERE id = 2'))
+            self.assertEqual(repo.info()['invalidations'], 1)
+            self.assertEqual(repo.info()['size'], 0)
+        finally:
+            self.loop.run_until_complete(self.db.insert('DROP TABLE other_users'))
+        repo.close()
+
+    def test_rolled_back_rows_are_not_cached(self):
+        repo = CachedUserRepository(self.db)
+
+        async def rolled_back():
+            async with self.db.transaction():
+                await self.db.insert("INSERT INTO users VALUES(5, 'user5', '', 'user5@kr.ru', true)")
+                self.assertEqual((await repo.get_by_id(5)).username, 'user5')
+                raise ValueError
+
+        self.assertRaises(ValueError, self.loop.run_until_complete, rolled_back())
+        self.assertEqual(repo.info()['size'], 0)
+        self.assertEqual(repo.info()['invalidations'], 1)
+        self.assertRaises(RowNotFound, self.loop.run_until_complete, future=repo.get_by_id(5))
+        repo.close()
+
+    def test_cached_users_expire(self):
+        now = [0.0]
+        repo = CachedUserRepository(self.db, ttl=10, clock=lambda: now[0])
+        user = self.loop.run_until_complete(repo.get_by_id(1))
+        now[0] = 11
+        self.assertIsNot(self.loop.run_until_complete(repo.get_by_id(1)), user)
+        self.assertEqual(repo.info()['expirations'], 1)
+
+    def test_concurrent_misses_are_coalesced(self):
+        repo = CachedUserRepository(self.db)
+
+        async def lookup():
+            return await asyncio.gather(*(repo.get_by_id(2) for _ in range(5)))
+
+        users = self.loop.run_until_complete(lookup())
+        self.assertTrue(all(user is users[0] for user in users))
+        self.assertEqual(repo.info()['coalesced'], 4)
+        self.assertEqual(repo.info()['misses'], 5)
+
+    def test_cancelled_lookup_does_not_cancel_coalesced(self):
+        repo = CachedUserRepository(self.db)
+
+        async def lookup():
+            leader = asyncio.ensure_future(repo.get_by_id(2))
+            await asyncio.sleep(0)
+            waiter = asyncio.ensure_future(repo.get_by_id(2))
+            await asyncio.sleep(0)
+            leader.cancel()
+            return await asyncio.gather(leader, waiter, return_exceptions=True)
+
+        cancelled, user = self.loop.run_until_complete(lookup())
+        self.assertIsInstance(cancelled, asyncio.CancelledError)
+        self.assertEqual(user.id, 2)
+        self.assertEqual(repo.info()['coalesced'], 1)
+        self.assertIs(self.loop.run_until_complete(repo.get_by_id(2)), user)
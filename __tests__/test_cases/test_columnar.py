@@ -0,0 +1,85 @@
+import asyncio
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from __tests__.TestConfig import TestConfig
+from src.boot.Database import Database
+from src.boot.MemoryDatabase import MemoryDatabase
+from src.tools.exceptions import WrongTableNameQuery
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+@unittest.skipIf(numpy is None, 'numpy is not installed')
+class ColumnarTestCase(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def test_database_columns_have_native_dtypes(self):
+        db = Database(TestConfig())
+        self.loop.run_until_complete(db.connect())
+        query = "SELECT i AS id, i::float8 / 2 AS half, i % 2 = 0 AS even, 'user' || i AS name, " \
+                "NULLIF(i, 2) AS nullable, '2020-01-01T00:00:00+03'::timestamptz + i * interval '1 hour' AS created " \
+                "FROM generate_series(1, $1) AS i"
+        try:
+            columns = self.loop.run_until_complete(db.fetchColumns(query, 3))
+            self.assertEqual(list(columns), ['id', 'half', 'even', 'name', 'nullable', 'created'])
+            self.assertEqual(columns['id'].dtype, numpy.int32)
+            self.assertEqual(columns['id'].tolist(), [1, 2, 3])
+            self.assertEqual(columns['half'].sum(), 3.0)
+            self.assertEqual(columns['even'].dtype, numpy.bool_)
+            self.assertEqual(columns['even'].tolist(), [False, True, False])
+            self.assertEqual(columns['name'].dtype, object)
+            self.assertEqual(columns['name'].tolist(), ['user1', 'user2', 'user3'])
+            self.assertEqual(columns['nullable'].dtype, numpy.float64)
+            self.assertTrue(numpy.isnan(columns['nullable'][1]))
+            self.assertEqual(columns['created'].dtype, numpy.dtype('datetime64[us]'))
+            self.assertEqual(columns['created'][0], numpy.datetime64('2019-12-31T22:00:00'))
+
+            empty = self.loop.run_until_complete(db.fetchColumns(query, 0))
+            self.assertEqual({name: column.dtype.name for name, column in empty.items()},
+                             dict(id='int32', half='float64', even='bool', name='object', nullable='int32',
+                                  created='datetime64[us]'))
+            self.assertEqual(len(empty['id']), 0)
+            # statement is cached in connection, description is read once
+            self.assertEqual(db.statement_cache_info()['misses'], 1)
+            self.assertEqual(db.statement_cache_info()['hits'], 1)
+            self.assertRaises(WrongTableNameQuery, self.loop.run_until_complete, db.fetchColumns('SELECT * FROM TEST'))
+            self.assertRaises(ValueError, self.loop.run_until_complete, db.fetchColumns('SELECT 1 AS a, 2 AS a'))
+        finally:
+            self.loop.run_until_complete(db.close())
+
+    def test_description_follows_altered_table(self):
+        db = Database(TestConfig())
+        self.loop.run_until_complete(db.connect())
+        try:
+            self.loop.run_until_complete(db.insert('CREATE TABLE TC1(id int)'))
+            self.loop.run_until_complete(db.insert('INSERT INTO TC1 VALUES(1)'))
+            self.assertEqual(list(self.loop.run_until_complete(db.fetchColumns('SELECT * FROM TC1'))), ['id'])
+            self.loop.run_until_complete(db.insert('ALTER TABLE TC1 ADD COLUMN score float8 DEFAULT 0.5'))
+            columns = self.loop.run_until_complete(db.fetchColumns('SELECT * FROM TC1'))
+            self.assertEqual(columns['score'].tolist(), [0.5])
+        finally:
+            self.loop.run_until_complete(db.insert('DROP TABLE IF EXISTS TC1'))
+            self.loop.run_until_complete(db.close())
+
+    def test_dtypes_are_inferred_without_description(self):
+        db = MemoryDatabase(TestConfig())
+        self.loop.run_until_complete(db.execute('CREATE TABLE t(id int, name text, active boolean, score float, '
+                                                'created timestamp)'))
+        created = datetime(2020, 1, 1, tzinfo=timezone(timedelta(hours=3)))
+        self.loop.run_until_complete(db.insert_many('t', [(1, 'a', True, 1.5, created), (2, None, None, 2, None)]))
+        columns = self.loop.run_until_complete(db.fetchColumns('SELECT * FROM t'))
+        self.assertEqual(columns['id'].dtype, numpy.int64)
+        self.assertEqual(columns['name'].tolist(), ['a', None])
+        self.assertEqual(columns['active'].dtype, object)
+        self.assertEqual(columns['score'].tolist(), [1.5, 2.0])
+        self.assertEqual(columns['created'][0], numpy.datetime64('2019-12-31T21:00:00'))
+        self.assertTrue(numpy.isnat(columns['created'][1]))
+        self.assertEqual(self.loop.run_until_complete(db.fetchColumns('SELECT * FROM t WHERE id = 3')), {})
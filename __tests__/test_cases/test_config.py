@@ -13,7 +13,7 @@ class ConfigTestCase(unittest.TestCase):
     def test_config_creation_from_parameters(self):
         conf_params = TestConfig.MOCK_CONFIG
         conf = Config(**conf_params)
-        self.assertDictEqual(conf.__dict__, conf_params)
+        self.assertDictEqual(conf.__dict__, dict(conf_params, **TestConfig.MOCK_DEFAULTS))
 
     def test_config_creation_from_env(self):
         conf_params = TestConfig.MOCK_CONFIG
@@ -24,7 +24,7 @@ class ConfigTestCase(unittest.TestCase):
         conf = Config.from_env()
         assert issubclass(Config, IConfig)
         self.assertIsInstance(conf, IConfig)
-        self.assertDictEqual(conf.__dict__, conf_params)
+        self.assertDictEqual(conf.__dict__, dict(conf_params, **TestConfig.MOCK_DEFAULTS))
 
     def test_wrong_config_from_env(self):
         conf_params = TestConfig.MOCK_CONFIG
@@ -39,6 +39,41 @@ class ConfigTestCase(unittest.TestCase):
             os.environ[key.upper()] = str(param)
         self.assertRaises(AssertionError, Config.from_env)
 
+    def test_config_replicas_from_env(self):
+        for key, param in TestConfig.MOCK_CONFIG.items():
+            os.environ[key.upper()] = str(param)
+        os.environ['DB_REPLICAS'] = 'replica1, replica2:5433'
+        try:
+            conf = Config.from_env()
+            self.assertEqual(conf.db_replicas, [('replica1', 3211), ('replica2', 5433)])
+            os.environ['DB_REPLICAS'] = 'replica1:aaa'
+            self.assertRaises(AssertionError, Config.from_env)
+        finally:
+            del os.environ['DB_REPLICAS']
+
+    def test_config_pool_settings_from_env(self):
+        for key, param in TestConfig.MOCK_CONFIG.items():
+            os.environ[key.upper()] = str(param)
+        settings = dict(DB_MIN_SIZE='2', DB_MAX_SIZE='4', DB_MAX_QUERIES='100', DB_MAX_INACTIVE_LIFETIME='1.5',
+                        DB_COMMAND_TIMEOUT='3', DB_STATEMENT_CACHE_SIZE='0')
+        os.environ.update(settings)
+        try:
+            conf = Config.from_env()
+            self.assertEqual((conf.db_min_size, conf.db_max_size, conf.db_max_queries, conf.db_max_inactive_lifetime,
+                              conf.db_command_timeout, conf.db_statement_cache_size), (2, 4, 100, 1.5, 3.0, 0))
+            for key, value in (('DB_MIN_SIZE', '5'), ('DB_MAX_SIZE', 'ccc'), ('DB_MAX_QUERIES', '0'),
+                               ('DB_COMMAND_TIMEOUT', '-1'), ('DB_STATEMENT_CACHE_SIZE', '1.5')):
+                os.environ[key] = value
+                self.assertRaises(AssertionError, Config.from_env)
+                os.environ[key] = settings[key]
+        finally:
+            for key in settings:
+                del os.environ[key]
+
+    def test_wrong_pool_settings(self):
+        self.assertRaises(AssertionError, Config, db_min_size=11, **TestConfig.MOCK_CONFIG)
+        self.assertRaises(AssertionError, Config, db_command_timeout=0, **TestConfig.MOCK_CONFIG)
+
     def test_can_not_instance_interface(self):
         self.assertRaises(TypeError, IConfig, *TestConfig.MOCK_CONFIG)
         self.assertRaises(NotImplementedError, IConfig.from_env)
@@ -1,12 +1,16 @@
 import asyncio
+import json
 import unittest
 from typing import List, Tuple
 
 import asyncpg
 
-from src.tools.exceptions import RowNotFound, WrongTableNameQuery
+from src.tools.exceptions import RowNotFound, WrongTableNameQuery, NotEnoughData
 from __tests__.TestConfig import TestConfig
-from src.boot.Database import IDatabase, Database
+from src.boot.Config import Config
+from src.boot.Database import IDatabase, Database, split_rows, written_table
+from src.boot.IDatabase import quote_table, update_query, upsert_query
+from src.models.UserModel import UserModel
 
 
 class DatabaseTestCase(unittest.TestCase):
@@ -136,3 +140,369 @@ class DatabaseTestCase(unittest.TestCase):
             loop.run_until_complete(db._pool.execute('DROP TABLE TT3'))
             loop.run_until_complete(db.close())
         loop.close()
+
+    def test_can_fetch_row_with_parameters(self):
+        cfg = TestConfig()
+        db = Database(cfg)
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(db.connect())
+        try:
+            row = loop.run_until_complete(db.fetchOne('SELECT $1::text AS t, $2::int AS i', 'test', 3))
+            self.assertEqual(row, (('t', 'test'), ('i', 3)))
+            rows = loop.run_until_complete(db.fetchMany('SELECT generate_series(1, $1) AS i', 2))
+            self.assertEqual([(('i', 1),), (('i', 2),)], rows)
+        finally:
+            loop.run_until_complete(db.close())
+        loop.close()
+
+    def test_prepared_statements_are_cached(self):
+        cfg = TestConfig()
+        db = Database(cfg, statement_cache_size=1)
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(db.connect())
+        try:
+            for i in range(3):
+                loop.run_until_complete(db.fetchOne('SELECT $1::int AS i', i))
+            self.assertEqual(db.statement_cache_info(), dict(hits=2, misses=1, maxsize=1))
+            loop.run_until_complete(db.fetchOne('SELECT $1::text AS t', 'a'))
+            loop.run_until_complete(db.fetchOne('SELECT $1::int AS i', 1))
+            self.assertEqual(db.statement_cache_info(), dict(hits=2, misses=3, maxsize=1))
+            # parameterized insert takes slot of cache, statement without arguments is not prepared
+            loop.run_until_complete(db.insert('CREATE TABLE TT10(id int)'))
+            loop.run_until_complete(db.insert('INSERT INTO TT10 VALUES($1)', 1))
+            loop.run_until_complete(db.fetchOne('SELECT $1::int AS i', 1))
+            self.assertEqual(db.statement_cache_info(), dict(hits=2, misses=5, maxsize=1))
+        finally:
+            loop.run_until_complete(db.insert('DROP TABLE IF EXISTS TT10'))
+            loop.run_until_complete(db.close())
+        loop.close()
+
+    def test_can_not_insert_many_rows_to_table_which_does_not_exists(self):
+        cfg = TestConfig()
+        db = Database(cfg)
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(db.connect())
+        try:
+            self.assertRaises(WrongTableNameQuery, loop.run_until_complete, future=db.insert_many('tt4', [(1,)]))
+            db.COPY_THRESHOLD = 1
+            self.assertRaises(WrongTableNameQuery, loop.run_until_complete, future=db.insert_many('tt4', [(1,)]))
+        finally:
+            loop.run_until_complete(db.close())
+        loop.close()
+
+    def test_can_insert_many_rows(self):
+        cfg = TestConfig()
+        db = Database(cfg)
+        db.COPY_THRESHOLD = 3
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(db.connect())
+        try:
+            tables = []
+            db.add_write_listener(tables.append)
+            loop.run_until_complete(db._pool.execute('CREATE TABLE TT4(id int, name text);'))
+            # unquoted names are folded to lower case as in SQL
+            loop.run_until_complete(db.insert_many('TT4', [(1, 'a'), (2, 'b')]))
+            loop.run_until_complete(db.insert_many('tt4', [(('name', 'c'), ('id', 3)), (('id', 4), ('name', 'd'))]))
+            loop.run_until_complete(db.insert_many('PUBLIC.TT4', [(i, str(i)) for i in range(5, 12)], chunk_size=4))
+            self.assertRaises(WrongTableNameQuery, loop.run_until_complete,
+                              future=db.insert_many('"TT4"', [(12, 'e')]))
+            self.assertEqual(tables, ['tt4'] * 4)
+            rows: List[Tuple[str, str]] = loop.run_until_complete(db.fetchMany('SELECT id, name FROM TT4 ORDER BY id'))
+            self.assertEqual(len(rows), 11)
+            self.assertEqual(rows[:4], [(('id', 1), ('name', 'a')), (('id', 2), ('name', 'b')),
+                                        (('id', 3), ('name', 'c')), (('id', 4), ('name', 'd'))])
+            self.assertEqual(rows[-1], (('id', 11), ('name', '11')))
+        finally:
+            loop.run_until_complete(db._pool.execute('DROP TABLE TT4'))
+            loop.run_until_complete(db.close())
+        loop.close()
+
+    def test_can_not_insert_many_rows_without_columns(self):
+        self.assertRaises(NotEnoughData, split_rows, rows=[(('id', 1), ('name', 'a')), (('id', 2),)])
+
+    def test_can_stream_rows(self):
+        cfg = TestConfig()
+        db = Database(cfg)
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(db.connect())
+
+        async def collect(**kwargs):
+            return [row async for row in db.stream('SELECT generate_series(1, $1) AS i', 5, **kwargs)]
+
+        try:
+            self.assertEqual(loop.run_until_complete(collect(batch_size=2)), [(('i', i),) for i in range(1, 6)])
+            self.assertEqual(loop.run_until_complete(collect(batch_size=5, batches=True)),
+                             [[(('i', i),) for i in range(1, 6)]])
+            self.assertEqual([len(b) for b in loop.run_until_complete(collect(batch_size=2, batches=True))], [2, 2, 1])
+        finally:
+            loop.run_until_complete(db.close())
+        loop.close()
+
+    def test_can_not_stream_rows_from_table_which_does_not_exists(self):
+        cfg = TestConfig()
+        db = Database(cfg)
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(db.connect())
+
+        async def collect():
+            return [row async for row in db.stream('SELECT * FROM TEST')]
+
+        try:
+            self.assertRaises(WrongTableNameQuery, loop.run_until_complete, future=collect())
+        finally:
+            loop.run_until_complete(db.close())
+        loop.close()
+
+    def test_written_table_from_query(self):
+        self.assertEqual(written_table('INSERT INTO TT3 VALUES($1)'), 'tt3')
+        self.assertEqual(written_table('insert into public."Users"(id) VALUES($1)'), 'Users')
+        self.assertEqual(written_table('UPDATE users SET active = false'), 'users')
+        self.assertIsNone(written_table('SELECT 1'))
+
+    def test_write_listeners_are_notified(self):
+        cfg = TestConfig()
+        db = Database(cfg)
+        tables = []
+        db.add_write_listener(tables.append)
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(db.connect())
+        try:
+            loop.run_until_complete(db._pool.execute('CREATE TABLE TT5(id int);'))
+            loop.run_until_complete(db.insert('INSERT INTO TT5 VALUES($1)', 1))
+            loop.run_until_complete(db.insert_many('tt5', [(2,), (3,)]))
+            db.remove_write_listener(tables.append)
+            loop.run_until_complete(db.insert('INSERT INTO TT5 VALUES($1)', 4))
+            self.assertEqual(tables, ['tt5', 'tt5'])
+        finally:
+            loop.run_until_complete(db._pool.execute('DROP TABLE TT5'))
+            loop.run_until_complete(db.close())
+        loop.close()
+
+    def test_reads_are_sent_to_replicas(self):
+        cfg = Config(**dict(TestConfig.TEST_CONFIG, db_replicas=[('127.0.0.1', 5432), ('localhost', 5432)]))
+        db = Database(cfg)
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(db.connect())
+        try:
+            for _ in range(4):
+                loop.run_until_complete(db.fetchOne('SELECT 1 AS i'))
+            loop.run_until_complete(db.fetchMany('SELECT 1 AS i'))
+            self.assertEqual([replica['reads'] for replica in db.replica_info()], [2, 3])
+            with db.pin_primary():
+                loop.run_until_complete(db.fetchOne('SELECT 1 AS i'))
+            self.assertEqual(sum(replica['reads'] for replica in db.replica_info()), 5)
+        finally:
+            loop.run_until_complete(db.close())
+        loop.close()
+
+    def test_failed_replica_is_ejected(self):
+        cfg = Config(**dict(TestConfig.TEST_CONFIG, db_replicas=[('127.0.0.1', 1)]))
+        db = Database(cfg, replica_policy=Database.LEAST_BUSY)
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(db.connect())
+        try:
+            self.assertEqual(loop.run_until_complete(db.fetchOne('SELECT 1 AS i')), (('i', 1),))
+            self.assertEqual(db.replica_info()[0]['healthy'], False)
+            self.assertEqual(db.replica_info()[0]['ejections'], 1)
+            self.assertEqual(db.replica_info()[0]['reads'], 0)
+        finally:
+            loop.run_until_complete(db.close())
+        loop.close()
+
+    def test_timed_out_read_does_not_eject_replica(self):
+        cfg = Config(**dict(TestConfig.TEST_CONFIG, db_replicas=[('127.0.0.1', 5432)], db_command_timeout=0.1))
+        db = Database(cfg)
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(db.connect())
+        try:
+            self.assertRaises(asyncio.TimeoutError, loop.run_until_complete,
+                              future=db.fetchOne('SELECT pg_sleep(1) AS i'))
+            # slow statement is not repeated on primary
+            self.assertEqual(db.replica_info()[0]['healthy'], True)
+            self.assertEqual(db.replica_info()[0]['ejections'], 0)
+            self.assertEqual(db.replica_info()[0]['reads'], 1)
+        finally:
+            loop.run_until_complete(db.close())
+        loop.close()
+
+    def test_reads_are_pinned_to_primary_after_write(self):
+        cfg = Config(**dict(TestConfig.TEST_CONFIG, db_replicas=[('127.0.0.1', 5432)]))
+        db = Database(cfg, pin_after_write=60)
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(db.connect())
+
+        async def write_and_read():
+            await db.insert('INSERT INTO TT6 VALUES($1)', 1)
+            return await db.fetchMany('SELECT id FROM TT6')
+
+        try:
+            loop.run_until_complete(db._pool.execute('CREATE TABLE TT6(id int);'))
+            self.assertEqual(loop.run_until_complete(write_and_read()), [(('id', 1),)])
+            self.assertEqual(db.replica_info()[0]['reads'], 0)
+            loop.run_until_complete(db.fetchMany('SELECT id FROM TT6'))
+            self.assertEqual(db.replica_info()[0]['reads'], 1)
+        finally:
+            loop.run_until_complete(db._pool.execute('DROP TABLE TT6'))
+            loop.run_until_complete(db.close())
+        loop.close()
+
+    def test_pool_is_configured_and_warmed_up(self):
+        cfg = Config(**dict(TestConfig.TEST_CONFIG, db_min_size=2, db_max_size=3, db_command_timeout=0.5))
+        set_up = []
+
+        async def setup(connection):
+            set_up.append(connection)
+            await connection.set_type_codec('json', encoder=json.dumps, decoder=json.loads, schema='pg_catalog')
+
+        db = Database(cfg, setup=setup, warm_up=True, warm_up_queries=[('SELECT $1::int AS i', (1,))])
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(db.connect())
+        try:
+            self.assertEqual((db._pool.get_min_size(), db._pool.get_max_size(), db._pool.get_size()), (2, 3, 2))
+            self.assertEqual(len(set_up), 2)
+            self.assertEqual(db.statement_cache_info()['misses'], 2)
+            loop.run_until_complete(db.fetchOne('SELECT $1::int AS i', 2))
+            self.assertEqual(db.statement_cache_info()['hits'], 1)
+            row = loop.run_until_complete(db.fetchOne('SELECT $1::json AS j', dict(a=1)))
+            self.assertEqual(row, (('j', dict(a=1)),))
+            self.assertRaises(asyncio.TimeoutError, loop.run_until_complete, future=db.fetchOne('SELECT pg_sleep(1)'))
+        finally:
+            loop.run_until_complete(db.close())
+        loop.close()
+
+    def test_single_statements_run_without_transaction(self):
+        class TracedDatabase(Database):
+            async def _execute(self, connection, query, method, *args):
+                in_transaction.append(connection.is_in_transaction())
+                return await super()._execute(connection, query, method, *args)
+
+        loop = asyncio.new_event_loop()
+        for transactional in (False, True):
+            in_transaction = []
+            db = TracedDatabase(TestConfig(), transactional=transactional)
+            loop.run_until_complete(db.connect())
+            try:
+                loop.run_until_complete(db.fetchOne('SELECT 1 AS i'))
+                loop.run_until_complete(db.fetchMany('SELECT 1 AS i'))
+                self.assertEqual(in_transaction, [transactional] * 2)
+            finally:
+                loop.run_until_complete(db.close())
+        loop.close()
+
+    def test_statements_share_connection_in_transaction(self):
+        cfg = TestConfig()
+        db = Database(cfg)
+        tables = []
+        db.add_write_listener(tables.append)
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(db.connect())
+
+        async def commit():
+            async with db.transaction():
+                await db.insert('INSERT INTO TT7 VALUES($1)', 1)
+                await db.insert_many('tt7', [(2,)])
+                self.assertEqual(tables, [])
+                first = await db.fetchOne('SELECT txid_current() AS t')
+                second = await db.fetchMany('SELECT txid_current() AS t')
+                self.assertEqual([first], second)
+                self.assertEqual(len([row async for row in db.stream('SELECT id FROM TT7')]), 2)
+
+        async def rollback():
+            async with db.transaction():
+                await db.insert('INSERT INTO TT7 VALUES($1)', 3)
+                try:
+                    async with db.transaction():
+                        await db.insert('INSERT INTO TT7 VALUES($1)', 4)
+                        raise ValueError
+                except ValueError:
+                    pass
+                self.assertEqual(len(await db.fetchMany('SELECT id FROM TT7')), 3)
+                raise ValueError
+
+        try:
+            loop.run_until_complete(db._pool.execute('CREATE TABLE TT7(id int);'))
+            loop.run_until_complete(commit())
+            self.assertEqual(tables, ['tt7'])
+            self.assertRaises(ValueError, loop.run_until_complete, future=rollback())
+            rows = loop.run_until_complete(db.fetchMany('SELECT id FROM TT7 ORDER BY id'))
+            self.assertEqual(rows, [(('id', 1),), (('id', 2),)])
+            # tables written by rolled back transaction are reported after rollback
+            self.assertEqual(tables, ['tt7', 'tt7'])
+        finally:
+            loop.run_until_complete(db._pool.execute('DROP TABLE TT7'))
+            loop.run_until_complete(db.close())
+        loop.close()
+
+    def test_upsert_and_update_queries(self):
+        self.assertEqual(upsert_query('public.users', ('id', 'name'), 2, ('id',), ('name',), returning=True),
+                         'INSERT INTO "public"."users" ("id", "name") VALUES ($1, $2), ($3, $4) ON CONFLICT ("id") '
+                         'DO UPDATE SET "name" = EXCLUDED."name" RETURNING *')
+        self.assertEqual(upsert_query('users', ('id',), 1, ('id',), ()),
+                         'INSERT INTO "users" ("id") VALUES ($1) ON CONFLICT ("id") DO NOTHING')
+        self.assertEqual(update_query('users', ('id', 'name'), 2, ('id',), ('integer', None)),
+                         'UPDATE "users" AS "__t" SET "name" = "__v"."name" FROM (VALUES ($1::integer, $2), ($3, $4)) '
+                         'AS "__v"("id", "name") WHERE "__t"."id" = "__v"."id"')
+        self.assertEqual(written_table(update_query('users', ('id', 'name'), 1, ('id',))), 'users')
+        self.assertEqual(quote_table('Public."Users"'), '"public"."Users"')
+        self.assertEqual(quote_table('Public."My ""Users"""'), '"public"."My ""Users"""')
+
+    def test_can_upsert_and_update_many_models(self):
+        db = Database(TestConfig())
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(db.connect())
+        tables = []
+        db.add_write_listener(tables.append)
+
+        def user(i, name, active=True):
+            return UserModel(id=i, username=name, email='{}@kr.ru'.format(name), active=active)
+
+        try:
+            loop.run_until_complete(db._pool.execute('CREATE TABLE TT8(id int PRIMARY KEY, username text, '
+                                                     'password text, email text, active boolean, '
+                                                     'updated timestamptz DEFAULT now());'))
+            self.assertEqual(loop.run_until_complete(db.upsert([user(i, 'u{}'.format(i)) for i in range(5)],
+                                                               table='tt8', chunk_size=2)), [])
+            self.assertEqual(tables, ['tt8'] * 3)
+            # last model with the same key wins
+            written = loop.run_until_complete(db.upsert([user(4, 'x'), user(5, 'y'), user(4, 'z')], table='tt8',
+                                                        returning=True))
+            self.assertEqual([model.to_dict() for model in written], [user(4, 'z').to_dict(), user(5, 'y').to_dict()])
+            written = loop.run_until_complete(db.upsert([user(1, 'kept'), user(6, 'new')], update=(), table='tt8',
+                                                        returning=True))
+            self.assertEqual([model.username for model in written], ['new'])
+
+            updated = loop.run_until_complete(db.update_many([user(0, 'a', False), user(42, 'missing')],
+                                                             table='tt8', returning=True))
+            self.assertEqual([model.to_dict() for model in updated], [user(0, 'a', False).to_dict()])
+            loop.run_until_complete(db.update_many([user(1, 'ignored', False), user(2, 'ignored', False)],
+                                                   columns=('active',), table='tt8'))
+            rows = loop.run_until_complete(db.fetchMany('SELECT * FROM TT8 ORDER BY id', raw=True))
+            self.assertEqual([(row['id'], row['username'], row['active']) for row in rows],
+                             [(0, 'a', False), (1, 'u1', False), (2, 'u2', False), (3, 'u3', True), (4, 'z', True),
+                              (5, 'y', True), (6, 'new', True)])
+            self.assertRaises(NotEnoughData, loop.run_until_complete,
+                              future=db.update_many([user(1, 'a')], columns=('name',), table='tt8'))
+            self.assertRaises(WrongTableNameQuery, loop.run_until_complete,
+                              future=db.update_many([user(1, 'a')], table='missing'))
+        finally:
+            loop.run_until_complete(db._pool.execute('DROP TABLE TT8'))
+            loop.run_until_complete(db.close())
+        loop.close()
+
+    def test_update_many_does_not_truncate_values(self):
+        db = Database(TestConfig())
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(db.connect())
+        try:
+            loop.run_until_complete(db._pool.execute('CREATE TABLE TT9(id int PRIMARY KEY, username varchar(5), '
+                                                     'password text, email text, active boolean);'))
+            loop.run_until_complete(db.upsert([UserModel(id=1, username='short')], table='tt9'))
+            self.assertRaises(asyncpg.StringDataRightTruncationError, loop.run_until_complete,
+                              future=db.update_many([UserModel(id=1, username='too long'),
+                                                     UserModel(id=2, username='other')], table='tt9'))
+            row = loop.run_until_complete(db.fetchOne('SELECT username FROM TT9 WHERE id = 1', raw=True))
+            self.assertEqual(row['username'], 'short')
+        finally:
+            loop.run_until_complete(db._pool.execute('DROP TABLE TT9'))
+            loop.run_until_complete(db.close())
+        loop.close()
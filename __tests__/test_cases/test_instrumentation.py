@@ -0,0 +1,62 @@
+import asyncio
+import unittest
+
+from __tests__.TestConfig import TestConfig
+from src.boot.Database import Database
+from src.boot.Instrumentation import Histogram, Instrumentation, normalize_query
+from src.tools.exceptions import WrongTableNameQuery
+
+
+class InstrumentationTestCase(unittest.TestCase):
+    def test_normalize_query(self):
+        self.assertEqual(normalize_query("SELECT * FROM users\n  WHERE id = 3 AND name = 'it''s' AND x IN (1, 2, 3)"),
+                         'SELECT * FROM users WHERE id = ? AND name = ? AND x IN (...)')
+        self.assertEqual(normalize_query('SELECT * FROM t2 WHERE id = $1'), 'SELECT * FROM t2 WHERE id = $1')
+
+    def test_histogram_percentiles(self):
+        histogram = Histogram()
+        self.assertEqual(histogram.percentile(50), 0.0)
+        for i in range(1, 101):
+            histogram.record(i / 1000)
+        self.assertEqual(histogram.count, 100)
+        self.assertAlmostEqual(histogram.percentile(50), 0.050, delta=0.005)
+        self.assertAlmostEqual(histogram.percentile(99), 0.099, delta=0.009)
+        self.assertEqual(histogram.percentile(100), 0.1)
+        histogram.record(0)
+        histogram.record(10 ** 6)
+        self.assertEqual(histogram.max, 10 ** 6)
+
+    def test_database_queries_are_instrumented(self):
+        db = Database(TestConfig())
+        instrumentation = Instrumentation(slow_query_threshold=0)
+        db.instrument(instrumentation)
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(db.connect())
+
+        async def stream():
+            return [row async for row in db.stream('SELECT generate_series(1, 5) AS i', batch_size=2)]
+
+        try:
+            with self.assertLogs('src.boot.Instrumentation', 'WARNING') as logs:
+                loop.run_until_complete(db.fetchOne('SELECT 1 AS i'))
+                loop.run_until_complete(db.fetchOne('SELECT 2 AS i'))
+                loop.run_until_complete(db.fetchMany('SELECT generate_series(1, $1) AS i', 3))
+                loop.run_until_complete(stream())
+                self.assertRaises(WrongTableNameQuery, loop.run_until_complete, future=db.fetchMany('SELECT * FROM TEST'))
+            self.assertEqual(len(logs.output), 5)
+            report = instrumentation.report(db)
+            self.assertEqual(report['all']['total']['count'], 5)
+            self.assertEqual(report['slow_queries'], 5)
+            select = report['queries']['SELECT ? AS i']
+            self.assertEqual((select['total']['count'], select['rows']), (2, 2))
+            self.assertEqual(report['queries']['SELECT generate_series(?, $1) AS i']['rows'], 3)
+            self.assertEqual(report['queries']['SELECT generate_series(...) AS i']['rows'], 5)
+            self.assertEqual(report['queries']['SELECT * FROM TEST']['errors'], 1)
+            self.assertGreater(select['acquire']['max'], 0)
+            self.assertGreater(select['execute']['max'], 0)
+            self.assertEqual(report['pools'][0]['name'], 'primary')
+            self.assertEqual(report['pools'][0]['busy'], 0)
+            self.assertEqual(report['pools'][0]['saturation'], 0)
+        finally:
+            loop.run_until_complete(db.close())
+        loop.close()
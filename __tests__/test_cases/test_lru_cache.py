@@ -0,0 +1,47 @@
+import unittest
+
+from src.tools.LRUCache import LRUCache
+
+
+class LRUCacheTestCase(unittest.TestCase):
+    def test_can_get_stored_value(self):
+        cache = LRUCache(2)
+        cache.put('a', 1)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.info(), dict(hits=1, misses=1, evictions=0, expirations=0, size=1, maxsize=2))
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')
+        cache.put('c', 3)
+        self.assertIn('a', cache)
+        self.assertNotIn('b', cache)
+        self.assertIn('c', cache)
+        self.assertEqual(cache.evictions, 1)
+
+    def test_zero_size_cache_stores_nothing(self):
+        cache = LRUCache(0)
+        cache.put('a', 1)
+        self.assertEqual(len(cache), 0)
+
+    def test_pop_is_not_eviction(self):
+        cache = LRUCache(2)
+        cache.put('a', 1)
+        self.assertEqual(cache.pop('a'), 1)
+        self.assertEqual(cache.pop('a', 2), 2)
+        self.assertEqual(cache.evictions, 0)
+
+    def test_entries_expire_after_ttl(self):
+        now = [0.0]
+        cache = LRUCache(2, ttl=10, clock=lambda: now[0])
+        cache.put('a', 1)
+        now[0] = 5
+        self.assertEqual(cache.get('a'), 1)
+        now[0] = 10
+        self.assertNotIn('a', cache)
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.expirations, 1)
+        self.assertEqual(len(cache), 0)
@@ -0,0 +1,204 @@
+import asyncio
+import time
+import unittest
+
+import asyncpg
+
+from __tests__.TestConfig import TestConfig
+from __tests__.users_table import CREATE_USERS, create_users
+from src.boot.Database import IDatabase
+from src.boot.Instrumentation import Instrumentation
+from src.boot.MemoryDatabase import MemoryDatabase, MemoryRecord
+from src.models.CachedUserRepository import CachedUserRepository
+from src.models.UserModel import UserModel
+from src.tools.exceptions import RowNotFound, WrongTableNameQuery
+
+class MemoryDatabaseTestCase(unittest.TestCase):
+    def setUp(self):
+        self.db = MemoryDatabase(TestConfig())
+        self.loop = asyncio.new_event_loop()
+        self.loop.run_until_complete(self.db.connect())
+        self.loop.run_until_complete(create_users(self.db, 5, lambda i: i % 2 == 0))
+
+    def tearDown(self):
+        self.loop.run_until_complete(self.db.close())
+        self.loop.close()
+
+    def run_async(self, awaitable):
+        return self.loop.run_until_complete(awaitable)
+
+    def test_is_database(self):
+        self.assertIsInstance(self.db, IDatabase)
+
+    def test_select_where(self):
+        row = self.run_async(self.db.fetchOne('SELECT * FROM users WHERE id = $1', 3))
+        self.assertEqual(row, (('id', 3), ('username', 'user3'), ('password', ''), ('email', 'user3@kr.ru'),
+                               ('active', False)))
+        self.assertEqual(UserModel.from_row(row).to_row(), row)
+        rows = self.run_async(self.db.fetchMany('SELECT id, username AS name FROM users WHERE active = true '
+                                                'AND id > $1 ORDER BY id DESC', 0))
+        self.assertEqual(rows, [(('id', 4), ('name', 'user4')), (('id', 2), ('name', 'user2'))])
+        rows = self.run_async(self.db.fetchMany('SELECT id FROM "users" WHERE id = ANY($1) AND id <> 2 ORDER BY id',
+                                                [1, 2, 3, 42]))
+        self.assertEqual([dict(r)['id'] for r in rows], [1, 3])
+        rows = self.run_async(self.db.fetchMany('SELECT id FROM users WHERE id IN (1, $1) ORDER BY id LIMIT $2 '
+                                                'OFFSET 1', 4, 5))
+        self.assertEqual(rows, [(('id', 4),)])
+        rows = self.run_async(self.db.fetchMany('SELECT id FROM users WHERE ("active", users.id) < ($1, $2) '
+                                                'AND (id > 0) ORDER BY id', True, 4))
+        self.assertEqual([dict(r)['id'] for r in rows], [1, 2, 3])
+        record = self.run_async(self.db.fetchOne("SELECT * FROM users WHERE email = 'user1@kr.ru'", raw=True))
+        self.assertIsInstance(record, MemoryRecord)
+        self.assertEqual((record['username'], record[0]), ('user1', 1))
+        self.assertEqual(UserModel.from_records([record])[0].to_dict(), UserModel.from_row(record).to_dict())
+
+    def test_select_without_table(self):
+        self.assertEqual(self.run_async(self.db.fetchOne('SELECT $1::text AS t, $2::int AS i', 5, '7')),
+                         (('t', '5'), ('i', 7)))
+        self.assertEqual(self.run_async(self.db.fetchOne('SELECT 1')), (('?column?', 1),))
+
+    def test_same_errors_as_database(self):
+        self.assertRaises(WrongTableNameQuery, self.run_async, self.db.fetchOne('SELECT * FROM TEST'))
+        self.assertRaises(WrongTableNameQuery, self.run_async, self.db.fetchMany('SELECT * FROM TEST'))
+        self.assertRaises(WrongTableNameQuery, self.run_async, self.db.insert('INSERT INTO TEST VALUES(1)'))
+        self.assertRaises(WrongTableNameQuery, self.run_async, self.db.insert_many('test', [(1,)]))
+        self.assertRaises(RowNotFound, self.run_async, self.db.fetchOne('SELECT * FROM users WHERE id = $1', 42))
+        self.assertEqual(self.run_async(self.db.fetchMany('SELECT * FROM users WHERE id = $1', 42)), [])
+        self.assertRaises(asyncpg.PostgresSyntaxError, self.run_async, self.db.fetchMany('SELEC * FROM users'))
+        self.assertRaises(asyncpg.UndefinedColumnError, self.run_async,
+                          self.db.fetchMany('SELECT * FROM users WHERE name = $1', 'a'))
+        self.assertRaises(asyncpg.InterfaceError, self.run_async,
+                          self.db.fetchMany('SELECT * FROM users WHERE id = $1'))
+        self.assertRaises(asyncpg.DuplicateTableError, self.run_async, self.db.execute(CREATE_USERS))
+
+    def test_unique_violation_rolls_back_statement(self):
+        self.assertRaises(asyncpg.UniqueViolationError, self.run_async,
+                          self.db.insert("INSERT INTO users(id, username) VALUES (10, 'a'), (11, 'user1')"))
+        self.assertRaises(RowNotFound, self.run_async, self.db.fetchOne('SELECT * FROM users WHERE id = 10'))
+        self.assertRaises(asyncpg.NotNullViolationError, self.run_async,
+                          self.db.insert("INSERT INTO users(username) VALUES ('b')"))
+        self.run_async(self.db.insert("INSERT INTO users(id, username) VALUES (10, 'a')"))
+        row = self.run_async(self.db.fetchOne('SELECT * FROM users WHERE username = $1', 'a'))
+        self.assertEqual(dict(row), dict(id=10, username='a', password=None, email=None, active=True))
+
+    def test_update_and_delete_keep_indexes(self):
+        self.assertEqual(self.run_async(self.db.execute("UPDATE users SET username = 'renamed' WHERE id = 1")),
+                         'UPDATE 1')
+        self.assertRaises(RowNotFound, self.run_async,
+                          self.db.fetchOne("SELECT * FROM users WHERE username = 'user1'"))
+        row = self.run_async(self.db.fetchOne("SELECT id FROM users WHERE username = 'renamed'"))
+        self.assertEqual(row, (('id', 1),))
+        self.assertEqual(self.run_async(self.db.execute('DELETE FROM users WHERE active = false')), 'DELETE 2')
+        rows = self.run_async(self.db.fetchMany('SELECT id FROM users ORDER BY id'))
+        self.assertEqual([dict(r)['id'] for r in rows], [0, 2, 4])
+        self.run_async(self.db.execute('CREATE INDEX users_active ON users(active)'))
+        self.assertEqual(len(self.run_async(self.db.fetchMany('SELECT * FROM users WHERE active = $1', True))), 3)
+        self.run_async(self.db.execute('DROP TABLE users'))
+        self.assertRaises(WrongTableNameQuery, self.run_async, self.db.fetchMany('SELECT * FROM users'))
+
+    def test_transaction_rollback_and_savepoint(self):
+        async def failing():
+            async with self.db.transaction():
+                await self.db.insert("INSERT INTO users(id, username) VALUES (10, 'a')")
+                try:
+                    async with self.db.transaction():
+                        await self.db.insert("INSERT INTO users(id, username) VALUES (11, 'b')")
+                        await self.db.insert('DELETE FROM users WHERE id = 0')
+                        raise ValueError
+                except ValueError:
+                    pass
+                await self.db.insert("UPDATE users SET username = 'c' WHERE id = 1")
+                rows = await self.db.fetchMany('SELECT id FROM users WHERE id >= 10')
+                self.assertEqual(rows, [(('id', 10),)])
+                self.assertEqual(len(await self.db.fetchMany('SELECT id FROM users WHERE id = 0')), 1)
+                raise KeyError
+
+        self.assertRaises(KeyError, self.run_async, failing())
+        self.assertEqual(len(self.run_async(self.db.fetchMany('SELECT * FROM users'))), 5)
+        self.assertEqual(self.run_async(self.db.fetchOne('SELECT username FROM users WHERE id = 1')),
+                         (('username', 'user1'),))
+
+        written = []
+        self.db.add_write_listener(written.append)
+
+        async def committed():
+            async with self.db.transaction():
+                await self.db.insert("INSERT INTO users(id, username) VALUES (10, 'a')")
+                self.assertEqual(written, [])
+        self.run_async(committed())
+        self.assertEqual(written, ['users'])
+        self.assertEqual(len(self.run_async(self.db.fetchMany('SELECT * FROM users'))), 6)
+
+    def test_stream(self):
+        async def collect(**kwargs):
+            return [row async for row in self.db.stream('SELECT id FROM users ORDER BY id', batch_size=2, **kwargs)]
+        self.assertEqual(self.run_async(collect()), [(('id', i),) for i in range(5)])
+        self.assertEqual([len(batch) for batch in self.run_async(collect(batches=True))], [2, 2, 1])
+
+    def test_latency_pool_and_instrumentation(self):
+        db = MemoryDatabase(TestConfig(), latency=0.02, pool_size=2)
+        instrumentation = Instrumentation(slow_query_threshold=None)
+        db.instrument(instrumentation)
+        self.run_async(db.connect())
+        self.run_async(db.execute('CREATE TABLE t(id int)'))
+
+        async def concurrent():
+            return await asyncio.gather(*(db.fetchMany('SELECT * FROM t') for _ in range(4)))
+        started = time.perf_counter()
+        self.run_async(concurrent())
+        self.assertGreaterEqual(time.perf_counter() - started, 0.04)
+        report = instrumentation.report()
+        self.assertEqual(report['all']['total']['count'], 4)
+        self.assertGreater(report['all']['acquire']['max'], 0.015)
+
+    def test_cached_repository(self):
+        repo = CachedUserRepository(self.db)
+        user = self.run_async(repo.get_by_username('user2'))
+        self.assertEqual(user.id, 2)
+        self.assertIs(self.run_async(repo.get_by_id(2)), user)
+        self.run_async(self.db.insert("UPDATE users SET email = 'new@kr.ru' WHERE id = 2"))
+        self.assertEqual(self.run_async(repo.get_by_id(2)).email, 'new@kr.ru')
+        repo.close()
+
+    def test_upsert_and_update_many(self):
+        written = []
+        self.db.add_write_listener(written.append)
+        models = self.run_async(self.db.upsert([UserModel(id=1, username='renamed', email='user1@kr.ru'),
+                                                UserModel(id=7, username='user7', email='user7@kr.ru')],
+                                               returning=True))
+        self.assertEqual([(model.id, model.username, model.active) for model in models],
+                         [(1, 'renamed', True), (7, 'user7', True)])
+        self.assertEqual(written, ['users'])
+        self.assertRaises(asyncpg.UniqueViolationError, self.run_async,
+                          self.db.upsert([UserModel(id=8, username='user2')]))
+        self.assertRaises(asyncpg.InvalidColumnReferenceError, self.run_async,
+                          self.db.upsert([UserModel(id=8, username='user2', active=False)], conflict=('active',)))
+        # new models keep default id, they must not be merged into one row
+        self.assertRaises(AssertionError, self.run_async,
+                          self.db.upsert([UserModel(username='a'), UserModel(username='b')]))
+        self.assertRaises(AssertionError, self.run_async,
+                          self.db.upsert([UserModel(id=9, username='c')], conflict=('id', 'active')))
+        models = self.run_async(self.db.update_many([UserModel(id=2, active=False), UserModel(id=42)],
+                                                    columns=('active',), returning=True))
+        self.assertEqual([(model.id, model.username, model.active) for model in models], [(2, 'user2', False)])
+        rows = self.run_async(self.db.fetchMany('SELECT id, username FROM users ORDER BY id'))
+        self.assertEqual([dict(row)['username'] for row in rows],
+                         ['user0', 'renamed', 'user2', 'user3', 'user4', 'user7'])
+
+    def test_index_lookup_does_not_scan(self):
+        self.run_async(self.db.insert_many('users', [(i, 'u{}'.format(i), '', 'u{}@kr.ru'.format(i), True)
+                                                     for i in range(100, 20100)]))
+        table = self.db.tables['users']
+        self.assertEqual(len(table.rows), 20005)
+        rows = table.rows
+        table.rows = _NoIteration(rows)
+        try:
+            row = self.run_async(self.db.fetchOne('SELECT username FROM users WHERE id = $1', 15000))
+        finally:
+            table.rows = rows
+        self.assertEqual(row, (('username', 'u15000'),))
+
+
+class _NoIteration(dict):
+    def __iter__(self):
+        raise AssertionError('table is scanned')
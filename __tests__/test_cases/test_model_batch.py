@@ -0,0 +1,55 @@
+import asyncio
+import unittest
+from array import array
+
+from __tests__.TestConfig import TestConfig
+from src.boot.Database import Database
+from src.models.UserModel import UserBatch, UserModel
+from src.tools.exceptions import NotEnoughData
+
+
+class ModelBatchTestCase(unittest.TestCase):
+    def setUp(self):
+        self.models = [UserModel(id=i, username='user{}'.format(i), email='user{}@kr.ru'.format(i)) for i in range(3)]
+
+    def test_batch_stores_columns(self):
+        batch = UserBatch(self.models)
+        self.assertEqual(len(batch), 3)
+        self.assertEqual(batch.column('id'), array('q', [0, 1, 2]))
+        self.assertEqual(batch.column('username'), ['user0', 'user1', 'user2'])
+
+    def test_batch_rows_behave_as_models(self):
+        batch = UserBatch(self.models)
+        for row, model in zip(batch, self.models):
+            self.assertEqual(row.to_dict(), model.to_dict())
+            self.assertEqual(row.to_row(), model.to_row())
+            self.assertEqual(row.email, model.email)
+        self.assertEqual(batch[-1].id, 2)
+        self.assertRaises(IndexError, batch.__getitem__, 3)
+        self.assertRaises(AttributeError, getattr, batch[0], 'extra')
+        self.assertEqual([m.to_dict() for m in batch.to_models()], [m.to_dict() for m in self.models])
+
+    def test_int_column_falls_back_to_list(self):
+        batch = UserBatch(self.models)
+        batch.append(UserModel(id=None))
+        self.assertEqual(batch.column('id'), [0, 1, 2, None])
+        self.assertEqual(len(batch), 4)
+
+    def test_batch_from_mappings(self):
+        batch = UserBatch()
+        batch.extend_records([m.to_dict() for m in self.models])
+        self.assertEqual([r.to_dict() for r in batch], [m.to_dict() for m in self.models])
+        self.assertRaises(NotEnoughData, batch.extend_records, [dict(id=1)])
+
+    def test_batch_fetch(self):
+        db = Database(TestConfig())
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(db.connect())
+        query = "SELECT i AS id, 'user' || i AS username, '' AS password, 'user' || i || '@kr.ru' AS email, " \
+                "true AS active FROM generate_series(0, $1) AS i"
+        try:
+            batch = loop.run_until_complete(UserBatch.fetch(db, query, 2))
+            self.assertEqual([r.to_dict() for r in batch], [m.to_dict() for m in self.models])
+        finally:
+            loop.run_until_complete(db.close())
+        loop.close()
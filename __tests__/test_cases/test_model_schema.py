@@ -0,0 +1,31 @@
+import unittest
+from typing import Any
+
+from src.models.ModelSchema import MISSING, Field, ModelSchema
+from src.models.UserModel import IUserModel, UserModel
+
+
+class ModelSchemaTestCase(unittest.TestCase):
+    def test_schema_is_computed_on_class_creation(self):
+        schema = UserModel.__schema__
+        self.assertIsInstance(schema, ModelSchema)
+        self.assertEqual(schema.names, ('id', 'username', 'password', 'email', 'active'))
+        self.assertEqual(schema.types, (int, str, str, str, bool))
+        self.assertEqual(schema.defaults, dict(id=-1, username='', password='', email='', active=True))
+        self.assertEqual(schema.positions['email'], 3)
+        self.assertEqual(IUserModel.__schema__.names, ('username', 'password', 'email', 'active'))
+
+    def test_schema_getter_returns_values_in_fields_order(self):
+        user_model = UserModel(id=3, username='test', email='test@kr.ru', password='some', active=False)
+        self.assertEqual(UserModel.__schema__.getter(user_model), (3, 'test', 'some', 'test@kr.ru', False))
+
+    def test_schema_from_init_without_defaults(self):
+        class Model:
+            def __init__(self, a: int, b='', *args, c: str = '', **kwargs):
+                pass
+
+        schema = ModelSchema.from_init(Model)
+        self.assertEqual(schema.fields, (Field('a', int, MISSING), Field('b', Any, '')))
+        self.assertTrue(schema.fields[0].required)
+        self.assertFalse(schema.fields[1].required)
+        self.assertEqual(ModelSchema.from_init(object).names, ())
@@ -0,0 +1,139 @@
+import asyncio
+import base64
+import unittest
+from datetime import date, datetime, time, timezone
+from decimal import Decimal
+from uuid import UUID
+
+from __tests__.TestConfig import TestConfig
+from src.boot.Database import Database
+from src.boot.IDatabase import keyset_query
+from src.boot.Instrumentation import Instrumentation
+from src.boot.MemoryDatabase import MemoryDatabase
+from src.models.UserModel import UserModel
+from src.tools.cursor import decode_cursor, encode_cursor
+from src.tools.exceptions import InvalidCursor
+
+
+def users(ids):
+    return [UserModel(id=i, username='user{}'.format(i), email='user{}@kr.ru'.format(i), active=i % 3 != 0)
+            for i in ids]
+
+
+async def collect(page):
+    ids, cursors = [], []
+    while page is not None:
+        ids.append([user.id for user in page])
+        cursors.append(page.cursor)
+        page = await page.next()
+    return ids, cursors
+
+
+class CursorTestCase(unittest.TestCase):
+    def test_cursor_round_trip(self):
+        values = [datetime(2024, 1, 2, 3, 4, tzinfo=timezone.utc), date(2024, 1, 2), 'a b', 5, None, True]
+        key = ['a', 'b', 'c', 'd', 'e', 'f']
+        cursor = encode_cursor(key, values)
+        self.assertRegex(cursor, r'^[\w-]+$')
+        self.assertEqual(decode_cursor(cursor, key), values)
+        self.assertRaises(InvalidCursor, decode_cursor, cursor, ['id'])
+        self.assertRaises(InvalidCursor, decode_cursor, 'not a cursor', ['id'])
+        self.assertRaises(InvalidCursor, decode_cursor, cursor[:-3], key)
+        self.assertRaises(TypeError, encode_cursor, ['id'], [object()])
+
+    def test_cursor_keeps_uuid_decimal_and_time(self):
+        values = [UUID('12345678-1234-5678-1234-567812345678'), Decimal('10.50'), time(3, 4, 5, 6)]
+        key = ['uuid', 'price', 'at']
+        self.assertEqual(decode_cursor(encode_cursor(key, values), key), values)
+        self.assertEqual(str(decode_cursor(encode_cursor(key, values), key)[1]), '10.50')
+        with self.assertRaisesRegex(TypeError, 'tags column'):
+            encode_cursor(['id', 'tags'], [1, {'a'}])
+        cursor = base64.urlsafe_b64encode(b'[["price"],[{"decimal":"x"}]]').decode()
+        self.assertRaises(InvalidCursor, decode_cursor, cursor, ['price'])
+
+    def test_keyset_query(self):
+        self.assertEqual(keyset_query('users', ('id',)), 'SELECT * FROM "users" ORDER BY "id" LIMIT $1')
+        self.assertEqual(keyset_query('public.users', ('id',), where='active = $1', params=1, after=True),
+                         'SELECT * FROM "public"."users" WHERE (active = $1) AND "id" > $2 ORDER BY "id" LIMIT $3')
+        self.assertEqual(keyset_query('users', ('active', 'id'), descending=True, after=True),
+                         'SELECT * FROM "users" WHERE ("active", "id") < ($1, $2) '
+                         'ORDER BY "active" DESC, "id" DESC LIMIT $3')
+
+
+class PaginationTestCase(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.db = Database(TestConfig())
+        self.loop.run_until_complete(self.db.connect())
+        self.loop.run_until_complete(self.db.insert('DROP TABLE IF EXISTS pages'))
+        self.loop.run_until_complete(self.db.insert('CREATE TABLE pages(id int PRIMARY KEY, username text, '
+                                                    'password text, email text, active boolean)'))
+        self.loop.run_until_complete(self.db.insert_many('pages', [user.to_row() for user in users(range(1, 26))]))
+
+    def tearDown(self):
+        self.loop.run_until_complete(self.db.insert('DROP TABLE pages'))
+        self.loop.run_until_complete(self.db.close())
+        self.loop.close()
+
+    def test_pages_follow_key(self):
+        async def main():
+            first = await UserModel.page(self.db, size=10, table='pages')
+            # rows written before cursor position do not shift next pages
+            await self.db.insert('DELETE FROM pages WHERE id <= 3')
+            return await collect(first)
+
+        ids, cursors = self.loop.run_until_complete(main())
+        self.assertEqual(ids, [list(range(1, 11)), list(range(11, 21)), list(range(21, 26))])
+        self.assertIsNone(cursors[-1])
+        page = self.loop.run_until_complete(UserModel.page(self.db, cursors[0], size=10, table='pages',
+                                                           prefetch=False))
+        self.assertEqual([user.id for user in page], list(range(11, 21)))
+        self.assertIsInstance(page.items[0], UserModel)
+
+    def test_filter_and_descending_composite_key(self):
+        async def main():
+            page = await UserModel.page(self.db, size=4, key=('active', 'id'), descending=True,
+                                        where='id > $1', args=(15,), table='pages')
+            return [user.id async for user in page]
+
+        self.assertEqual(self.loop.run_until_complete(main()), [25, 23, 22, 20, 19, 17, 16, 24, 21, 18])
+        self.assertRaises(InvalidCursor, self.loop.run_until_complete,
+                          UserModel.page(self.db, encode_cursor(['id'], [1]), key=('active', 'id'), table='pages'))
+
+    def test_next_page_is_prefetched(self):
+        instrumentation = Instrumentation(slow_query_threshold=None)
+        self.db.instrument(instrumentation)
+
+        async def main():
+            page = await UserModel.page(self.db, size=10, table='pages')
+            await asyncio.sleep(0.1)
+            prefetched = instrumentation.report()['all']['total']['count']
+            second = await page.next()
+            await asyncio.sleep(0.1)
+            # third page is prefetched only after second was taken
+            self.assertEqual(instrumentation.report()['all']['total']['count'], 3)
+            second.close()
+            async with self.db.transaction():
+                page = await UserModel.page(self.db, size=10, table='pages')
+                await asyncio.sleep(0.05)
+                in_transaction = instrumentation.report()['all']['total']['count']
+                self.assertEqual([user.id for user in await page.next()], list(range(11, 21)))
+            return prefetched, in_transaction
+
+        self.assertEqual(self.loop.run_until_complete(main()), (2, 4))
+
+    def test_memory_database_pages(self):
+        db = MemoryDatabase(TestConfig())
+
+        async def main():
+            await db.execute('CREATE TABLE users(id int PRIMARY KEY, username text, password text, email text, '
+                             'active boolean)')
+            await db.insert_many('users', [user.to_row() for user in users(range(1, 12))])
+            pages = await collect(await UserModel.page(db, size=3, where='active = $1', args=(True,)))
+            composite = await UserModel.page(db, size=4, key=('active', 'id'), descending=True, where='id > $1',
+                                             args=(2,))
+            return pages, [user.id async for user in composite]
+
+        (ids, _), composite = self.loop.run_until_complete(main())
+        self.assertEqual(ids, [[1, 2, 4], [5, 7, 8], [10, 11]])
+        self.assertEqual(composite, [11, 10, 8, 7, 5, 4, 9, 6, 3])
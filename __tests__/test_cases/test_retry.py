@@ -0,0 +1,167 @@
+import asyncio
+import unittest
+
+import asyncpg
+
+from __tests__.TestConfig import TestConfig
+from src.boot.CircuitBreaker import CircuitBreaker
+from src.boot.Config import Config
+from src.boot.Database import Database
+from src.boot.RetryPolicy import RetryPolicy
+from src.tools.exceptions import CircuitOpen, RetriesExhausted
+
+# raises serialization failure while sequence is not greater than n, sequences are not rolled back
+CREATE_FLAKY = """
+CREATE SEQUENCE flaky_seq;
+CREATE TABLE flaky_rows(id int);
+CREATE FUNCTION flaky(n int) RETURNS int AS $$
+BEGIN
+    IF nextval('flaky_seq') <= n THEN
+        RAISE EXCEPTION 'conflict' USING ERRCODE = 'serialization_failure';
+    END IF;
+    RETURN 1;
+END $$ LANGUAGE plpgsql
+"""
+DROP_FLAKY = 'DROP FUNCTION IF EXISTS flaky; DROP TABLE IF EXISTS flaky_rows; DROP SEQUENCE IF EXISTS flaky_seq'
+
+
+class RetryPolicyTestCase(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def test_backoff_is_jittered_and_capped(self):
+        policy = RetryPolicy(base_delay=0.1, max_delay=0.3, seed=1)
+        for retry, limit in ((1, 0.1), (2, 0.2), (3, 0.3), (10, 0.3)):
+            delays = [policy.delay(retry) for _ in range(50)]
+            self.assertTrue(all(0 <= delay <= limit for delay in delays))
+            self.assertGreater(len(set(delays)), 1)
+
+    def test_budget_limits_retries(self):
+        policy = RetryPolicy(attempts=5, base_delay=0, budget_ratio=0.5, budget_burst=2)
+        calls = []
+
+        async def failing():
+            calls.append(1)
+            raise ValueError
+
+        with self.assertRaises(RetriesExhausted) as error:
+            self.loop.run_until_complete(policy.run(failing, lambda e: isinstance(e, ValueError)))
+        self.assertIsInstance(error.exception.__cause__, ValueError)
+        # budget is full, two retries are taken
+        self.assertEqual(len(calls), 3)
+        with self.assertRaises(RetriesExhausted):
+            self.loop.run_until_complete(policy.run(failing, lambda e: isinstance(e, ValueError)))
+        # call deposited half of token, so no retry
+        self.assertEqual(len(calls), 4)
+        self.assertRaises(ValueError, self.loop.run_until_complete, policy.run(failing, lambda e: False))
+        self.assertEqual(policy.info(), dict(calls=3, retries=2, exhausted=2, budget_rejected=2, tokens=1.0))
+
+    def test_circuit_breaker_probes_after_timeout(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+        calls = []
+
+        async def call(error=None):
+            calls.append(error)
+            await asyncio.sleep(0.01)
+            if error is not None:
+                raise error
+            return 'ok'
+
+        def run(error=None):
+            return self.loop.run_until_complete(breaker.call(lambda: call(error), lambda e: isinstance(e, OSError)))
+
+        self.assertRaises(OSError, run, OSError())
+        self.assertRaises(KeyError, run, KeyError())
+        self.assertEqual(breaker.failures, 0)
+        self.assertRaises(OSError, run, OSError())
+        self.assertRaises(OSError, run, OSError())
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertRaises(CircuitOpen, run)
+        self.assertEqual(len(calls), 4)
+        self.loop.run_until_complete(asyncio.sleep(0.06))
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertRaises(OSError, run, OSError())
+        self.assertRaises(CircuitOpen, run)
+        self.loop.run_until_complete(asyncio.sleep(0.06))
+
+        async def probes():
+            return await asyncio.gather(*(breaker.call(call, lambda e: True) for _ in range(2)),
+                                        return_exceptions=True)
+        result, rejected = self.loop.run_until_complete(probes())
+        self.assertEqual(result, 'ok')
+        self.assertIsInstance(rejected, CircuitOpen)
+        self.assertEqual(breaker.info(), dict(state=CircuitBreaker.CLOSED, failures=0, opened=2, rejected=3))
+
+
+class DatabaseRetryTestCase(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.db = Database(TestConfig(), retry=RetryPolicy(attempts=3, base_delay=0.001),
+                           circuit_breaker=CircuitBreaker())
+        self.loop.run_until_complete(self.db.connect())
+        self.loop.run_until_complete(self.db.insert(DROP_FLAKY))
+        self.loop.run_until_complete(self.db.insert(CREATE_FLAKY))
+
+    def tearDown(self):
+        self.loop.run_until_complete(self.db.insert(DROP_FLAKY))
+        self.loop.run_until_complete(self.db.close())
+        self.loop.close()
+
+    def reset(self):
+        self.loop.run_until_complete(self.db.fetchOne("SELECT setval('flaky_seq', 1, false)"))
+
+    def test_reads_are_retried(self):
+        self.assertEqual(self.loop.run_until_complete(self.db.fetchOne('SELECT flaky(2) AS f')), (('f', 1),))
+        self.reset()
+        with self.assertRaises(RetriesExhausted) as error:
+            self.loop.run_until_complete(self.db.fetchMany('SELECT flaky(3)'))
+        self.assertIsInstance(error.exception.__cause__, asyncpg.SerializationError)
+        info = self.db.retry_info()
+        self.assertEqual((info['retry']['retries'], info['retry']['exhausted']), (4, 1))
+        # serialization failure means server is up
+        self.assertEqual(info['circuit']['failures'], 0)
+
+    def test_only_marked_writes_are_retried(self):
+        self.assertRaises(asyncpg.SerializationError, self.loop.run_until_complete,
+                          self.db.insert('INSERT INTO flaky_rows SELECT flaky(1)'))
+        self.reset()
+        with self.db.retryable():
+            self.loop.run_until_complete(self.db.insert('INSERT INTO flaky_rows SELECT flaky(1)'))
+        self.assertEqual(len(self.loop.run_until_complete(self.db.fetchMany('SELECT * FROM flaky_rows'))), 1)
+
+    def test_transaction_is_retried_as_whole(self):
+        attempts = []
+
+        async def body():
+            attempts.append(1)
+            await self.db.insert('INSERT INTO flaky_rows VALUES ($1)', len(attempts))
+            # statement inside transaction is not repeated alone
+            return await self.db.fetchOne('SELECT flaky(2) AS f')
+
+        row = self.loop.run_until_complete(self.db.run_in_transaction(body))
+        self.assertEqual(row, (('f', 1),))
+        self.assertEqual(len(attempts), 3)
+        rows = self.loop.run_until_complete(self.db.fetchMany('SELECT id FROM flaky_rows'))
+        self.assertEqual(rows, [(('id', 3),)])
+
+
+class DatabaseCircuitTestCase(unittest.TestCase):
+    def test_unavailable_database_fails_fast(self):
+        loop = asyncio.new_event_loop()
+        # nothing listens on port 1, pool opens connections on demand
+        config = Config(**dict(TestConfig.TEST_CONFIG, db_port=1, db_min_size=0))
+        db = Database(config, retry=RetryPolicy(attempts=3, base_delay=0.001),
+                      circuit_breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60))
+        loop.run_until_complete(db.connect())
+        try:
+            # second failure opens circuit, so third attempt is not made
+            self.assertRaises(CircuitOpen, loop.run_until_complete, db.fetchOne('SELECT 1'))
+            self.assertRaises(CircuitOpen, loop.run_until_complete, db.insert('INSERT INTO t VALUES (1)'))
+            self.assertEqual(db.retry_info()['circuit'], dict(state=CircuitBreaker.OPEN, failures=2, opened=1,
+                                                              rejected=2))
+        finally:
+            loop.run_until_complete(db.close())
+            loop.close()
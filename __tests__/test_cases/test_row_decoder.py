@@ -0,0 +1,95 @@
+import csv
+import io
+import unittest
+from datetime import date, datetime, timezone
+from typing import Optional, Tuple, Union
+
+from src.boot.MemoryDatabase import MemoryRecord
+from src.models.IBaseModel import IBaseModel
+from src.models.RowDecoder import RowDecoder
+from src.models.UserModel import SlottedUserModel, UserModel
+from src.tools.exceptions import InvalidValue, NotEnoughData
+
+
+class Account(IBaseModel):
+    __table__ = 'accounts'
+
+    def __init__(self, id: int, balance: float, opened: date, closed: Optional[datetime] = None,
+                 note: Optional[str] = None, extra=None) -> None:
+        self.id = id
+        self.balance = balance
+        self.opened = opened
+        self.closed = closed
+        self.note = note
+        self.extra = extra
+
+    @classmethod
+    def from_row(cls, data: Tuple[Tuple[str, Union[str, bool, datetime, int]]]) -> 'IBaseModel':
+        return cls.decoder().decode(data)
+
+    def to_dict(self) -> dict:
+        return dict(zip(self.__schema__.names, self.__schema__.getter(self)))
+
+    def to_row(self) -> Tuple[Tuple[str, Union[str, bool, datetime, int]]]:
+        return tuple(zip(self.__schema__.names, self.__schema__.getter(self)))
+
+
+class RowDecoderTestCase(unittest.TestCase):
+    def test_coerces_csv_rows_in_one_pass(self):
+        text = 'active,id,username,email,password\n' \
+               'yes,1,a,a@kr.ru,\n' \
+               'F, 2 ,b,b@kr.ru,secret\n'
+        users = UserModel.decoder().decode_many(csv.DictReader(io.StringIO(text)))
+        self.assertEqual([user.to_dict() for user in users], [
+            dict(id=1, username='a', password='', email='a@kr.ru', active=True),
+            dict(id=2, username='b', password='secret', email='b@kr.ru', active=False),
+        ])
+
+    def test_values_of_field_type_are_kept(self):
+        row = UserModel(id=3, username='c', email='c@kr.ru', active=False).to_row()
+        user = UserModel.decoder().decode(row)
+        self.assertEqual(user.to_row(), row)
+        record = MemoryRecord(dict(active=0, email=1, id=2, username=3, password=4),
+                              (True, 'd@kr.ru', 4.0, 'd', 'p'))
+        users = UserModel.decoder().decode_many([record, MemoryRecord(record._index, (False, 'e', 5, 'e', ''))])
+        self.assertEqual([(user.id, user.active) for user in users], [(4, True), (5, False)])
+        self.assertIs(type(users[0].id), int)
+
+    def test_optional_dates_and_untyped_fields(self):
+        account = Account.from_row((('id', '7'), ('balance', '10.5'), ('opened', '2024-01-31'),
+                                    ('closed', '2024-02-01T10:00:00+00:00'), ('note', ''), ('extra', [1])))
+        self.assertEqual(account.to_dict(), dict(id=7, balance=10.5, opened=date(2024, 1, 31),
+                                                 closed=datetime(2024, 2, 1, 10, tzinfo=timezone.utc), note='',
+                                                 extra=[1]))
+        account = Account.decoder().decode(dict(id=8, balance=3, opened=datetime(2024, 3, 1, 12), closed='',
+                                                note=None, extra=None))
+        self.assertEqual((account.balance, account.opened, account.closed), (3.0, date(2024, 3, 1), None))
+        self.assertIs(type(account.balance), float)
+
+    def test_missing_fields_are_listed(self):
+        with self.assertRaises(NotEnoughData) as error:
+            UserModel.decoder().decode((('id', 1), ('email', 'a@kr.ru')))
+        self.assertEqual(error.exception.args, (['username', 'password', 'active'],))
+        with self.assertRaises(NotEnoughData) as error:
+            RowDecoder(Account, defaults=True).decode(dict(balance=1, note='a'))
+        self.assertEqual(error.exception.args, (['id', 'opened'],))
+        account = RowDecoder(Account, defaults=True).decode(dict(id=1, balance=1, opened='2024-01-01'))
+        self.assertEqual((account.closed, account.note, account.extra), (None, None, None))
+
+    def test_invalid_values_are_rejected(self):
+        decoder = UserModel.decoder()
+        row = dict(id=1, username='a', password='', email='', active=True)
+        for field, value in (('id', 'one'), ('id', 1.5), ('id', True), ('active', 'maybe'), ('active', 2),
+                             ('username', 5), ('email', None)):
+            with self.assertRaises(InvalidValue, msg=field) as error:
+                decoder.decode(dict(row, **{field: value}))
+            self.assertIn('"{}"'.format(field), str(error.exception))
+        self.assertRaises(InvalidValue, Account.decoder().decode, dict(id=1, balance=1, opened='31.01.2024',
+                                                                       closed=None, note=None, extra=None))
+
+    def test_decoder_is_created_once_per_class(self):
+        self.assertIs(UserModel.decoder(), UserModel.decoder())
+        self.assertIsNot(SlottedUserModel.decoder(), UserModel.decoder())
+        user = SlottedUserModel.decoder().decode(dict(id='1', username='a', password='', email='', active='t'))
+        self.assertIsInstance(user, SlottedUserModel)
+        self.assertEqual((user.id, user.active), (1, True))
@@ -0,0 +1,91 @@
+import asyncio
+import unittest
+
+from __tests__.TestConfig import TestConfig
+from __tests__.users_table import create_users, drop_users
+from src.boot.Database import Database
+from src.boot.Instrumentation import Instrumentation
+from src.models.UserLoader import UserLoader
+from src.models.UserModel import UserModel
+from src.tools.exceptions import RowNotFound, WrongTableNameQuery
+
+class UserLoaderTestCase(unittest.TestCase):
+    def setUp(self):
+        self.db = Database(TestConfig())
+        self.instrumentation = Instrumentation(slow_query_threshold=None)
+        self.loop = asyncio.new_event_loop()
+        self.loop.run_until_complete(self.db.connect())
+        self.loop.run_until_complete(create_users(self.db, 10))
+        self.db.instrument(self.instrumentation)
+
+    def tearDown(self):
+        self.loop.run_until_complete(drop_users(self.db))
+        self.loop.run_until_complete(self.db.close())
+        self.loop.close()
+
+    def queries(self):
+        return self.instrumentation.report()['all']['total']['count']
+
+    def test_concurrent_lookups_are_batched(self):
+        loader = UserLoader(self.db)
+
+        async def lookups():
+            return await asyncio.gather(*(loader.get_by_id(i % 5) for i in range(20)))
+        users = self.loop.run_until_complete(lookups())
+        self.assertEqual([user.id for user in users], [i % 5 for i in range(20)])
+        self.assertIs(users[0], users[5])
+        self.assertEqual(self.queries(), 1)
+        self.assertEqual(loader.info(), dict(loads=20, batches=1))
+
+        users = self.loop.run_until_complete(loader.load_many([3, 1]))
+        self.assertEqual([user.username for user in users], ['user3', 'user1'])
+        self.assertEqual(self.queries(), 2)
+
+    def test_missing_keys_raise_row_not_found(self):
+        loader = UserLoader(self.db)
+
+        async def lookups():
+            return await asyncio.gather(loader.get_by_id(1), loader.get_by_id(42), return_exceptions=True)
+        user, missing = self.loop.run_until_complete(lookups())
+        self.assertEqual(user.id, 1)
+        self.assertIsInstance(missing, RowNotFound)
+        self.assertRaises(RowNotFound, self.loop.run_until_complete, loader.load_many([1, 43]))
+
+    def test_batches_are_limited(self):
+        loader = UserLoader(self.db, max_batch_size=4)
+        users = self.loop.run_until_complete(loader.load_many(range(10)))
+        self.assertEqual([user.id for user in users], list(range(10)))
+        self.assertEqual(loader.batches, 3)
+
+    def test_errors_are_delivered_to_every_waiter(self):
+        loader = UserLoader(self.db)
+        self.loop.run_until_complete(self.db._pool.execute('DROP TABLE users'))
+
+        async def lookups():
+            return await asyncio.gather(loader.get_by_id(1), loader.get_by_id(2), return_exceptions=True)
+        errors = self.loop.run_until_complete(lookups())
+        self.assertTrue(all(isinstance(error, WrongTableNameQuery) for error in errors))
+
+    def test_batches_do_not_join_caller_transaction(self):
+        loader = UserLoader(self.db)
+        inserted = asyncio.Event()
+
+        async def writer():
+            async with self.db.transaction():
+                await self.db.insert_many('users', [UserModel(id=42, username='user42', email='user42@kr.ru').to_row()])
+                inserted.set()
+                own = await loader.get_by_id(42)
+                await asyncio.sleep(0.05)
+                raise ValueError(own.username)
+
+        async def reader():
+            await inserted.wait()
+            return await loader.get_by_id(42)
+
+        async def lookups():
+            return await asyncio.gather(writer(), reader(), return_exceptions=True)
+        own, missing = self.loop.run_until_complete(lookups())
+        self.assertEqual(str(own), 'user42')
+        self.assertIsInstance(missing, RowNotFound)
+        self.assertIsNone(self.db._bound.get())
+        self.assertRaises(RowNotFound, self.loop.run_until_complete, loader.get_by_id(42))
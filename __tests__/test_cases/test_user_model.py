@@ -1,9 +1,11 @@
+import asyncio
 import unittest
 from datetime import datetime
 from typing import Tuple, Union
 
 from __tests__.TestConfig import TestConfig
-from src.models.UserModel import IUserModel, UserModel
+from src.boot.Database import Database
+from src.models.UserModel import IUserModel, UserModel, SlottedUserModel
 from src.tools.exceptions import NotEnoughData
 
 
@@ -46,3 +48,67 @@ class UserModelTestCase(unittest.TestCase):
         user_model_from_db_row = UserModel.from_row(db_row)
         self.assertListEqual(sorted(list(user_model_from_dict.to_row())), sorted(list(db_row)))
         self.assertListEqual(sorted(list(user_model_from_db_row.to_row())), sorted(list(db_row)))
+
+    def test_can_stream_models_from_query(self):
+        db = Database(TestConfig())
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(db.connect())
+
+        async def collect():
+            query = "SELECT i AS id, 'user' || i AS username, '' AS password, '' AS email, true AS active " \
+                    "FROM generate_series(1, $1) AS i"
+            return [model async for model in UserModel.stream_from_query(db, query, 3, batch_size=2)]
+
+        try:
+            models = loop.run_until_complete(collect())
+            self.assertEqual([(m.id, m.username) for m in models], [(1, 'user1'), (2, 'user2'), (3, 'user3')])
+            self.assertTrue(all(isinstance(m, UserModel) for m in models))
+        finally:
+            loop.run_until_complete(db.close())
+        loop.close()
+
+    def test_can_instance_user_model_from_mapping(self):
+        user_data = dict(id=3, username='test', email='test@kr.ru', password='some', active=True, extra=1)
+        user_model = UserModel.from_row(user_data)
+        self.assertEqual(user_model.id, 3)
+        self.assertEqual(user_model.username, 'test')
+        del user_data['email']
+        with self.assertRaises(NotEnoughData) as error:
+            UserModel.from_row(user_data)
+        self.assertEqual(error.exception.args[0], ['email'])
+
+    def test_row_plan_is_resolved_once_per_columns(self):
+        columns = ('extra', 'id', 'username', 'email', 'password', 'active')
+        plan = UserModel.row_plan(columns)
+        self.assertEqual([columns[p] for p in plan], list(UserModel.field_names()))
+        self.assertIs(UserModel.row_plan(columns), plan)
+        self.assertRaises(NotEnoughData, UserModel.row_plan, columns=('id', 'username'))
+
+    def test_can_instance_user_models_from_records(self):
+        db = Database(TestConfig())
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(db.connect())
+        query = "SELECT 0 AS extra, i AS id, 'user' || i AS username, '' AS password, '' AS email, true AS active " \
+                "FROM generate_series(1, $1) AS i"
+        try:
+            records = loop.run_until_complete(db.fetchMany(query, 3, raw=True))
+            models = UserModel.from_records(records)
+            self.assertEqual([(m.id, m.username) for m in models], [(1, 'user1'), (2, 'user2'), (3, 'user3')])
+            self.assertEqual(UserModel.from_row(records[1]).to_dict(), models[1].to_dict())
+            self.assertEqual(UserModel.from_row(tuple(records[1].items())).to_dict(), models[1].to_dict())
+            self.assertEqual(UserModel.from_records([]), [])
+        finally:
+            loop.run_until_complete(db.close())
+        loop.close()
+
+    def test_slotted_user_model_behaves_as_user_model(self):
+        user_data = dict(id=3, username='test', email='test@kr.ru', password='some', active=True)
+        slotted = SlottedUserModel
+        user_model = slotted(**user_data)
+        self.assertFalse(hasattr(user_model, '__dict__'))
+        self.assertIsInstance(user_model, IUserModel)
+        self.assertEqual(slotted.field_names(), UserModel.field_names())
+        self.assertEqual(user_model.to_dict(), UserModel(**user_data).to_dict())
+        self.assertEqual(user_model.to_row(), UserModel(**user_data).to_row())
+        self.assertIsInstance(slotted.from_row(dict_to_db_row(user_data)), slotted)
+        self.assertRaises(AttributeError, setattr, user_model, 'extra', 1)
@@ -0,0 +1,129 @@
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+
+from __tests__.TestConfig import TestConfig
+from src.boot.Config import Config
+from src.boot.MemoryDatabase import MemoryDatabase
+from src.boot.WorkerRunner import WorkerRunner, worker_config
+
+# workers are forked, so they see directory set by test
+OUTPUT = {}
+
+
+def record(name: str, text: str) -> None:
+    with open(os.path.join(OUTPUT['dir'], name), 'a') as file:
+        file.write(text + '\n')
+
+
+async def serving_worker(db, stopping):
+    row = await db.fetchOne('SELECT 1 AS i')
+    record('started', '{} {} {}'.format(os.getpid(), db._config.db_max_size, dict(row)['i']))
+    await stopping.wait()
+    await asyncio.sleep(0.05)
+    record('drained', str(os.getpid()))
+
+
+async def crashing_worker(db, stopping):
+    record('started', str(os.getpid()))
+    raise RuntimeError('crash')
+
+
+class SlowBootDatabase(MemoryDatabase):
+    async def connect(self):
+        record('booting', str(os.getpid()))
+        await asyncio.sleep(0.3)
+        await super().connect()
+
+    async def close(self):
+        record('closed', str(os.getpid()))
+        await super().close()
+
+
+def wait_lines(name: str, count: int, timeout: float = 10.0) -> list:
+    deadline = time.monotonic() + timeout
+    path = os.path.join(OUTPUT['dir'], name)
+    while time.monotonic() < deadline:
+        if os.path.exists(path):
+            with open(path) as file:
+                lines = file.read().split()
+            if len(lines) >= count:
+                return lines
+        time.sleep(0.02)
+    raise AssertionError('{} has less than {} lines'.format(name, count))
+
+
+class WorkerRunnerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        OUTPUT['dir'] = self.directory.name
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_worker_config_splits_connection_budget(self):
+        config = Config(**dict(TestConfig.TEST_CONFIG, db_min_size=4, db_max_size=20))
+        sized = worker_config(config, 3, 10)
+        self.assertEqual((sized.db_min_size, sized.db_max_size), (3, 3))
+        self.assertEqual((sized.db_host, sized.db_name), (config.db_host, config.db_name))
+        sized = worker_config(config, 3)
+        self.assertEqual((sized.db_min_size, sized.db_max_size), (4, 20))
+        self.assertRaises(AssertionError, worker_config, config, 3, 2)
+
+    def test_workers_restart_and_drain(self):
+        runner = WorkerRunner(serving_worker, TestConfig(), workers=2, connection_budget=5, drain_timeout=5)
+        runner.start()
+        try:
+            started = wait_lines('started', 6)
+            first = sorted(runner.pids)
+            self.assertEqual(sorted(int(pid) for pid in started[0::3]), first)
+            self.assertEqual(started[1::3], ['2', '2'])
+            runner.restart()
+            started = wait_lines('started', 12)
+            self.assertEqual(sorted(int(pid) for pid in wait_lines('drained', 2)), first)
+            self.assertTrue(set(runner.pids).isdisjoint(first))
+            self.assertEqual(sorted(int(pid) for pid in started[6::3]), sorted(runner.pids))
+        finally:
+            runner.stop()
+        self.assertEqual(len(wait_lines('drained', 4)), 4)
+        self.assertEqual(runner.pids, [None, None])
+
+    def test_exited_workers_are_started_again(self):
+        runner = WorkerRunner(crashing_worker, TestConfig(), workers=1, database_factory=MemoryDatabase,
+                              restart_delay=0)
+        runner.start()
+        try:
+            runner.supervise(timeout=1.0)
+        finally:
+            runner.stop()
+        self.assertGreaterEqual(len(wait_lines('started', 2)), 2)
+        self.assertGreaterEqual(runner.restarts, 1)
+
+    def test_workers_exited_together_are_restarted_together(self):
+        runner = WorkerRunner(crashing_worker, TestConfig(), workers=3, database_factory=MemoryDatabase,
+                              restart_delay=0.5)
+        runner.start()
+        try:
+            wait_lines('started', 3)
+            started = time.monotonic()
+            runner.supervise(timeout=0.8)
+            elapsed = time.monotonic() - started
+        finally:
+            runner.stop()
+        # restarts are not serialized by restart delay of every worker
+        self.assertEqual(runner.restarts, 3)
+        self.assertLess(elapsed, 1.2)
+
+    def test_worker_terminated_while_booting_stops_cleanly(self):
+        runner = WorkerRunner(serving_worker, TestConfig(), workers=1, database_factory=SlowBootDatabase)
+        runner.start()
+        process = runner._processes[0]
+        try:
+            wait_lines('booting', 1)
+        finally:
+            runner.stop()
+        self.assertEqual(process.exitcode, 0)
+        self.assertEqual(wait_lines('closed', 1), [str(process.pid)])
+        self.assertFalse(os.path.exists(os.path.join(OUTPUT['dir'], 'started')))
@@ -0,0 +1,37 @@
+from typing import Callable
+
+from src.boot.IDatabase import IDatabase
+from src.models.UserModel import UserModel
+
+CREATE_USERS = 'CREATE TABLE users(id int PRIMARY KEY, username text UNIQUE, password text, email text UNIQUE, ' \
+               'active boolean DEFAULT true)'
+
+
+async def create_users(db: IDatabase, count: int, active: Callable[[int], bool] = lambda i: True) -> None:
+    """
+    Create users table and fill it with users 0..count-1 named user{i} with email user{i}@kr.ru
+    :param db: Connected database
+    :type db: IDatabase
+    :param count: Number of users
+    :type count: int
+    :param active: Activity of user by id
+    :type active: Callable[[int], bool]
+    :return: None
+    :rtype: None
+    """
+    await db.insert(CREATE_USERS)
+    await db.insert_many('users', [
+        UserModel(id=i, username='user{}'.format(i), email='user{}@kr.ru'.format(i), active=active(i)).to_row()
+        for i in range(count)
+    ])
+
+
+async def drop_users(db: IDatabase) -> None:
+    """
+    Drop users table made by create_users
+    :param db: Connected database
+    :type db: IDatabase
+    :return: None
+    :rtype: None
+    """
+    await db.insert('DROP TABLE IF EXISTS users')
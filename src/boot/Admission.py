@@ -0,0 +1,96 @@
+import asyncio
+from collections import deque
+from typing import Deque, List, Optional
+
+from src.tools.exceptions import AcquireTimeout, PoolOverloaded
+
+
+class Admission:
+    def __init__(self, capacity: int, max_queue: Optional[int] = None, timeout: Optional[float] = None,
+                 lanes: int = 2) -> None:
+        """
+        Admission control in front of connection pool: at most capacity callers hold connections,
+        others wait in priority lanes, lane 0 first and FIFO inside lane
+        :param capacity: Number of callers allowed at once, pool max size
+        :type capacity: int
+        :param max_queue: Maximum number of waiting callers, over it calls raise PoolOverloaded, None is unbounded
+        :type max_queue: Optional[int]
+        :param timeout: Seconds caller waits before AcquireTimeout is raised, None waits forever
+        :type timeout: Optional[float]
+        :param lanes: Number of priority lanes
+        :type lanes: int
+        """
+        assert capacity > 0, 'Admission capacity must be positive'
+        assert max_queue is None or max_queue >= 0, 'Admission max_queue must not be negative'
+        assert timeout is None or timeout > 0, 'Admission timeout must be positive'
+        self.capacity = capacity
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.active = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.max_queued = 0
+        self._lanes: List[Deque[asyncio.Future]] = [deque() for _ in range(lanes)]
+
+    @property
+    def queued(self) -> int:
+        return sum(len(lane) for lane in self._lanes)
+
+    async def acquire(self, lane: int = 0) -> None:
+        """
+        Wait for free slot, must be followed by release
+        :param lane: Priority lane, lower lanes are admitted first
+        :type lane: int
+        :return: None
+        :rtype: None
+        """
+        queued = self.queued
+        if self.active < self.capacity and queued == 0:
+            self.active += 1
+            self.admitted += 1
+            return
+        if self.max_queue is not None and queued >= self.max_queue:
+            self.rejected += 1
+            raise PoolOverloaded('{} calls are waiting for connection'.format(queued))
+        future = asyncio.get_running_loop().create_future()
+        waiters = self._lanes[lane]
+        waiters.append(future)
+        self.max_queued = max(self.max_queued, queued + 1)
+        try:
+            await asyncio.wait_for(future, self.timeout)
+        except BaseException as error:
+            if future.done() and not future.cancelled():
+                # slot was handed over just before timeout or cancellation, pass it on
+                self.release()
+            elif future in waiters:
+                waiters.remove(future)
+            if isinstance(error, asyncio.TimeoutError):
+                self.timeouts += 1
+                raise AcquireTimeout('connection was not acquired in {}s'.format(self.timeout)) from None
+            raise
+        self.admitted += 1
+
+    def release(self) -> None:
+        """
+        Free slot taken by acquire, slot is handed over to first waiter of lowest lane
+        :return: None
+        :rtype: None
+        """
+        for waiters in self._lanes:
+            while waiters:
+                future = waiters.popleft()
+                if not future.done():
+                    future.set_result(None)
+                    return
+        self.active -= 1
+
+    def info(self) -> dict:
+        """
+        Admission statistics
+        :return: dict with capacity, active, queued, queued per lane, max_queued, admitted, rejected and timeouts
+        :rtype: dict
+        """
+        return dict(capacity=self.capacity, active=self.active, queued=self.queued,
+                    lanes=[len(waiters) for waiters in self._lanes], max_queued=self.max_queued,
+                    admitted=self.admitted, rejected=self.rejected, timeouts=self.timeouts)
@@ -0,0 +1,109 @@
+import asyncio
+import importlib
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Optional, Sequence
+
+from src.boot.Config import Config, IConfig
+from src.boot.IDatabase import IDatabase
+
+logger = logging.getLogger(__name__)
+
+
+class Boot:
+    def __init__(self, config_factory: Callable[[], IConfig] = Config.from_env,
+                 database_factory: Optional[Callable[[IConfig], IDatabase]] = None,
+                 startup: Sequence[Callable[[IConfig], Awaitable[None]]] = ()) -> None:
+        """
+        Worker startup: loads config, imports database driver only when it is needed
+        and opens database pool concurrently with other startup hooks, timing every step
+        :param config_factory: Creates config, Config.from_env by default
+        :type config_factory: Callable[[], IConfig]
+        :param database_factory: Creates database from config, src.boot.Database.Database imported on start by default
+        :type database_factory: Optional[Callable[[IConfig], IDatabase]]
+        :param startup: Hooks run concurrently with database connect, e.g. to warm caches
+        :type startup: Sequence[Callable[[IConfig], Awaitable[None]]]
+        """
+        self._config_factory = config_factory
+        self._database_factory = database_factory
+        self._startup = tuple(startup)
+        self._ready: Optional[asyncio.Event] = None
+        self.config: Optional[IConfig] = None
+        self.db: Optional[IDatabase] = None
+        self.timings: Dict[str, float] = {}
+
+    @property
+    def ready(self) -> asyncio.Event:
+        """
+        Event set when start finished, cleared by stop
+        :return: Readiness event
+        :rtype: asyncio.Event
+        """
+        if self._ready is None:
+            self._ready = asyncio.Event()
+        return self._ready
+
+    def import_module(self, name: str):
+        """
+        Import module and record import time, e.g. to load heavy dependencies when they are needed
+        :param name: Module name
+        :type name: str
+        :return: Imported module
+        :rtype: module
+        """
+        started = time.perf_counter()
+        module = importlib.import_module(name)
+        self.timings['import ' + name] = time.perf_counter() - started
+        return module
+
+    async def _timed(self, name: str, awaitable: Awaitable[None]) -> None:
+        started = time.perf_counter()
+        await awaitable
+        self.timings[name] = time.perf_counter() - started
+
+    async def start(self) -> IDatabase:
+        """
+        Load config, create database and connect it while startup hooks run,
+        if some step fails database is closed and error is raised
+        :return: Connected database
+        :rtype: IDatabase
+        """
+        started = time.perf_counter()
+        self.config = self._config_factory()
+        self.timings['config'] = time.perf_counter() - started
+        database_factory = self._database_factory
+        if database_factory is None:
+            database_factory = self.import_module('src.boot.Database').Database
+        self.db = database_factory(self.config)
+        steps = [self._timed('connect', self.db.connect())]
+        steps += [self._timed(getattr(hook, '__name__', repr(hook)), hook(self.config)) for hook in self._startup]
+        results = await asyncio.gather(*steps, return_exceptions=True)
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if errors:
+            # connect may fail after pools are opened, so database is closed in any case
+            await self.db.close()
+            self.db = None
+            raise errors[0]
+        self.timings['total'] = time.perf_counter() - started
+        logger.info('boot finished in %.3fs: %s', self.timings['total'],
+                    ', '.join('{} {:.3f}s'.format(name, timing) for name, timing in self.timings.items()
+                              if name != 'total'))
+        self.ready.set()
+        return self.db
+
+    async def stop(self) -> None:
+        """
+        Close database opened by start
+        :return: None
+        :rtype: None
+        """
+        self.ready.clear()
+        if self.db is not None:
+            db, self.db = self.db, None
+            await db.close()
+
+    async def __aenter__(self) -> IDatabase:
+        return await self.start()
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.stop()
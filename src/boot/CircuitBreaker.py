@@ -0,0 +1,89 @@
+import time
+from typing import Awaitable, Callable, TypeVar
+
+from src.tools.exceptions import CircuitOpen
+
+T = TypeVar('T')
+
+
+class CircuitBreaker:
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 10.0) -> None:
+        """
+        Circuit breaker in front of database: after failure_threshold consecutive failures calls raise CircuitOpen
+        without waiting for connection, after reset_timeout one probe call is let through,
+        its success closes circuit and its failure opens it again
+        :param failure_threshold: Consecutive failures opening circuit
+        :type failure_threshold: int
+        :param reset_timeout: Seconds circuit stays open before probe
+        :type reset_timeout: float
+        """
+        assert failure_threshold > 0, 'failure_threshold must be positive'
+        assert reset_timeout > 0, 'reset_timeout must be positive'
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened = 0
+        self.rejected = 0
+        self._open_until = 0.0
+        self._state = self.CLOSED
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and self._open_until <= time.monotonic():
+            return self.HALF_OPEN
+        return self._state
+
+    def _open(self) -> None:
+        self._state = self.OPEN
+        self._open_until = time.monotonic() + self.reset_timeout
+        self.opened += 1
+
+    async def call(self, call: Callable[[], Awaitable[T]], failure: Callable[[BaseException], bool]) -> T:
+        """
+        Await call unless circuit is open
+        :param call: Function creating awaitable
+        :type call: Callable[[], Awaitable[T]]
+        :param failure: Whether error means database is unavailable, other errors count as success
+        :type failure: Callable[[BaseException], bool]
+        :return: Result of call
+        :rtype: T
+        """
+        state = self.state
+        if state == self.OPEN or (state == self.HALF_OPEN and self._state == self.HALF_OPEN):
+            # in half open state only one probe is in flight
+            self.rejected += 1
+            raise CircuitOpen('database is unavailable after {} failures'.format(self.failures))
+        self._state = state
+        try:
+            result = await call()
+        except Exception as error:
+            if not failure(error):
+                self._close()
+            else:
+                self.failures += 1
+                if state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                    self._open()
+            raise
+        except BaseException:
+            if state == self.HALF_OPEN:
+                # probe was cancelled, next call probes again
+                self._state = self.OPEN
+            raise
+        self._close()
+        return result
+
+    def _close(self) -> None:
+        self._state = self.CLOSED
+        self.failures = 0
+
+    def info(self) -> dict:
+        """
+        Circuit breaker statistics
+        :return: dict with state, consecutive failures, times circuit opened and calls rejected
+        :rtype: dict
+        """
+        return dict(state=self.state, failures=self.failures, opened=self.opened, rejected=self.rejected)
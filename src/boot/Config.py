@@ -1,11 +1,14 @@
 import abc
 import os
+from typing import Callable, List, Optional, Tuple, Union
 
 
 class IConfig(abc.ABC):
     @abc.abstractmethod
     def __init__(self, port: int, db_host: str, db_port: int, db_name: str, db_user: str,
-                 db_password: str) -> None:
+                 db_password: str, db_replicas: Optional[List[Tuple[str, int]]] = None, db_min_size: int = 10,
+                 db_max_size: int = 10, db_max_queries: int = 50000, db_max_inactive_lifetime: float = 300.0,
+                 db_command_timeout: Optional[float] = None, db_statement_cache_size: int = 100) -> None:
         """
         Config constructor from properties value
         :param port: Server port number
@@ -20,7 +23,34 @@ class IConfig(abc.ABC):
         :type db_user: str
         :param db_password: Password to connect to database
         :type db_password: str
+        :param db_replicas: Read replicas hosts and ports, same database and credentials are used
+        :type db_replicas: Optional[List[Tuple[str, int]]]
+        :param db_min_size: Connections opened by every pool on connect and kept open
+        :type db_min_size: int
+        :param db_max_size: Maximum connections of every pool
+        :type db_max_size: int
+        :param db_max_queries: Queries after which connection is replaced by new one
+        :type db_max_queries: int
+        :param db_max_inactive_lifetime: Seconds after which idle connection is closed, 0 to keep it open
+        :type db_max_inactive_lifetime: float
+        :param db_command_timeout: Default seconds limit of one statement, None for no limit
+        :type db_command_timeout: Optional[float]
+        :param db_statement_cache_size: Prepared statements cached per connection, 0 disables cache
+        :type db_statement_cache_size: int
         """
+        assert 0 <= db_min_size <= db_max_size, 'db_min_size must be between 0 and db_max_size'
+        assert db_max_size > 0, 'db_max_size must be positive'
+        assert db_max_queries > 0, 'db_max_queries must be positive'
+        assert db_max_inactive_lifetime >= 0, 'db_max_inactive_lifetime must not be negative'
+        assert db_command_timeout is None or db_command_timeout > 0, 'db_command_timeout must be positive'
+        assert db_statement_cache_size >= 0, 'db_statement_cache_size must not be negative'
+        self.db_statement_cache_size = db_statement_cache_size
+        self.db_command_timeout = db_command_timeout
+        self.db_max_inactive_lifetime = db_max_inactive_lifetime
+        self.db_max_queries = db_max_queries
+        self.db_max_size = db_max_size
+        self.db_min_size = db_min_size
+        self.db_replicas = list(db_replicas or [])
         self.db_password = db_password
         self.db_user = db_user
         self.db_name = db_name
@@ -38,12 +68,45 @@ class IConfig(abc.ABC):
         db_user from DB_USER
         db_port from DB_PORT
         db_password from DB_PASSWORD
+        db_replicas from optional DB_REPLICAS, comma separated host or host:port, port defaults to DB_PORT
+        db_min_size from optional DB_MIN_SIZE
+        db_max_size from optional DB_MAX_SIZE
+        db_max_queries from optional DB_MAX_QUERIES
+        db_max_inactive_lifetime from optional DB_MAX_INACTIVE_LIFETIME
+        db_command_timeout from optional DB_COMMAND_TIMEOUT
+        db_statement_cache_size from optional DB_STATEMENT_CACHE_SIZE
         :return: Config object
         :rtype: IConfig
         """
         raise NotImplementedError
 
 
+def env_number(name: str, cast: Callable[[str], Union[int, float]], default: Optional[Union[int, float]],
+               minimum: Union[int, float] = 0) -> Optional[Union[int, float]]:
+    """
+    Read optional numeric environment variable, raises AssertionError if value is wrong
+    :param name: Environment variable name
+    :type name: str
+    :param cast: int or float
+    :type cast: Callable[[str], Union[int, float]]
+    :param default: Value if variable not exists
+    :type default: Optional[Union[int, float]]
+    :param minimum: Minimal allowed value
+    :type minimum: Union[int, float]
+    :return: Variable value
+    :rtype: Optional[Union[int, float]]
+    """
+    value_str = os.getenv(name)
+    if value_str is None:
+        return default
+    try:
+        value = cast(value_str)
+    except ValueError:
+        raise AssertionError('{} environment variable not {}'.format(name, 'an integer' if cast is int else 'a number'))
+    assert value >= minimum, '{} environment variable less than {}'.format(name, minimum)
+    return value
+
+
 class Config(IConfig):
     @classmethod
     def from_env(cls) -> 'IConfig':
@@ -67,9 +130,28 @@ class Config(IConfig):
         assert db_user is not None, 'DB_USER environment variable not exists'
         db_password = os.getenv('DB_PASSWORD')
         assert db_password is not None, 'DB_PASSWORD environment variable not exists'
+        db_replicas = []
+        for replica in filter(None, (r.strip() for r in os.getenv('DB_REPLICAS', '').split(','))):
+            replica_host, _, replica_port_str = replica.partition(':')
+            try:
+                replica_port = int(replica_port_str) if replica_port_str else db_port
+            except ValueError:
+                raise AssertionError('DB_REPLICAS environment variable port not an integer')
+            db_replicas.append((replica_host, replica_port))
+        db_min_size = env_number('DB_MIN_SIZE', int, 10)
+        db_max_size = env_number('DB_MAX_SIZE', int, max(10, db_min_size), minimum=1)
+        assert db_min_size <= db_max_size, 'DB_MIN_SIZE environment variable greater than DB_MAX_SIZE'
         conf = Config(port=port, db_port=db_port, db_name=db_name, db_user=db_user, db_password=db_password,
-                      db_host=db_host)
+                      db_host=db_host, db_replicas=db_replicas, db_min_size=db_min_size, db_max_size=db_max_size,
+                      db_max_queries=env_number('DB_MAX_QUERIES', int, 50000, minimum=1),
+                      db_max_inactive_lifetime=env_number('DB_MAX_INACTIVE_LIFETIME', float, 300.0),
+                      db_command_timeout=env_number('DB_COMMAND_TIMEOUT', float, None, minimum=0.001),
+                      db_statement_cache_size=env_number('DB_STATEMENT_CACHE_SIZE', int, 100))
         return conf
 
-    def __init__(self, port: int, db_host: str, db_port: int, db_name: str, db_user: str, db_password: str) -> None:
-        super().__init__(port, db_host, db_port, db_name, db_user, db_password)
+    def __init__(self, port: int, db_host: str, db_port: int, db_name: str, db_user: str, db_password: str,
+                 db_replicas: Optional[List[Tuple[str, int]]] = None, db_min_size: int = 10, db_max_size: int = 10,
+                 db_max_queries: int = 50000, db_max_inactive_lifetime: float = 300.0,
+                 db_command_timeout: Optional[float] = None, db_statement_cache_size: int = 100) -> None:
+        super().__init__(port, db_host, db_port, db_name, db_user, db_password, db_replicas, db_min_size, db_max_size,
+                         db_max_queries, db_max_inactive_lifetime, db_command_timeout, db_statement_cache_size)
@@ -1,112 +1,703 @@
-import abc
+import asyncio
+import contextlib
+import time
+from contextvars import ContextVar
+
 import asyncpg
 from datetime import datetime
-from typing import Tuple, List, Union
+from typing import Tuple, List, Union, Iterable, Iterator, Optional, Sequence, AsyncIterator, Callable, Awaitable, \
+    TypeVar, AsyncContextManager, Set, Dict, Any
 from src.tools.exceptions import RowNotFound, WrongTableNameQuery
+from src.tools.LRUCache import LRUCache
+from src.boot.Admission import Admission
+from src.boot.CircuitBreaker import CircuitBreaker
+from src.boot.RetryPolicy import RetryPolicy
+from src.tools.columnar import POSTGRES_DTYPES, to_columns
 
 from src.boot.Config import IConfig
+from src.boot.Instrumentation import QueryEvent
+# interface and query helpers live in IDatabase module, which does not import asyncpg
+from src.boot.IDatabase import IDatabase, split_rows, split_table, written_table, quote_ident, quote_table
+
+T = TypeVar('T')
+
+
+class PreparedConnection(asyncpg.Connection):
+    """
+    Connection which mirrors keys of asyncpg per-connection prepared statements cache.
+    asyncpg evicts statements in LRU order, so mirror shows which queries skip parse/plan step.
+    """
+    statements: LRUCache
+
+
+# errors after which server or connection to it is lost, they are counted by circuit breaker and eject replica
+CONNECTION_FAILURES = (OSError, asyncpg.PostgresConnectionError, asyncpg.ConnectionDoesNotExistError,
+                       asyncpg.CannotConnectNowError, asyncpg.AdminShutdownError, asyncpg.CrashShutdownError)
+# errors after which repeated statement may succeed
+TRANSIENT_ERRORS = CONNECTION_FAILURES + (asyncpg.SerializationError, asyncpg.DeadlockDetectedError)
 
 
-class IDatabase(abc.ABC):
-    @abc.abstractmethod
-    def __init__(self, config: IConfig) -> None:
+def is_connection_failure(error: BaseException) -> bool:
+    # asyncio.TimeoutError is OSError since python 3.11, slow statement does not mean server is down
+    return isinstance(error, CONNECTION_FAILURES) and not isinstance(error, asyncio.TimeoutError)
+
+
+def is_transient(error: BaseException) -> bool:
+    return isinstance(error, TRANSIENT_ERRORS) and not isinstance(error, asyncio.TimeoutError)
+
+
+class Replica:
+    def __init__(self, host: str, port: int, admission: Admission) -> None:
+        """
+        Read replica pool with health state
+        :param host: Replica host address
+        :type host: str
+        :param port: Replica port number
+        :type port: int
+        :param admission: Admission control of replica pool
+        :type admission: Admission
+        """
+        self.host = host
+        self.port = port
+        self.admission = admission
+        self.pool: Optional[asyncpg.pool.Pool] = None
+        self.ejected_until = 0.0
+        self.ejections = 0
+        self.reads = 0
+        self.name = '{}:{}'.format(host, port)
+
+    def busy(self) -> int:
+        return 0 if self.pool is None else self.pool.get_size() - self.pool.get_idle_size()
+
+    def info(self, now: float) -> dict:
+        return dict(host=self.host, port=self.port, healthy=self.ejected_until <= now, ejections=self.ejections,
+                    reads=self.reads, busy=self.busy())
+
+
+class BoundTransaction:
+    __slots__ = ('connection', 'written')
+
+    def __init__(self, connection: PreparedConnection) -> None:
+        """
+        Connection of transaction opened by Database.transaction and tables written in it
+        :param connection: Connection transaction runs on
+        :type connection: PreparedConnection
+        """
+        self.connection = connection
+        self.written: Set[Optional[str]] = set()
+
+
+class Database(IDatabase):
+    MAX_STATEMENT_SIZE = 1024 * 15
+    MAX_DESCRIPTIONS = 1024
+    COPY_THRESHOLD = 1000
+    ROUND_ROBIN = 'round_robin'
+    LEAST_BUSY = 'least_busy'
+    # admission lanes, interactive calls are admitted before bulk ones
+    INTERACTIVE = 0
+    BULK = 1
+
+    def __init__(self, config: IConfig, statement_cache_size: Optional[int] = None, replica_policy: str = ROUND_ROBIN,
+                 eject_seconds: float = 30.0, pin_after_write: float = 0.0,
+                 setup: Optional[Callable[[PreparedConnection], Awaitable[None]]] = None, warm_up: bool = False,
+                 warm_up_queries: Sequence[Tuple[str, tuple]] = (), transactional: bool = False,
+                 max_queue: Optional[int] = None, acquire_timeout: Optional[float] = None,
+                 retry: Optional[RetryPolicy] = None, circuit_breaker: Optional[CircuitBreaker] = None):
         """
-        Database constructor
+        Database on asyncpg pools, reads are sent to config.db_replicas if there are any
         :param config: IConfig-like object
         :type config: IConfig
+        :param statement_cache_size: Prepared statements cached per connection, config value by default
+        :type statement_cache_size: Optional[int]
+        :param replica_policy: How replica is chosen for read, ROUND_ROBIN or LEAST_BUSY
+        :type replica_policy: str
+        :param eject_seconds: Seconds replica is not used after connection failure
+        :type eject_seconds: float
+        :param pin_after_write: Seconds reads of the same task go to primary after its write
+        :type pin_after_write: float
+        :param setup: Hook called once for every new connection, e.g. to register type codecs,
+        session settings are reset when connection is released
+        :type setup: Optional[Callable[[PreparedConnection], Awaitable[None]]]
+        :param warm_up: Run warm_up on connect
+        :type warm_up: bool
+        :param warm_up_queries: Queries with arguments run by warm_up on every connection to prepare them
+        :type warm_up_queries: Sequence[Tuple[str, tuple]]
+        :param transactional: Wrap every single statement outside of transaction() in its own transaction
+        :type transactional: bool
+        :param max_queue: Calls waiting for connection of one pool, over it calls raise PoolOverloaded,
+        None is unbounded
+        :type max_queue: Optional[int]
+        :param acquire_timeout: Seconds call waits for connection before AcquireTimeout is raised, None waits forever
+        :type acquire_timeout: Optional[float]
+        :param retry: Policy repeating reads, writes inside retryable() and run_in_transaction bodies
+        after transient errors, None does not retry
+        :type retry: Optional[RetryPolicy]
+        :param circuit_breaker: Breaker failing calls fast after consecutive connection failures, None always calls
+        :type circuit_breaker: Optional[CircuitBreaker]
         """
-        self._config = config
+        super().__init__(config)
+        assert replica_policy in (self.ROUND_ROBIN, self.LEAST_BUSY), 'Unknown replica policy'
+        self._pool: asyncpg.pool.Pool = None
+        if statement_cache_size is None:
+            statement_cache_size = config.db_statement_cache_size
+        self._statement_cache_size = statement_cache_size
+        self._admission = Admission(config.db_max_size, max_queue, acquire_timeout)
+        self._replicas: List[Replica] = [Replica(host, port, Admission(config.db_max_size, max_queue, acquire_timeout))
+                                         for host, port in config.db_replicas]
+        self._lane: ContextVar[Optional[int]] = ContextVar('admission_lane', default=None)
+        self._replica_policy = replica_policy
+        self._next_replica = 0
+        self._eject_seconds = eject_seconds
+        self._pin_after_write = pin_after_write
+        self._pinned_until: ContextVar[float] = ContextVar('pinned_until', default=0.0)
+        self._setup = setup
+        self._warm_up = warm_up
+        self._warm_up_queries = tuple(warm_up_queries)
+        self._transactional = transactional
+        self._bound: ContextVar[Optional[BoundTransaction]] = ContextVar('bound_transaction', default=None)
+        self._retry = retry
+        self._circuit_breaker = circuit_breaker
+        self._retry_writes: ContextVar[bool] = ContextVar('retry_writes', default=False)
+        self._table_types: Dict[str, Dict[str, str]] = {}
+        # names and dtypes of fetchColumns results by query
+        self._descriptions = LRUCache(self.MAX_DESCRIPTIONS)
+        self.statement_hits = 0
+        self.statement_misses = 0
+
+    def _create_pool(self, host: str, port: int) -> Awaitable[asyncpg.pool.Pool]:
+        config = self._config
+        return asyncpg.create_pool(host=host, port=port, user=config.db_user, password=config.db_password,
+                                   database=config.db_name, min_size=config.db_min_size, max_size=config.db_max_size,
+                                   max_queries=config.db_max_queries,
+                                   max_inactive_connection_lifetime=config.db_max_inactive_lifetime,
+                                   command_timeout=config.db_command_timeout, connection_class=PreparedConnection,
+                                   init=self._init_connection, statement_cache_size=self._statement_cache_size,
+                                   max_cached_statement_lifetime=0,
+                                   max_cacheable_statement_size=self.MAX_STATEMENT_SIZE)
 
-    @abc.abstractmethod
     async def connect(self) -> None:
+        config = self._config
+        self._pool: asyncpg.pool.Pool = await self._create_pool(config.db_host, config.db_port)
+        await asyncio.gather(*(self._connect_replica(replica) for replica in self._replicas))
+        if self._warm_up:
+            await self.warm_up()
+
+    async def warm_up(self) -> None:
         """
-        Open connection to database
-        :return:
-        :rtype:
+        Acquire db_min_size connections of every pool at once, so all of them are open and set up,
+        and run warm up queries on each of them, so their statements are prepared before first request
+        :return: None
+        :rtype: None
         """
+        pools = [self._pool] + [replica.pool for replica in self._replicas if replica.pool is not None]
+        await asyncio.gather(*(self._warm_up_pool(pool) for pool in pools))
+
+    async def _warm_up_pool(self, pool: asyncpg.pool.Pool) -> None:
+        acquired = await asyncio.gather(*(pool.acquire() for _ in range(max(pool.get_min_size(), 1))),
+                                        return_exceptions=True)
+        connections = [connection for connection in acquired if not isinstance(connection, BaseException)]
+        try:
+            if len(connections) < len(acquired):
+                raise next(error for error in acquired if isinstance(error, BaseException))
+            await asyncio.gather(*(self._warm_up_connection(connection) for connection in connections))
+        finally:
+            await asyncio.gather(*(pool.release(connection) for connection in connections))
+
+    async def _warm_up_connection(self, connection: PreparedConnection) -> None:
+        for query, args in self._warm_up_queries:
+            await self._execute(connection, query, 'fetch', *args)
 
-    @abc.abstractmethod
     async def close(self) -> None:
+        # connect may have failed partway, so only opened pools are closed
+        await asyncio.gather(*(replica.pool.close() for replica in self._replicas if replica.pool is not None))
+        if self._pool is not None:
+            await self._pool.close()
+
+    async def _connect_replica(self, replica: Replica) -> Optional[asyncpg.pool.Pool]:
+        if replica.pool is None:
+            try:
+                replica.pool = await self._create_pool(replica.host, replica.port)
+            except Exception as error:
+                # timed out connect means replica is unreachable
+                if not is_connection_failure(error) and not isinstance(error, asyncio.TimeoutError):
+                    raise
+                self._eject(replica)
+        return replica.pool
+
+    def _eject(self, replica: Replica) -> None:
+        replica.ejected_until = time.monotonic() + self._eject_seconds
+        replica.ejections += 1
+
+    def _choose_replica(self) -> Optional[Replica]:
+        if not self._replicas:
+            return None
+        now = time.monotonic()
+        if self._pinned_until.get() > now:
+            return None
+        healthy = [replica for replica in self._replicas if replica.ejected_until <= now]
+        if not healthy:
+            return None
+        if self._replica_policy == self.LEAST_BUSY:
+            return min(healthy, key=Replica.busy)
+        self._next_replica += 1
+        return healthy[self._next_replica % len(healthy)]
+
+    def in_transaction(self) -> bool:
+        return self._bound.get() is not None
+
+    def _notify_write(self, table: Optional[str]) -> None:
+        bound = self._bound.get()
+        if bound is not None:
+            # listeners are notified after commit, so they do not read rows which may be rolled back
+            bound.written.add(table)
+        else:
+            super()._notify_write(table)
+
+    def _single_statement(self, connection: PreparedConnection) -> AsyncContextManager:
+        if self._transactional and not connection.is_in_transaction():
+            return connection.transaction()
+        return contextlib.nullcontext()
+
+    @contextlib.asynccontextmanager
+    async def transaction(self, isolation: Optional[str] = None, readonly: bool = False,
+                          deferrable: bool = False) -> AsyncIterator[None]:
+        bound = self._bound.get()
+        if bound is not None:
+            async with bound.connection.transaction():
+                yield
+            return
+        async with self._acquire(self._pool, self._admission, self.INTERACTIVE) as connection:
+            bound = BoundTransaction(connection)
+            token = self._bound.set(bound)
+            try:
+                async with connection.transaction(isolation=isolation, readonly=readonly, deferrable=deferrable):
+                    yield
+            finally:
+                self._bound.reset(token)
+                # after rollback too, listeners may have seen rows of other tasks written meanwhile
+                for table in bound.written:
+                    self._notify_write(table)
+
+    @staticmethod
+    async def _timed(operation: Callable[[PreparedConnection], Awaitable[T]], connection: PreparedConnection,
+                     event: Optional[QueryEvent], pool: str) -> T:
+        if event is None:
+            return await operation(connection)
+        event.acquired(pool)
+        result = await operation(connection)
+        event.executed()
+        return result
+
+    @contextlib.asynccontextmanager
+    async def _acquire(self, pool: asyncpg.pool.Pool, admission: Admission,
+                       lane: int) -> AsyncIterator[PreparedConnection]:
+        override = self._lane.get()
+        await admission.acquire(lane if override is None else override)
+        try:
+            async with pool.acquire() as connection:
+                yield connection
+        finally:
+            admission.release()
+
+    @contextlib.contextmanager
+    def priority(self, lane: int) -> Iterator[None]:
         """
-        Close connection
-        :return: None
-        :rtype: None
+        Admit calls of current task in given lane inside with block, e.g. BULK for background jobs reads
+        :param lane: Admission lane, INTERACTIVE or BULK
+        :type lane: int
+        :return: Context manager
+        :rtype: Iterator[None]
+        """
+        token = self._lane.set(lane)
+        try:
+            yield
+        finally:
+            self._lane.reset(token)
+
+    @contextlib.asynccontextmanager
+    async def _read_connection(self, event: Optional[QueryEvent] = None,
+                               lane: int = INTERACTIVE) -> AsyncIterator[PreparedConnection]:
+        bound = self._bound.get()
+        if bound is not None:
+            if event is not None:
+                event.acquired('transaction')
+            yield bound.connection
+            return
+        replica = self._choose_replica()
+        if replica is not None:
+            pool = await self._connect_replica(replica)
+            if pool is not None:
+                async with contextlib.AsyncExitStack() as stack:
+                    try:
+                        connection = await stack.enter_async_context(self._acquire(pool, replica.admission, lane))
+                    except Exception as error:
+                        if not is_connection_failure(error):
+                            raise
+                        self._eject(replica)
+                    else:
+                        replica.reads += 1
+                        if event is not None:
+                            event.acquired(replica.name)
+                        yield connection
+                        return
+        async with self._acquire(self._pool, self._admission, lane) as connection:
+            if event is not None:
+                event.acquired()
+            yield connection
+
+    async def _guarded(self, call: Callable[[], Awaitable[T]], retryable: bool) -> T:
+        async def attempt() -> T:
+            if self._circuit_breaker is None:
+                return await call()
+            return await self._circuit_breaker.call(call, is_connection_failure)
+
+        if self._retry is None or not retryable:
+            return await attempt()
+        return await self._retry.run(attempt, is_transient)
+
+    async def _run_read(self, operation: Callable[[PreparedConnection], Awaitable[T]],
+                        event: Optional[QueryEvent] = None, lane: int = INTERACTIVE) -> T:
+        bound = self._bound.get()
+        if bound is not None:
+            # statement failed inside transaction aborts it, so it is not repeated alone
+            return await self._timed(operation, bound.connection, event, 'transaction')
+        return await self._guarded(lambda: self._run_read_once(operation, event, lane), True)
+
+    async def _run_read_once(self, operation: Callable[[PreparedConnection], Awaitable[T]],
+                             event: Optional[QueryEvent], lane: int) -> T:
+        replica = self._choose_replica()
+        if replica is not None and await self._connect_replica(replica) is not None:
+            try:
+                async with self._acquire(replica.pool, replica.admission, lane) as connection:
+                    replica.reads += 1
+                    return await self._timed(operation, connection, event, replica.name)
+            except Exception as error:
+                # timed out or failed statement is not repeated, only read on lost replica is repeated on primary
+                if not is_connection_failure(error):
+                    raise
+                self._eject(replica)
+        async with self._acquire(self._pool, self._admission, lane) as connection:
+            return await self._timed(operation, connection, event, 'primary')
+
+    async def _run_write(self, operation: Callable[[PreparedConnection], Awaitable[T]],
+                         event: Optional[QueryEvent] = None, lane: int = INTERACTIVE) -> T:
+        bound = self._bound.get()
+        if bound is not None:
+            return await self._timed(operation, bound.connection, event, 'transaction')
+
+        async def write() -> T:
+            async with self._acquire(self._pool, self._admission, lane) as connection:
+                return await self._timed(operation, connection, event, 'primary')
+        try:
+            return await self._guarded(write, self._retry_writes.get())
+        finally:
+            if self._pin_after_write > 0:
+                self._pinned_until.set(max(self._pinned_until.get(), time.monotonic() + self._pin_after_write))
+
+    @contextlib.contextmanager
+    def retryable(self) -> Iterator[None]:
+        """
+        Repeat writes of current task inside with block after transient errors, only for idempotent writes:
+        write may have been committed when connection was lost, insert_many repeats only chunks not committed
+        :return: Context manager
+        :rtype: Iterator[None]
         """
+        token = self._retry_writes.set(True)
+        try:
+            yield
+        finally:
+            self._retry_writes.reset(token)
 
-    @abc.abstractmethod
-    async def fetchOne(self, query: str) -> Tuple[Tuple[str, Union[str, bool, datetime, int]]]:
+    async def run_in_transaction(self, body: Callable[[], Awaitable[T]], isolation: Optional[str] = None,
+                                 readonly: bool = False, deferrable: bool = False) -> T:
         """
-        Get one row from database async, if row not fetched raises RowNotFound
-        :param query: SQL query
-        :type query: str
-        :return: Fetched row
-        :rtype: Tuple[Tuple[str, Union[str, bool, datetime, int]]]
+        Run body in transaction(), whole transaction is repeated by retry policy after serialization failure,
+        deadlock or lost connection, so body must not have effects outside of database.
+        Inside another transaction body runs in savepoint and is not repeated
+        :param body: Function creating awaitable which uses this database
+        :type body: Callable[[], Awaitable[T]]
+        :param isolation: Transaction isolation level
+        :type isolation: Optional[str]
+        :param readonly: Read only transaction
+        :type readonly: bool
+        :param deferrable: Deferrable transaction
+        :type deferrable: bool
+        :return: Result of body
+        :rtype: T
         """
+        async def attempt() -> T:
+            async with self.transaction(isolation=isolation, readonly=readonly, deferrable=deferrable):
+                return await body()
 
-    @abc.abstractmethod
-    async def fetchMany(self, query: str) -> List[Tuple[Tuple[str, Union[str, bool, datetime, int]]]]:
+        if self._bound.get() is not None:
+            return await attempt()
+        return await self._guarded(attempt, True)
+
+    def retry_info(self) -> dict:
         """
-        Get many row from database async, if no rows found return empty list
-        :param query: SQL query
-        :type query: str
-        :return: Fetched rows
-        :rtype: List[Tuple[Tuple[str, Union[str, bool, datetime, int]]]]
+        Retry policy and circuit breaker statistics
+        :return: dict with retry and circuit dicts, None when they are not used
+        :rtype: dict
         """
+        return dict(retry=None if self._retry is None else self._retry.info(),
+                    circuit=None if self._circuit_breaker is None else self._circuit_breaker.info())
 
-    @abc.abstractmethod
-    async def insert(self, query: str, *args: Union[str, int, bool, datetime]) -> None:
+    @contextlib.contextmanager
+    def pin_primary(self) -> Iterator[None]:
         """
-        Insert row to database
-        :param query: insert query, if query contains other operations, raises WrongInsertQuery
-        :type query:
-        :param args: arguments for insert query
-        :type args: Union[str, int, bool, datetime]
-        :return: None
-        :rtype: None
+        Send reads of current task to primary inside with block, e.g. to read just written rows
+        :return: Context manager
+        :rtype: Iterator[None]
         """
+        token = self._pinned_until.set(float('inf'))
+        try:
+            yield
+        finally:
+            self._pinned_until.reset(token)
 
+    def pool_info(self) -> List[dict]:
+        """
+        Saturation gauges of primary and replicas pools
+        :return: dict with name, size, idle, busy, max_size, saturation (busy / max_size) and queued calls
+        for every open pool
+        :rtype: List[dict]
+        """
+        pools = [('primary', self._pool)] + [(replica.name, replica.pool) for replica in self._replicas]
+        admissions = dict(primary=self._admission, **{replica.name: replica.admission for replica in self._replicas})
+        info = []
+        for name, pool in pools:
+            if pool is None:
+                continue
+            size, idle, max_size = pool.get_size(), pool.get_idle_size(), pool.get_max_size()
+            info.append(dict(name=name, size=size, idle=idle, busy=size - idle, max_size=max_size,
+                             saturation=(size - idle) / max_size, queued=admissions[name].queued))
+        return info
 
-class Database(IDatabase):
-    def __init__(self, config: IConfig):
-        super().__init__(config)
-        self._pool: asyncpg.pool.Pool = None
+    def admission_info(self) -> List[dict]:
+        """
+        Admission control statistics of primary and replicas pools, to shed load before calls time out
+        :return: dict with name, capacity, active, queued, lanes, max_queued, admitted, rejected and timeouts
+        for every pool
+        :rtype: List[dict]
+        """
+        return [dict(name='primary', **self._admission.info())] + \
+            [dict(name=replica.name, **replica.admission.info()) for replica in self._replicas]
 
-    async def connect(self) -> None:
-        config = self._config
-        self._pool: asyncpg.pool.Pool = await asyncpg.create_pool(host=config.db_host, port=config.db_port,
-                                                                  user=config.db_user,
-                                                                  password=config.db_password, database=config.db_name)
+    def replica_info(self) -> List[dict]:
+        """
+        Replicas statistics
+        :return: dict with host, port, healthy, ejections, reads and busy connections for every replica
+        :rtype: List[dict]
+        """
+        now = time.monotonic()
+        return [replica.info(now) for replica in self._replicas]
 
-    async def close(self) -> None:
-        await self._pool.close()
-
-    async def fetchOne(self, query: str) -> Tuple[str, str]:
-        connection: asyncpg.Connection
-        async with self._pool.acquire() as connection:
-            async with connection.transaction():
-                try:
-                    row: asyncpg.Record = await connection.fetchrow(query)
-                    if row is None:
-                        raise RowNotFound
-                    return tuple(row.items())
-                except asyncpg.UndefinedTableError:
-                    raise WrongTableNameQuery
-
-    async def fetchMany(self, query: str) -> List[Tuple[str, str]]:
-        connection: asyncpg.Connection
-        async with self._pool.acquire() as connection:
-            async with connection.transaction():
-                try:
-                    rows: List[asyncpg.Record] = await connection.fetch(query)
-                    return [tuple(r.items()) for r in rows]
-                except asyncpg.UndefinedTableError:
-                    raise WrongTableNameQuery
+    async def _init_connection(self, connection: PreparedConnection) -> None:
+        connection.statements = LRUCache(self._statement_cache_size)
+        if self._setup is not None:
+            await self._setup(connection)
+
+    def _track_statement(self, connection: PreparedConnection, query: str) -> None:
+        if len(query) > self.MAX_STATEMENT_SIZE:
+            return
+        if connection.statements.get(query) is None:
+            self.statement_misses += 1
+            connection.statements.put(query, True)
+        else:
+            self.statement_hits += 1
+
+    async def _execute(self, connection: PreparedConnection, query: str, method: str, *args):
+        # execute without arguments goes by simple query protocol and is not prepared
+        if args or method != 'execute':
+            self._track_statement(connection, query)
+        try:
+            return await getattr(connection, method)(query, *args)
+        except asyncpg.SyntaxOrAccessError:
+            # statements failed to parse or plan are not cached by asyncpg
+            connection.statements.pop(query)
+            raise
+
+    def statement_cache_info(self) -> dict:
+        """
+        Prepared statements cache statistics, summed over all pool connections
+        :return: dict with hits, misses and per-connection maxsize
+        :rtype: dict
+        """
+        return dict(hits=self.statement_hits, misses=self.statement_misses, maxsize=self._statement_cache_size)
+
+    async def fetchOne(self, query: str, *args: Union[str, int, bool, datetime], raw: bool = False) -> Tuple[str, str]:
+        async def operation(connection: PreparedConnection) -> asyncpg.Record:
+            async with self._single_statement(connection):
+                return await self._execute(connection, query, 'fetchrow', *args)
+
+        with self._observe(query) as event:
+            try:
+                row: asyncpg.Record = await self._run_read(operation, event)
+            except asyncpg.UndefinedTableError:
+                raise WrongTableNameQuery
+            if row is None:
+                raise RowNotFound
+            if not raw:
+                row = tuple(row.items())
+            if event is not None:
+                event.decoded()
+                event.rows = 1
+            return row
+
+    async def fetchMany(self, query: str, *args: Union[str, int, bool, datetime],
+                        raw: bool = False) -> List[Tuple[str, str]]:
+        async def operation(connection: PreparedConnection) -> List[asyncpg.Record]:
+            async with self._single_statement(connection):
+                return await self._execute(connection, query, 'fetch', *args)
+
+        with self._observe(query) as event:
+            try:
+                rows: List[asyncpg.Record] = await self._run_read(operation, event)
+            except asyncpg.UndefinedTableError:
+                raise WrongTableNameQuery
+            if not raw:
+                rows = [tuple(r.items()) for r in rows]
+            if event is not None:
+                event.decoded()
+                event.rows = len(rows)
+            return rows
+
+    async def fetchColumns(self, query: str, *args: Union[str, int, bool, datetime]) -> Dict[str, Any]:
+        """
+        Columns names and types are read once per query from statement description, so result without rows
+        has empty arrays of right dtypes, timestamps with time zone are converted to UTC.
+        Rows are fetched by statement cached in connection like other queries
+        """
+        async def operation(connection: PreparedConnection) -> Tuple[tuple, List[asyncpg.Record]]:
+            async with self._single_statement(connection):
+                rows = await self._execute(connection, query, 'fetch', *args)
+                description = self._descriptions.get(query)
+                # description is read again if result columns changed, e.g. after ALTER TABLE of SELECT *
+                if description is None or rows and list(rows[0].keys()) != description[0]:
+                    attributes = (await connection.prepare(query)).get_attributes()
+                    description = ([attribute.name for attribute in attributes],
+                                   [POSTGRES_DTYPES.get(attribute.type.name, 'object') for attribute in attributes])
+                    self._descriptions.put(query, description)
+                return description, rows
+
+        with self._observe(query) as event:
+            try:
+                (names, dtypes), rows = await self._run_read(operation, event)
+            except asyncpg.UndefinedTableError:
+                raise WrongTableNameQuery
+            columns = to_columns(names, rows, dtypes)
+            if event is not None:
+                event.decoded()
+                event.rows = len(rows)
+            return columns
+
+    async def stream(self, query: str, *args: Union[str, int, bool, datetime], batch_size: int = 100,
+                     batches: bool = False, raw: bool = False) -> AsyncIterator[Union[Tuple[str, str], List[Tuple[str, str]]]]:
+        assert batch_size > 0, 'batch_size must be positive'
+        connection: PreparedConnection
+        with self._observe(query) as event:
+            async with self._read_connection(event, self.BULK) as connection:
+                # cursors live only inside transaction
+                async with contextlib.nullcontext() if connection.is_in_transaction() else connection.transaction():
+                    try:
+                        cursor: asyncpg.cursor.Cursor = await self._execute(connection, query, 'cursor', *args)
+                    except asyncpg.UndefinedTableError:
+                        raise WrongTableNameQuery
+                    while True:
+                        if event is not None:
+                            event.resume()
+                        rows: List[asyncpg.Record] = await cursor.fetch(batch_size)
+                        if event is not None:
+                            event.executed()
+                            event.rows += len(rows)
+                        decoded = rows if raw else [tuple(r.items()) for r in rows]
+                        if event is not None:
+                            event.decoded()
+                        if batches:
+                            if decoded:
+                                yield decoded
+                        else:
+                            for r in decoded:
+                                yield r
+                        if len(rows) < batch_size:
+                            break
 
     async def insert(self, query: str, *args: Union[str, int, datetime]) -> None:
-        connection: asyncpg.Connection
-        async with self._pool.acquire() as connection:
-            async with connection.transaction():
-                try:
-                    await connection.execute(query, *args)
-                except asyncpg.UndefinedTableError:
-                    raise WrongTableNameQuery
+        async def operation(connection: PreparedConnection) -> None:
+            async with self._single_statement(connection):
+                await self._execute(connection, query, 'execute', *args)
+
+        with self._observe(query) as event:
+            try:
+                await self._run_write(operation, event)
+            except asyncpg.UndefinedTableError:
+                raise WrongTableNameQuery
+        self._notify_write(written_table(query))
+
+    async def insert_many(self, table: str,
+                          rows: Iterable[Union[Tuple[Tuple[str, Union[str, bool, datetime, int]]],
+                                               Tuple[Union[str, bool, datetime, int]]]],
+                          columns: Optional[Sequence[str]] = None, chunk_size: int = 10000) -> None:
+        assert chunk_size > 0, 'chunk_size must be positive'
+        columns, records = split_rows(rows, columns)
+        if not records:
+            return
+        schema, name = split_table(table)
+        target = quote_table(table)
+        if columns is not None:
+            target += '(' + ', '.join(quote_ident(column) for column in columns) + ')'
+        query = 'INSERT INTO {} VALUES ({})'.format(target, ', '.join('$' + str(i + 1) for i in range(len(records[0]))))
+
+        committed = 0
+
+        async def operation(connection: PreparedConnection) -> None:
+            nonlocal committed
+            # repeated operation continues after chunks committed by failed attempt
+            for start in range(committed, len(records), chunk_size):
+                chunk = records[start:start + chunk_size]
+                async with connection.transaction():
+                    if len(chunk) >= self.COPY_THRESHOLD:
+                        await connection.copy_records_to_table(name, records=chunk, columns=columns,
+                                                               schema_name=schema)
+                    else:
+                        await self._execute(connection, query, 'executemany', chunk)
+                committed = start + len(chunk)
+                self._notify_write(name)
+
+        with self._observe(query) as event:
+            try:
+                await self._run_write(operation, event, self.BULK)
+            except asyncpg.UndefinedTableError:
+                raise WrongTableNameQuery
+            if event is not None:
+                event.rows = len(records)
+
+    async def _column_types(self, table: str, columns: Sequence[str]) -> List[Optional[str]]:
+        # types are read once per table without modifiers, so too long values fail instead of being cut by cast,
+        # unknown columns are left to fail in statement
+        types = self._table_types.get(table)
+        if types is None:
+            rows = await self.fetchMany('SELECT attname, format_type(atttypid, NULL) FROM pg_attribute '
+                                        'WHERE attrelid = $1::regclass AND attnum > 0 AND NOT attisdropped',
+                                        quote_table(table), raw=True)
+            types = {row[0]: row[1] for row in rows}
+            self._table_types[table] = types
+        return [types.get(column) for column in columns]
+
+    async def _write_rows(self, query: str, args: Sequence[Any], returning: bool) -> list:
+        async def operation(connection: PreparedConnection) -> list:
+            async with self._single_statement(connection):
+                if returning:
+                    return await self._execute(connection, query, 'fetch', *args)
+                await self._execute(connection, query, 'execute', *args)
+                return []
+
+        with self._observe(query) as event:
+            try:
+                rows = await self._run_write(operation, event)
+            except asyncpg.UndefinedTableError:
+                raise WrongTableNameQuery
+            if event is not None:
+                event.rows = len(rows)
+        self._notify_write(written_table(query))
+        return rows
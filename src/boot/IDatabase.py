@@ -0,0 +1,549 @@
+import abc
+import contextlib
+import re
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, AsyncContextManager, AsyncIterator, Callable, Dict, Iterable, Iterator, List, \
+    Optional, Sequence, Tuple, Type, Union
+
+from src.boot.Config import IConfig
+from src.boot.Instrumentation import IInstrumentation, QueryEvent
+from src.tools.columnar import to_columns
+from src.tools.exceptions import NotEnoughData
+
+if TYPE_CHECKING:
+    from src.models.IBaseModel import IBaseModel
+
+# postgres limit of bind parameters of one statement
+MAX_QUERY_ARGS = 32767
+
+
+class IDatabase(abc.ABC):
+    @abc.abstractmethod
+    def __init__(self, config: IConfig) -> None:
+        """
+        Database constructor
+        :param config: IConfig-like object
+        :type config: IConfig
+        """
+        self._config = config
+        self._write_listeners: List[Callable[[Optional[str]], None]] = []
+        self._instrumentation: Optional[IInstrumentation] = None
+
+    def instrument(self, instrumentation: Optional[IInstrumentation]) -> None:
+        """
+        Set hook receiving timings of every query, None disables instrumentation
+        :param instrumentation: IInstrumentation-like object
+        :type instrumentation: Optional[IInstrumentation]
+        :return: None
+        :rtype: None
+        """
+        self._instrumentation = instrumentation
+
+    @contextlib.contextmanager
+    def _observe(self, query: str) -> Iterator[Optional[QueryEvent]]:
+        if self._instrumentation is None:
+            yield None
+            return
+        event = QueryEvent(query)
+        try:
+            yield event
+        except GeneratorExit:
+            # stream closed by consumer before end
+            raise
+        except BaseException as error:
+            event.error = type(error).__name__
+            raise
+        finally:
+            self._instrumentation.on_query(event)
+
+    def add_write_listener(self, listener: Callable[[Optional[str]], None]) -> None:
+        """
+        Register callback called after rows of table were written, with table name or None if table is unknown
+        :param listener: Callback taking table name
+        :type listener: Callable[[Optional[str]], None]
+        :return: None
+        :rtype: None
+        """
+        self._write_listeners.append(listener)
+
+    def remove_write_listener(self, listener: Callable[[Optional[str]], None]) -> None:
+        """
+        Unregister callback added by add_write_listener
+        :param listener: Callback taking table name
+        :type listener: Callable[[Optional[str]], None]
+        :return: None
+        :rtype: None
+        """
+        self._write_listeners.remove(listener)
+
+    def _notify_write(self, table: Optional[str]) -> None:
+        for listener in list(self._write_listeners):
+            listener(table)
+
+    @abc.abstractmethod
+    async def connect(self) -> None:
+        """
+        Open connection to database
+        :return:
+        :rtype:
+        """
+
+    @abc.abstractmethod
+    async def close(self) -> None:
+        """
+        Close connection
+        :return: None
+        :rtype: None
+        """
+
+    @abc.abstractmethod
+    async def fetchOne(self, query: str, *args: Union[str, int, bool, datetime],
+                       raw: bool = False) -> Tuple[Tuple[str, Union[str, bool, datetime, int]]]:
+        """
+        Get one row from database async, if row not fetched raises RowNotFound
+        :param query: SQL query, may contain $n placeholders
+        :type query: str
+        :param args: arguments for query placeholders
+        :type args: Union[str, int, bool, datetime]
+        :param raw: return asyncpg.Record as is, without converting it to tuple of pairs
+        :type raw: bool
+        :return: Fetched row
+        :rtype: Tuple[Tuple[str, Union[str, bool, datetime, int]]]
+        """
+
+    @abc.abstractmethod
+    async def fetchMany(self, query: str, *args: Union[str, int, bool, datetime],
+                        raw: bool = False) -> List[Tuple[Tuple[str, Union[str, bool, datetime, int]]]]:
+        """
+        Get many row from database async, if no rows found return empty list
+        :param query: SQL query, may contain $n placeholders
+        :type query: str
+        :param args: arguments for query placeholders
+        :type args: Union[str, int, bool, datetime]
+        :param raw: return asyncpg.Record objects as is, without converting them to tuples of pairs
+        :type raw: bool
+        :return: Fetched rows
+        :rtype: List[Tuple[Tuple[str, Union[str, bool, datetime, int]]]]
+        """
+
+    async def fetchColumns(self, query: str, *args: Union[str, int, bool, datetime]) -> Dict[str, Any]:
+        """
+        Get rows as one numpy array per column, numpy must be installed. Integer, float, bool and timestamp columns
+        get native dtypes, other columns are object arrays, NULL is NaN or NaT, integer columns with NULL are float.
+        Column types are inferred from values, result without rows has no columns.
+        :param query: SQL query, may contain $n placeholders, columns names must be unique
+        :type query: str
+        :param args: arguments for query placeholders
+        :type args: Union[str, int, bool, datetime]
+        :return: Column name to numpy.ndarray
+        :rtype: Dict[str, numpy.ndarray]
+        """
+        rows = await self.fetchMany(query, *args, raw=True)
+        return to_columns(tuple(rows[0].keys()) if rows else (), rows)
+
+    @abc.abstractmethod
+    def stream(self, query: str, *args: Union[str, int, bool, datetime], batch_size: int = 100,
+               batches: bool = False, raw: bool = False) -> AsyncIterator[Union[Tuple[Tuple[str, Union[str, bool, datetime, int]]],
+                                                             List[Tuple[Tuple[str, Union[str, bool, datetime, int]]]]]]:
+        """
+        Iterate rows of query async, rows are fetched from server-side cursor by batch_size,
+        so only one batch is kept in memory
+        :param query: SQL query, may contain $n placeholders
+        :type query: str
+        :param args: arguments for query placeholders
+        :type args: Union[str, int, bool, datetime]
+        :param batch_size: number of rows fetched from cursor at once
+        :type batch_size: int
+        :param batches: yield lists of rows by batch instead of single rows
+        :type batches: bool
+        :param raw: yield asyncpg.Record objects as is, without converting them to tuples of pairs
+        :type raw: bool
+        :return: Async iterator over fetched rows or batches
+        :rtype: AsyncIterator[Union[Tuple[Tuple[str, Union[str, bool, datetime, int]]], List[...]]]
+        """
+
+    @abc.abstractmethod
+    def transaction(self) -> AsyncContextManager[None]:
+        """
+        Async context manager running all statements of current task inside it in one transaction
+        on one connection, committed on exit and rolled back on exception, nested call makes savepoint
+        :return: Async context manager
+        :rtype: AsyncContextManager[None]
+        """
+
+    def in_transaction(self) -> bool:
+        """
+        Whether current task runs inside transaction(), e.g. to not start concurrent queries on its connection
+        :return: True inside transaction
+        :rtype: bool
+        """
+        return False
+
+    @abc.abstractmethod
+    async def insert(self, query: str, *args: Union[str, int, bool, datetime]) -> None:
+        """
+        Insert row to database
+        :param query: insert query, if query contains other operations, raises WrongInsertQuery
+        :type query:
+        :param args: arguments for insert query
+        :type args: Union[str, int, bool, datetime]
+        :return: None
+        :rtype: None
+        """
+
+    @abc.abstractmethod
+    async def insert_many(self, table: str,
+                          rows: Iterable[Union[Tuple[Tuple[str, Union[str, bool, datetime, int]]],
+                                               Tuple[Union[str, bool, datetime, int]]]],
+                          columns: Optional[Sequence[str]] = None, chunk_size: int = 10000) -> None:
+        """
+        Insert many rows to table, each chunk of rows is inserted in its own transaction,
+        if table does not exists raises WrongTableNameQuery.
+        Write listeners get table name without schema, as for raw SQL
+        :param table: table name, may be prefixed with schema name, unquoted names are lowercased as in SQL
+        :type table: str
+        :param rows: rows as returned by IBaseModel.to_row or tuples of values in columns order
+        :type rows: Iterable[Union[Tuple[Tuple[str, Union[str, bool, datetime, int]]], Tuple[Union[str, bool, datetime, int]]]]
+        :param columns: columns to insert, by default taken from names of first row
+        :type columns: Optional[Sequence[str]]
+        :param chunk_size: number of rows inserted in one transaction
+        :type chunk_size: int
+        :return: None
+        :rtype: None
+        """
+
+    async def upsert(self, models: Iterable['IBaseModel'], conflict: Sequence[str] = ('id',),
+                     update: Optional[Sequence[str]] = None, returning: bool = False, table: Optional[str] = None,
+                     chunk_size: int = 1000) -> List['IBaseModel']:
+        """
+        Insert models rows, rows which conflict with existing ones on unique conflict columns update them instead,
+        each chunk is sent as one INSERT ... ON CONFLICT statement. If models repeat conflict values, last one is used,
+        so every model must carry real conflict values, models holding constructor default in them are rejected
+        :param models: Models of one class, rows are taken from to_row
+        :type models: Iterable[IBaseModel]
+        :param conflict: Columns of unique constraint or index
+        :type conflict: Sequence[str]
+        :param update: Columns updated on conflict, all columns except conflict ones by default,
+        empty to keep existing rows
+        :type update: Optional[Sequence[str]]
+        :param returning: Return inserted and updated rows as models, rows kept on conflict are not returned
+        :type returning: bool
+        :param table: Table name, model __table__ by default
+        :type table: Optional[str]
+        :param chunk_size: Rows sent in one statement, lowered to fit statement parameters limit
+        :type chunk_size: int
+        :return: Written rows as models if returning, otherwise empty list
+        :rtype: List[IBaseModel]
+        """
+        assert chunk_size > 0, 'chunk_size must be positive'
+        model, table, columns, records = model_rows(models, table, conflict)
+        if not records:
+            return []
+        update = [column for column in columns if column not in conflict] if update is None else list(update)
+        written = []
+        for chunk in chunks(records, len(columns), chunk_size):
+            written.extend(await self._upsert_rows(table, columns, chunk, conflict, update, returning))
+        return model.from_records(written) if returning else []
+
+    async def update_many(self, models: Iterable['IBaseModel'], key: Sequence[str] = ('id',),
+                          columns: Optional[Sequence[str]] = None, returning: bool = False,
+                          table: Optional[str] = None, chunk_size: int = 1000) -> List['IBaseModel']:
+        """
+        Update rows matched by key columns with values of models, rows which do not exist are skipped,
+        each chunk is sent as one UPDATE ... FROM (VALUES ...) statement. If models repeat key, last one is used,
+        models holding constructor default in key are rejected
+        :param models: Models of one class, rows are taken from to_row
+        :type models: Iterable[IBaseModel]
+        :param key: Columns identifying row
+        :type key: Sequence[str]
+        :param columns: Columns to update, all columns except key ones by default
+        :type columns: Optional[Sequence[str]]
+        :param returning: Return updated rows as models
+        :type returning: bool
+        :param table: Table name, model __table__ by default
+        :type table: Optional[str]
+        :param chunk_size: Rows sent in one statement, lowered to fit statement parameters limit
+        :type chunk_size: int
+        :return: Updated rows as models if returning, otherwise empty list
+        :rtype: List[IBaseModel]
+        """
+        assert chunk_size > 0, 'chunk_size must be positive'
+        model, table, row_columns, records = model_rows(models, table, key)
+        if not records:
+            return []
+        if columns is not None:
+            missing = [column for column in columns if column not in row_columns]
+            if missing:
+                raise NotEnoughData(missing)
+            selected = tuple(key) + tuple(column for column in columns if column not in key)
+            positions = [row_columns.index(column) for column in selected]
+            records = [tuple(record[position] for position in positions) for record in records]
+            row_columns = selected
+        assert len(row_columns) > len(key), 'update_many needs columns besides key columns'
+        written = []
+        for chunk in chunks(records, len(row_columns), chunk_size):
+            written.extend(await self._update_rows(table, row_columns, chunk, key, returning))
+        return model.from_records(written) if returning else []
+
+    async def _upsert_rows(self, table: str, columns: Sequence[str], records: List[tuple], conflict: Sequence[str],
+                           update: Sequence[str], returning: bool) -> list:
+        query = upsert_query(table, columns, len(records), conflict, update, returning)
+        return await self._write_rows(query, [value for record in records for value in record], returning)
+
+    async def _update_rows(self, table: str, columns: Sequence[str], records: List[tuple], key: Sequence[str],
+                           returning: bool) -> list:
+        types = await self._column_types(table, columns)
+        query = update_query(table, columns, len(records), key, types, returning)
+        return await self._write_rows(query, [value for record in records for value in record], returning)
+
+    async def _column_types(self, table: str, columns: Sequence[str]) -> Optional[Sequence[Optional[str]]]:
+        # SQL types of columns, VALUES list needs them to compare its values with table columns
+        return None
+
+    async def _write_rows(self, query: str, args: Sequence[Any], returning: bool) -> list:
+        if not returning:
+            await self.insert(query, *args)
+            return []
+        records = await self.fetchMany(query, *args, raw=True)
+        self._notify_write(written_table(query))
+        return records
+
+
+def split_rows(rows: Iterable[Union[Tuple[Tuple[str, Union[str, bool, datetime, int]]],
+                                    Tuple[Union[str, bool, datetime, int]]]],
+               columns: Optional[Sequence[str]] = None) -> Tuple[Optional[Tuple[str]], List[tuple]]:
+    """
+    Convert rows of (name, value) pairs or plain values to columns names and list of values tuples
+    :param rows: rows as returned by IBaseModel.to_row or tuples of values
+    :type rows: Iterable[Union[Tuple[Tuple[str, Union[str, bool, datetime, int]]], Tuple[Union[str, bool, datetime, int]]]]
+    :param columns: columns order, by default taken from names of first row
+    :type columns: Optional[Sequence[str]]
+    :return: columns names and values
+    :rtype: Tuple[Optional[Tuple[str]], List[tuple]]
+    """
+    columns = tuple(columns) if columns is not None else None
+    records = []
+    for row in rows:
+        if not row or not isinstance(row[0], tuple):
+            records.append(tuple(row))
+            continue
+        names = tuple(pair[0] for pair in row)
+        if columns is None:
+            columns = names
+        if names == columns:
+            records.append(tuple(pair[1] for pair in row))
+            continue
+        values = dict(row)
+        missing = [column for column in columns if column not in values]
+        if missing:
+            raise NotEnoughData(missing)
+        records.append(tuple(values[column] for column in columns))
+    return columns, records
+
+
+WRITE_QUERY_TABLE = re.compile(r'^\s*(?:INSERT\s+INTO|UPDATE|DELETE\s+FROM)\s+((?:"[^"]+"|[\w$]+)(?:\.(?:"[^"]+"|[\w$]+))?)',
+                               re.IGNORECASE)
+
+
+def split_table(table: str) -> Tuple[Optional[str], str]:
+    """
+    Schema and table names folded as Postgres does: unquoted names are lowercased, quoted ones are kept
+    :param table: table name, may be quoted and prefixed with schema name
+    :type table: str
+    :return: Schema name or None and table name
+    :rtype: Tuple[Optional[str], str]
+    """
+    parts = [part[1:-1].replace('""', '"') if part.startswith('"') else part.lower()
+             for part in re.findall(r'"(?:[^"]|"")*"|[^.]+', table)]
+    return (parts[-2] if len(parts) > 1 else None), parts[-1]
+
+
+def table_name(name: str) -> str:
+    """
+    Normalize table name as Postgres does: unquoted names are lowercased, schema prefix is dropped
+    :param name: table name, may be quoted and prefixed with schema name
+    :type name: str
+    :return: Normalized table name
+    :rtype: str
+    """
+    return split_table(name)[1]
+
+
+def written_table(query: str) -> Optional[str]:
+    """
+    Name of table written by INSERT, UPDATE or DELETE query
+    :param query: SQL query
+    :type query: str
+    :return: Normalized table name or None if query is not recognized
+    :rtype: Optional[str]
+    """
+    match = WRITE_QUERY_TABLE.match(query)
+    return table_name(match.group(1)) if match else None
+
+
+def quote_ident(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def quote_table(table: str) -> str:
+    # names are folded before quoting, so TT4 is the same table as in unquoted SQL
+    schema, name = split_table(table)
+    return quote_ident(name) if schema is None else quote_ident(schema) + '.' + quote_ident(name)
+
+
+def model_rows(models: Iterable['IBaseModel'], table: Optional[str],
+               key: Sequence[str]) -> Tuple[Optional[Type['IBaseModel']], str, Tuple[str, ...], List[tuple]]:
+    """
+    Rows of models for batched write, one row per key value, later models replace earlier ones,
+    as one statement can not change the same row twice. Key columns must not hold default value of model
+    :param models: Models of one class
+    :type models: Iterable[IBaseModel]
+    :param table: Table name, model __table__ by default
+    :type table: Optional[str]
+    :param key: Columns identifying row, if some are not in rows raises NotEnoughData
+    :type key: Sequence[str]
+    :return: Model class, table name, columns names and values
+    :rtype: Tuple[Optional[Type[IBaseModel]], str, Tuple[str, ...], List[tuple]]
+    """
+    models = list(models)
+    if not models:
+        return None, table, (), []
+    model = type(models[0])
+    table = table or model.__table__
+    assert table, '{} has no __table__, table must be given'.format(model.__name__)
+    columns, records = split_rows([item.to_row() for item in models])
+    missing = [column for column in key if column not in columns]
+    if missing:
+        raise NotEnoughData(missing)
+    positions = [columns.index(column) for column in key]
+    # models of one key value are merged, so key left at constructor default would silently merge new models
+    defaults = [(column, position, model.__schema__.defaults[column])
+                for column, position in zip(key, positions) if column in model.__schema__.defaults]
+    for record in records:
+        for column, position, default in defaults:
+            assert record[position] != default, \
+                '{} of {} holds default {!r}, every model must carry real key'.format(column, model.__name__, default)
+    unique = {tuple(record[position] for position in positions): record for record in records}
+    return model, table, columns, list(unique.values())
+
+
+def chunks(records: List[tuple], width: int, chunk_size: int) -> Iterator[List[tuple]]:
+    size = max(1, min(chunk_size, MAX_QUERY_ARGS // width))
+    for start in range(0, len(records), size):
+        yield records[start:start + size]
+
+
+def values_list(width: int, rows: int, types: Optional[Sequence[Optional[str]]] = None) -> str:
+    """
+    VALUES list of $n placeholders, first row is cast to types, so other rows get the same types
+    :param width: Values in row
+    :type width: int
+    :param rows: Number of rows
+    :type rows: int
+    :param types: SQL type of every value, None to let server infer them
+    :type types: Optional[Sequence[Optional[str]]]
+    :return: Rows placeholders, e.g. ($1::integer, $2::text), ($3, $4)
+    :rtype: str
+    """
+    out = []
+    for row in range(rows):
+        params = ['$' + str(row * width + position + 1) for position in range(width)]
+        if row == 0 and types is not None:
+            params = [param if type_name is None else param + '::' + type_name
+                      for param, type_name in zip(params, types)]
+        out.append('(' + ', '.join(params) + ')')
+    return ', '.join(out)
+
+
+def upsert_query(table: str, columns: Sequence[str], rows: int, conflict: Sequence[str], update: Sequence[str],
+                 returning: bool = False) -> str:
+    """
+    INSERT ... ON CONFLICT statement of rows, values are given row by row in columns order
+    :param table: Table name, may be prefixed with schema name
+    :type table: str
+    :param columns: Columns names
+    :type columns: Sequence[str]
+    :param rows: Number of rows
+    :type rows: int
+    :param conflict: Columns of unique constraint or index
+    :type conflict: Sequence[str]
+    :param update: Columns set from conflicting row, empty does nothing on conflict
+    :type update: Sequence[str]
+    :param returning: Return written rows
+    :type returning: bool
+    :return: SQL query
+    :rtype: str
+    """
+    query = 'INSERT INTO {} ({}) VALUES {} ON CONFLICT ({}) '.format(
+        quote_table(table), ', '.join(map(quote_ident, columns)), values_list(len(columns), rows),
+        ', '.join(map(quote_ident, conflict)))
+    if update:
+        query += 'DO UPDATE SET ' + ', '.join('{0} = EXCLUDED.{0}'.format(quote_ident(column)) for column in update)
+    else:
+        query += 'DO NOTHING'
+    return query + ' RETURNING *' if returning else query
+
+
+def update_query(table: str, columns: Sequence[str], rows: int, key: Sequence[str],
+                 types: Optional[Sequence[Optional[str]]] = None, returning: bool = False) -> str:
+    """
+    UPDATE ... FROM (VALUES ...) statement of rows, values are given row by row in columns order
+    :param table: Table name, may be prefixed with schema name
+    :type table: str
+    :param columns: Columns names, key columns included
+    :type columns: Sequence[str]
+    :param rows: Number of rows
+    :type rows: int
+    :param key: Columns identifying row
+    :type key: Sequence[str]
+    :param types: SQL type of every column, postgres reads untyped VALUES as text
+    :type types: Optional[Sequence[Optional[str]]]
+    :param returning: Return updated rows
+    :type returning: bool
+    :return: SQL query
+    :rtype: str
+    """
+    query = 'UPDATE {} AS "__t" SET {} FROM (VALUES {}) AS "__v"({}) WHERE {}'.format(
+        quote_table(table),
+        ', '.join('{0} = "__v".{0}'.format(quote_ident(column)) for column in columns if column not in key),
+        values_list(len(columns), rows, types), ', '.join(map(quote_ident, columns)),
+        ' AND '.join('"__t".{0} = "__v".{0}'.format(quote_ident(column)) for column in key))
+    return query + ' RETURNING "__t".*' if returning else query
+
+
+def keyset_query(table: str, key: Sequence[str], descending: bool = False, where: Optional[str] = None,
+                 params: int = 0, after: bool = False) -> str:
+    """
+    SELECT of one page of rows ordered by key columns. Next pages start after key values of last row
+    instead of OFFSET, so with index on key columns deep pages cost the same as first one
+    :param table: Table name, may be prefixed with schema name
+    :type table: str
+    :param key: Columns of order, together unique and not NULL, e.g. id
+    :type key: Sequence[str]
+    :param descending: Order from greatest key
+    :type descending: bool
+    :param where: Filter condition, may contain $1..$params placeholders
+    :type where: Optional[str]
+    :param params: Number of placeholders in where, key values follow them and LIMIT is the last one
+    :type params: int
+    :param after: Select rows after key values, otherwise first page
+    :type after: bool
+    :return: SQL query
+    :rtype: str
+    """
+    columns = [quote_ident(column) for column in key]
+    conditions = [] if where is None else ['(' + where + ')']
+    if after:
+        placeholders = ['$' + str(params + position + 1) for position in range(len(key))]
+        params += len(key)
+        op = '<' if descending else '>'
+        if len(key) == 1:
+            conditions.append('{} {} {}'.format(columns[0], op, placeholders[0]))
+        else:
+            # row comparison is one range scan of composite index
+            conditions.append('({}) {} ({})'.format(', '.join(columns), op, ', '.join(placeholders)))
+    query = 'SELECT * FROM ' + quote_table(table)
+    if conditions:
+        query += ' WHERE ' + ' AND '.join(conditions)
+    direction = ' DESC' if descending else ''
+    return query + ' ORDER BY ' + ', '.join(column + direction for column in columns) + ' LIMIT $' + str(params + 1)
@@ -0,0 +1,216 @@
+import abc
+import logging
+import math
+import re
+import time
+from typing import Dict, List, Optional
+
+from src.tools.LRUCache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'(?<![\w$.])-?\d+(?:\.\d+)?(?:e[+-]?\d+)?\b', re.IGNORECASE)
+_LITERAL_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_SPACES = re.compile(r'\s+')
+_normalized = LRUCache(1024)
+
+
+def normalize_query(query: str) -> str:
+    """
+    Query text with literals replaced by ? and whitespace collapsed, so equal queries with different values
+    are grouped together, results are cached
+    :param query: SQL query
+    :type query: str
+    :return: Normalized query
+    :rtype: str
+    """
+    normalized = _normalized.get(query)
+    if normalized is None:
+        normalized = _STRING_LITERAL.sub('?', query)
+        normalized = _NUMBER_LITERAL.sub('?', normalized)
+        normalized = _LITERAL_LIST.sub('(...)', normalized)
+        normalized = _SPACES.sub(' ', normalized).strip()
+        _normalized.put(query, normalized)
+    return normalized
+
+
+class Histogram:
+    MIN_VALUE = 1e-6
+    BUCKETS_PER_DOUBLING = 8
+    BUCKETS = BUCKETS_PER_DOUBLING * 28
+
+    def __init__(self) -> None:
+        """
+        Log-bucketed histogram of durations from 1 microsecond to about 4 minutes,
+        percentiles are exact to about 9 percent, recording is O(1)
+        """
+        self.counts: List[int] = [0] * (self.BUCKETS + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, value: float) -> None:
+        """
+        Add value to histogram
+        :param value: Duration in seconds
+        :type value: float
+        :return: None
+        :rtype: None
+        """
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        if value <= self.MIN_VALUE:
+            self.counts[0] += 1
+            return
+        index = int(math.log2(value / self.MIN_VALUE) * self.BUCKETS_PER_DOUBLING) + 1
+        self.counts[min(index, self.BUCKETS)] += 1
+
+    def percentile(self, percent: float) -> float:
+        """
+        Upper bound of bucket containing given percentile
+        :param percent: Percentile from 0 to 100
+        :type percent: float
+        :return: Duration in seconds, 0 if histogram is empty
+        :rtype: float
+        """
+        if self.count == 0:
+            return 0.0
+        rank = math.ceil(self.count * percent / 100) or 1
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self.MIN_VALUE * 2 ** (index / self.BUCKETS_PER_DOUBLING), self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        return dict(count=self.count, mean=self.total / self.count if self.count else 0.0,
+                    p50=self.percentile(50), p95=self.percentile(95), p99=self.percentile(99), max=self.max)
+
+
+class QueryEvent:
+    __slots__ = ('query', 'pool', 'acquire', 'execute', 'decode', 'rows', 'error', '_mark')
+
+    def __init__(self, query: str) -> None:
+        """
+        Timings of one Database call, split into pool acquire, statement execution and rows decoding
+        :param query: SQL query
+        :type query: str
+        """
+        self.query = query
+        self.pool = 'primary'
+        self.acquire = 0.0
+        self.execute = 0.0
+        self.decode = 0.0
+        self.rows = 0
+        self.error: Optional[str] = None
+        self._mark = time.perf_counter()
+
+    def _lap(self) -> float:
+        now = time.perf_counter()
+        lap, self._mark = now - self._mark, now
+        return lap
+
+    def acquired(self, pool: str = 'primary') -> None:
+        self.acquire += self._lap()
+        self.pool = pool
+
+    def executed(self) -> None:
+        self.execute += self._lap()
+
+    def decoded(self) -> None:
+        self.decode += self._lap()
+
+    def resume(self) -> None:
+        """Skip time spent outside of Database, e.g. by consumer of streamed rows"""
+        self._lap()
+
+    @property
+    def total(self) -> float:
+        return self.acquire + self.execute + self.decode
+
+    @property
+    def normalized_query(self) -> str:
+        return normalize_query(self.query)
+
+
+class IInstrumentation(abc.ABC):
+    @abc.abstractmethod
+    def on_query(self, event: QueryEvent) -> None:
+        """
+        Called after every Database call, must be cheap as it runs on every query
+        :param event: Query timings
+        :type event: QueryEvent
+        :return: None
+        :rtype: None
+        """
+
+
+class QueryStats:
+    def __init__(self) -> None:
+        self.total = Histogram()
+        self.acquire = Histogram()
+        self.execute = Histogram()
+        self.decode = Histogram()
+        self.rows = 0
+        self.errors = 0
+
+    def record(self, event: QueryEvent) -> None:
+        self.total.record(event.total)
+        self.acquire.record(event.acquire)
+        self.execute.record(event.execute)
+        self.decode.record(event.decode)
+        self.rows += event.rows
+        if event.error is not None:
+            self.errors += 1
+
+    def summary(self) -> dict:
+        return dict(total=self.total.summary(), acquire=self.acquire.summary(), execute=self.execute.summary(),
+                    decode=self.decode.summary(), rows=self.rows, errors=self.errors)
+
+
+class Instrumentation(IInstrumentation):
+    def __init__(self, slow_query_threshold: Optional[float] = 1.0, max_queries: int = 1000) -> None:
+        """
+        In-process query statistics: p50/p95/p99 histograms per normalized query and slow queries log
+        :param slow_query_threshold: Seconds after which query is logged as slow, None disables log
+        :type slow_query_threshold: Optional[float]
+        :param max_queries: Normalized queries with own statistics, others are counted as '<other>'
+        :type max_queries: int
+        """
+        self.slow_query_threshold = slow_query_threshold
+        self.max_queries = max_queries
+        self.all = QueryStats()
+        self.queries: Dict[str, QueryStats] = {}
+        self.slow_queries = 0
+
+    def on_query(self, event: QueryEvent) -> None:
+        query = event.normalized_query
+        stats = self.queries.get(query)
+        if stats is None:
+            if len(self.queries) >= self.max_queries:
+                query = '<other>'
+            stats = self.queries.setdefault(query, QueryStats())
+        stats.record(event)
+        self.all.record(event)
+        if self.slow_query_threshold is not None and event.total >= self.slow_query_threshold:
+            self.slow_queries += 1
+            logger.warning('slow query %.3fs (acquire %.3fs, execute %.3fs, decode %.3fs, rows %d, pool %s): %s',
+                           event.total, event.acquire, event.execute, event.decode, event.rows, event.pool, query)
+
+    def report(self, db: Optional[object] = None) -> dict:
+        """
+        Statistics of all queries and of every normalized query, with pool gauges if database is given
+        :param db: Database to take pool_info from
+        :type db: Optional[Database]
+        :return: dict with all, queries, slow_queries and pools
+        :rtype: dict
+        """
+        report = dict(all=self.all.summary(), queries={query: stats.summary() for query, stats in self.queries.items()},
+                      slow_queries=self.slow_queries)
+        if db is not None:
+            report['pools'] = db.pool_info()
+        return report
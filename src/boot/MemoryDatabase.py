@@ -0,0 +1,1066 @@
+import asyncio
+import contextlib
+import operator
+import random
+import re
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, \
+    Set, Tuple, Union
+
+import asyncpg
+
+from src.boot.Config import IConfig
+from src.boot.IDatabase import IDatabase, split_rows, table_name, update_query, upsert_query, written_table
+from src.boot.Instrumentation import QueryEvent
+from src.tools.LRUCache import LRUCache
+from src.tools.exceptions import RowNotFound, WrongTableNameQuery
+
+
+class MemoryRecord:
+    __slots__ = ('_values', '_index')
+
+    def __init__(self, index: Dict[str, int], values: tuple) -> None:
+        """
+        Read-only row behaving like asyncpg.Record: indexed by position or column name, iterated by values
+        :param index: Column position by name, shared by all records of one result
+        :type index: Dict[str, int]
+        :param values: Row values in columns order
+        :type values: tuple
+        """
+        self._index = index
+        self._values = values
+
+    def __getitem__(self, key: Union[int, str]) -> Any:
+        if isinstance(key, str):
+            return self._values[self._index[key]]
+        return self._values[key]
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._values)
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, MemoryRecord) and tuple(self.items()) == tuple(other.items())
+
+    def __repr__(self) -> str:
+        return '<MemoryRecord {}>'.format(' '.join('{}={!r}'.format(k, v) for k, v in self.items()))
+
+    def keys(self) -> Iterator[str]:
+        return iter(self._index)
+
+    def values(self) -> Iterator[Any]:
+        return iter(self._values)
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        return zip(self._index, self._values)
+
+    def get(self, key: str, default: Optional[Any] = None) -> Any:
+        position = self._index.get(key)
+        return default if position is None else self._values[position]
+
+
+class MemoryTable:
+    def __init__(self, name: str, columns: Sequence[str], defaults: Sequence[Any] = (),
+                 not_null: Iterable[int] = ()) -> None:
+        """
+        Rows of one table by row id, with hash indexes on some columns
+        :param name: Table name
+        :type name: str
+        :param columns: Columns names
+        :type columns: Sequence[str]
+        :param defaults: Default value of every column
+        :type defaults: Sequence[Any]
+        :param not_null: Positions of columns which can not be NULL
+        :type not_null: Iterable[int]
+        """
+        self.name = name
+        self.columns = tuple(columns)
+        self.positions = {column: position for position, column in enumerate(self.columns)}
+        self.defaults = tuple(defaults) or (None,) * len(self.columns)
+        self.not_null = set(not_null)
+        self.rows: Dict[int, tuple] = {}
+        self.indexes: Dict[int, Dict[Any, Set[int]]] = {}
+        self.unique: Set[int] = set()
+        self._next_id = 0
+
+    def position(self, column: str) -> int:
+        try:
+            return self.positions[column]
+        except KeyError:
+            raise asyncpg.UndefinedColumnError('column "{}" of relation "{}" does not exist'.format(column, self.name))
+
+    def add_index(self, position: int, unique: bool = False) -> None:
+        """
+        Build hash index of column from rows already in table
+        :param position: Column position
+        :type position: int
+        :param unique: Raise UniqueViolationError on duplicate values
+        :type unique: bool
+        :return: None
+        :rtype: None
+        """
+        index: Dict[Any, Set[int]] = {}
+        for row_id, row in self.rows.items():
+            ids = index.setdefault(row[position], set())
+            if unique and ids and row[position] is not None:
+                self._duplicate(position, row[position])
+            ids.add(row_id)
+        self.indexes[position] = index
+        if unique:
+            self.unique.add(position)
+
+    def _duplicate(self, position: int, value: Any) -> None:
+        raise asyncpg.UniqueViolationError('duplicate key value violates unique constraint: ({})=({})'.format(
+            self.columns[position], value))
+
+    def _check(self, row: tuple, row_id: Optional[int] = None) -> None:
+        for position in self.not_null:
+            if row[position] is None:
+                raise asyncpg.NotNullViolationError('null value in column "{}" of relation "{}"'.format(
+                    self.columns[position], self.name))
+        for position in self.unique:
+            value = row[position]
+            if value is not None and self.indexes[position].get(value, {row_id}) - {row_id}:
+                self._duplicate(position, value)
+
+    def insert(self, row: tuple, row_id: Optional[int] = None) -> int:
+        """
+        Add row, row_id is given when deleted row is restored
+        :param row: Values in columns order
+        :type row: tuple
+        :param row_id: Id of row
+        :type row_id: Optional[int]
+        :return: Id of row
+        :rtype: int
+        """
+        self._check(row)
+        if row_id is None:
+            row_id = self._next_id
+            self._next_id += 1
+        self.rows[row_id] = row
+        for position, index in self.indexes.items():
+            index.setdefault(row[position], set()).add(row_id)
+        return row_id
+
+    def update(self, row_id: int, row: tuple) -> tuple:
+        """
+        Replace values of row
+        :param row_id: Id of row
+        :type row_id: int
+        :param row: New values in columns order
+        :type row: tuple
+        :return: Old values
+        :rtype: tuple
+        """
+        self._check(row, row_id)
+        old = self.rows[row_id]
+        self.rows[row_id] = row
+        for position, index in self.indexes.items():
+            if old[position] != row[position]:
+                self._unindex(index, old[position], row_id)
+                index.setdefault(row[position], set()).add(row_id)
+        return old
+
+    def delete(self, row_id: int) -> tuple:
+        """
+        Remove row
+        :param row_id: Id of row
+        :type row_id: int
+        :return: Values of removed row
+        :rtype: tuple
+        """
+        row = self.rows.pop(row_id)
+        for position, index in self.indexes.items():
+            self._unindex(index, row[position], row_id)
+        return row
+
+    @staticmethod
+    def _unindex(index: Dict[Any, Set[int]], value: Any, row_id: int) -> None:
+        ids = index[value]
+        ids.discard(row_id)
+        if not ids:
+            del index[value]
+
+
+# parser of SQL subset
+
+_TOKEN = re.compile(r"""\s*(?:
+    (?P<string>'(?:[^']|'')*')
+    |(?P<quoted>"(?:[^"]|"")*")
+    |(?P<param>\$\d+)
+    |(?P<number>\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)
+    |(?P<name>[A-Za-z_][A-Za-z0-9_$]*)
+    |(?P<op>::|<=|>=|<>|!=|[=<>(),*;.\-\[\]])
+)""", re.VERBOSE)
+
+_COMPARISONS = {'=': operator.eq, '<>': operator.ne, '!=': operator.ne, '<': operator.lt, '<=': operator.le,
+                '>': operator.gt, '>=': operator.ge}
+
+
+def _to_bool(value: Any) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ('t', 'true', 'y', 'yes', 'on', '1')
+    return bool(value)
+
+
+_CASTS: Dict[str, Callable[[Any], Any]] = dict(
+    int=int, int2=int, int4=int, int8=int, integer=int, smallint=int, bigint=int, serial=int, bigserial=int,
+    text=str, varchar=str, char=str, character=str, float=float, float4=float, float8=float, real=float,
+    double=float, numeric=float, decimal=float, bool=_to_bool, boolean=_to_bool)
+
+Value = Callable[[tuple], Any]
+
+
+class _Column(NamedTuple):
+    name: str
+    primary: bool
+    unique: bool
+    not_null: bool
+    default: Any
+
+
+class _Condition(NamedTuple):
+    # tuple of columns for row comparison
+    column: Union[str, Tuple[str, ...]]
+    op: str
+    value: Optional[Value]
+
+
+class _Create(NamedTuple):
+    table: str
+    columns: Tuple[_Column, ...]
+    if_not_exists: bool
+
+
+class _CreateIndex(NamedTuple):
+    table: str
+    column: str
+    unique: bool
+
+
+class _Drop(NamedTuple):
+    table: str
+    if_exists: bool
+
+
+class _Insert(NamedTuple):
+    table: str
+    columns: Optional[Tuple[str, ...]]
+    rows: Tuple[Tuple[Value, ...], ...]
+
+
+class _Select(NamedTuple):
+    table: Optional[str]
+    items: Tuple[Tuple[Union[str, Value], str], ...]
+    where: Tuple[_Condition, ...]
+    order: Tuple[Tuple[str, bool], ...]
+    limit: Optional[Value]
+    offset: Optional[Value]
+
+
+class _Update(NamedTuple):
+    table: str
+    assignments: Tuple[Tuple[str, Value], ...]
+    where: Tuple[_Condition, ...]
+
+
+class _Delete(NamedTuple):
+    table: str
+    where: Tuple[_Condition, ...]
+
+
+class _Parser:
+    def __init__(self, query: str) -> None:
+        self.query = query
+        self.tokens: List[Tuple[str, str]] = []
+        self.position = 0
+        self.params = 0
+        end, query = 0, query.rstrip().rstrip(';')
+        while end < len(query):
+            match = _TOKEN.match(query, end)
+            if match is None or match.end() == end:
+                self.error(query[end:].strip())
+            self.tokens.append((match.lastgroup, match.group(match.lastgroup)))
+            end = match.end()
+
+    def error(self, near: str) -> None:
+        raise asyncpg.PostgresSyntaxError('syntax error or SQL not supported by MemoryDatabase at or near "{}" in: {}'
+                                          .format(near, self.query))
+
+    def peek(self, offset: int = 0) -> Tuple[str, str]:
+        index = self.position + offset
+        return self.tokens[index] if index < len(self.tokens) else ('end', '')
+
+    def next(self) -> Tuple[str, str]:
+        token = self.peek()
+        if token[0] == 'end':
+            self.error('end of query')
+        self.position += 1
+        return token
+
+    def is_keyword(self, keyword: str, offset: int = 0) -> bool:
+        kind, text = self.peek(offset)
+        return kind == 'name' and text.upper() == keyword
+
+    def accept(self, *keywords: str) -> bool:
+        if all(self.is_keyword(keyword, offset) for offset, keyword in enumerate(keywords)):
+            self.position += len(keywords)
+            return True
+        return False
+
+    def expect(self, *keywords: str) -> None:
+        if not self.accept(*keywords):
+            self.error(self.peek()[1])
+
+    def accept_op(self, op: str) -> bool:
+        if self.peek() == ('op', op):
+            self.position += 1
+            return True
+        return False
+
+    def expect_op(self, op: str) -> None:
+        if not self.accept_op(op):
+            self.error(self.peek()[1])
+
+    def identifier(self) -> str:
+        kind, text = self.next()
+        if kind == 'name':
+            return text.lower()
+        if kind == 'quoted':
+            return text[1:-1].replace('""', '"')
+        self.error(text)
+
+    def qualified(self) -> str:
+        name = self.identifier()
+        while self.accept_op('.'):
+            name = self.identifier()
+        return name
+
+    def type_name(self) -> str:
+        name = self.identifier()
+        if name == 'double':
+            self.accept('PRECISION')
+        elif name == 'character':
+            self.accept('VARYING')
+        if self.accept_op('('):
+            while not self.accept_op(')'):
+                self.next()
+        while self.accept_op('['):
+            self.expect_op(']')
+            name = 'array'
+        return name
+
+    def literal(self) -> Any:
+        negative = self.accept_op('-')
+        kind, text = self.next()
+        if kind == 'number':
+            value = float(text) if any(c in text for c in '.eE') else int(text)
+            return -value if negative else value
+        if negative:
+            self.error(text)
+        if kind == 'string':
+            return text[1:-1].replace("''", "'")
+        if kind == 'name' and text.upper() in ('TRUE', 'FALSE', 'NULL'):
+            return dict(TRUE=True, FALSE=False, NULL=None)[text.upper()]
+        self.error(text)
+
+    def value(self) -> Value:
+        kind, text = self.peek()
+        if kind == 'param':
+            self.position += 1
+            index = int(text[1:]) - 1
+            self.params = max(self.params, index + 1)
+            value: Value = operator.itemgetter(index)
+        else:
+            value = _constant(self.literal())
+        while self.accept_op('::'):
+            cast = _CASTS.get(self.type_name())
+            if cast is not None:
+                value = _cast(value, cast)
+        return value
+
+    def values(self) -> Tuple[Value, ...]:
+        self.expect_op('(')
+        values = [self.value()]
+        while self.accept_op(','):
+            values.append(self.value())
+        self.expect_op(')')
+        return tuple(values)
+
+    def column_list(self) -> Tuple[str, ...]:
+        self.expect_op('(')
+        columns = [self.identifier()]
+        while self.accept_op(','):
+            columns.append(self.identifier())
+        self.expect_op(')')
+        return tuple(columns)
+
+    def where(self) -> Tuple[_Condition, ...]:
+        if not self.accept('WHERE'):
+            return ()
+        return self.conditions()
+
+    def conditions(self) -> Tuple[_Condition, ...]:
+        conditions = []
+        while True:
+            if self.is_row():
+                conditions.append(self.row_condition())
+            elif self.accept_op('('):
+                # parentheses only group AND conditions, so they are flattened
+                conditions.extend(self.conditions())
+                self.expect_op(')')
+            else:
+                conditions.append(self.condition())
+            if not self.accept('AND'):
+                return tuple(conditions)
+
+    def is_row(self) -> bool:
+        # row value starts with ( column, which is followed by comma, not by comparison
+        offset = 1
+        while self.peek(offset)[0] in ('name', 'quoted'):
+            offset += 1
+            if self.peek(offset) == ('op', ','):
+                return self.peek() == ('op', '(')
+            if self.peek(offset) != ('op', '.'):
+                return False
+            offset += 1
+        return False
+
+    def row_condition(self) -> _Condition:
+        self.expect_op('(')
+        columns = [self.qualified()]
+        while self.accept_op(','):
+            columns.append(self.qualified())
+        self.expect_op(')')
+        kind, op = self.next()
+        if kind != 'op' or op not in _COMPARISONS:
+            self.error(op)
+        values = self.values()
+        if len(values) != len(columns):
+            self.error(op)
+        return _Condition(tuple(columns), op, _row(values))
+
+    def condition(self) -> _Condition:
+        column = self.qualified()
+        if self.accept('IS', 'NOT', 'NULL'):
+            return _Condition(column, 'is not null', None)
+        if self.accept('IS', 'NULL'):
+            return _Condition(column, 'is null', None)
+        negate = self.accept('NOT')
+        if negate or self.accept('IN'):
+            if negate:
+                self.expect('IN')
+            return _Condition(column, 'not in' if negate else 'in', _list(self.values()))
+        kind, op = self.next()
+        if kind != 'op' or op not in _COMPARISONS:
+            self.error(op)
+        if self.accept('ANY'):
+            if op != '=':
+                self.error(op)
+            self.expect_op('(')
+            value = self.value()
+            self.expect_op(')')
+            return _Condition(column, 'in', value)
+        return _Condition(column, op, self.value())
+
+    def statement(self) -> NamedTuple:
+        if self.accept('CREATE'):
+            unique = self.accept('UNIQUE')
+            if self.accept('INDEX'):
+                self.accept('IF', 'NOT', 'EXISTS')
+                if not self.is_keyword('ON'):
+                    self.identifier()
+                self.expect('ON')
+                table = self.qualified()
+                columns = self.column_list()
+                if len(columns) != 1:
+                    self.error(columns[1])
+                statement = _CreateIndex(table, columns[0], unique)
+            elif not unique and self.accept('TABLE'):
+                statement = self.create_table()
+            else:
+                self.error(self.peek()[1])
+        elif self.accept('DROP', 'TABLE'):
+            if_exists = self.accept('IF', 'EXISTS')
+            statement = _Drop(self.qualified(), if_exists)
+        elif self.accept('INSERT', 'INTO'):
+            table = self.qualified()
+            columns = self.column_list() if self.peek() == ('op', '(') else None
+            self.expect('VALUES')
+            rows = [self.values()]
+            while self.accept_op(','):
+                rows.append(self.values())
+            statement = _Insert(table, columns, tuple(rows))
+        elif self.accept('SELECT'):
+            statement = self.select()
+        elif self.accept('UPDATE'):
+            table = self.qualified()
+            self.expect('SET')
+            assignments = []
+            while True:
+                column = self.identifier()
+                self.expect_op('=')
+                assignments.append((column, self.value()))
+                if not self.accept_op(','):
+                    break
+            statement = _Update(table, tuple(assignments), self.where())
+        elif self.accept('DELETE', 'FROM'):
+            table = self.qualified()
+            statement = _Delete(table, self.where())
+        else:
+            self.error(self.peek()[1])
+        if self.peek()[0] != 'end':
+            self.error(self.peek()[1])
+        return statement
+
+    def create_table(self) -> _Create:
+        if_not_exists = self.accept('IF', 'NOT', 'EXISTS')
+        table = self.qualified()
+        self.expect_op('(')
+        columns = []
+        while True:
+            name = self.identifier()
+            self.type_name()
+            primary = unique = not_null = False
+            default = None
+            while self.peek()[1] not in (',', ')'):
+                if self.accept('PRIMARY', 'KEY'):
+                    primary = not_null = True
+                elif self.accept('UNIQUE'):
+                    unique = True
+                elif self.accept('NOT', 'NULL'):
+                    not_null = True
+                elif self.accept('NULL'):
+                    pass
+                elif self.accept('DEFAULT'):
+                    default = self.literal()
+                else:
+                    self.error(self.peek()[1])
+            columns.append(_Column(name, primary, unique, not_null, default))
+            if not self.accept_op(','):
+                break
+        self.expect_op(')')
+        return _Create(table, tuple(columns), if_not_exists)
+
+    def select(self) -> _Select:
+        items = []
+        while True:
+            if self.accept_op('*'):
+                items.append(('*', '*'))
+            elif self.peek()[0] in ('name', 'quoted') and not self.is_keyword('TRUE') and \
+                    not self.is_keyword('FALSE') and not self.is_keyword('NULL'):
+                column = self.qualified()
+                items.append((column, self.identifier() if self.accept('AS') else column))
+            else:
+                value = self.value()
+                items.append((value, self.identifier() if self.accept('AS') else '?column?'))
+            if not self.accept_op(','):
+                break
+        table = self.qualified() if self.accept('FROM') else None
+        where = self.where()
+        order = []
+        if self.accept('ORDER', 'BY'):
+            while True:
+                column = self.qualified()
+                descending = self.accept('DESC')
+                if not descending:
+                    self.accept('ASC')
+                order.append((column, descending))
+                if not self.accept_op(','):
+                    break
+        limit = self.value() if self.accept('LIMIT') else None
+        offset = self.value() if self.accept('OFFSET') else None
+        if table is None and (where or order or any(isinstance(column, str) for column, _ in items)):
+            self.error('FROM')
+        return _Select(table, tuple(items), where, tuple(order), limit, offset)
+
+
+class MemoryTransaction:
+    __slots__ = ('undo', 'written')
+
+    def __init__(self) -> None:
+        """
+        Undo log of transaction opened by MemoryDatabase.transaction and tables written in it
+        """
+        self.undo: List[Callable[[], Any]] = []
+        self.written: Set[Optional[str]] = set()
+
+
+class MemoryDatabase(IDatabase):
+    def __init__(self, config: IConfig, latency: float = 0.0, jitter: float = 0.0, pool_size: Optional[int] = None,
+                 seed: Optional[int] = None, plan_cache_size: int = 256) -> None:
+        """
+        In-process database supporting SQL subset used by project: CREATE TABLE, CREATE INDEX, DROP TABLE,
+        INSERT ... VALUES, SELECT with WHERE conditions joined by AND, ORDER BY, LIMIT and OFFSET, UPDATE and DELETE.
+        PRIMARY KEY, UNIQUE and indexed columns are looked up by hash index, other conditions scan table.
+        upsert and update_many are run on tables directly, upsert conflict must be one unique column.
+        Tables are kept after close, so one instance can be connected again.
+        :param config: IConfig-like object, not used to connect anywhere
+        :type config: IConfig
+        :param latency: Seconds every call waits to simulate database round trip
+        :type latency: float
+        :param jitter: Maximum random seconds added to latency
+        :type jitter: float
+        :param pool_size: Simulated pool size, calls over it wait for free connection, None is unlimited
+        :type pool_size: Optional[int]
+        :param seed: Seed of jitter random numbers
+        :type seed: Optional[int]
+        :param plan_cache_size: Parsed queries kept in cache
+        :type plan_cache_size: int
+        """
+        super().__init__(config)
+        assert latency >= 0 and jitter >= 0, 'latency and jitter must not be negative'
+        assert pool_size is None or pool_size > 0, 'pool_size must be positive'
+        self.tables: Dict[str, MemoryTable] = {}
+        self._latency = latency
+        self._jitter = jitter
+        self._random = random.Random(seed)
+        self._pool_size = pool_size
+        self._connections: Optional[asyncio.Semaphore] = None
+        self._plans = LRUCache(plan_cache_size)
+        self._bound: ContextVar[Optional[MemoryTransaction]] = ContextVar('memory_transaction', default=None)
+
+    async def connect(self) -> None:
+        if self._pool_size is not None:
+            self._connections = asyncio.Semaphore(self._pool_size)
+
+    async def close(self) -> None:
+        self._connections = None
+
+    def _plan(self, query: str) -> Tuple[NamedTuple, int]:
+        plan = self._plans.get(query)
+        if plan is None:
+            parser = _Parser(query)
+            plan = (parser.statement(), parser.params)
+            self._plans.put(query, plan)
+        return plan
+
+    def _table(self, name: str) -> MemoryTable:
+        try:
+            return self.tables[name]
+        except KeyError:
+            raise WrongTableNameQuery
+
+    def _log(self, undo: Callable[[], Any]) -> None:
+        bound = self._bound.get()
+        if bound is not None:
+            bound.undo.append(undo)
+
+    def in_transaction(self) -> bool:
+        return self._bound.get() is not None
+
+    def _notify_write(self, table: Optional[str]) -> None:
+        bound = self._bound.get()
+        if bound is not None:
+            bound.written.add(table)
+        else:
+            super()._notify_write(table)
+
+    @contextlib.asynccontextmanager
+    async def _connection(self, event: Optional[QueryEvent]) -> AsyncIterator[None]:
+        if self._connections is None or self._bound.get() is not None:
+            acquire = contextlib.nullcontext()
+        else:
+            acquire = self._connections
+        async with acquire:
+            if event is not None:
+                event.acquired('memory')
+            delay = self._latency + (self._random.uniform(0, self._jitter) if self._jitter else 0.0)
+            if delay:
+                await asyncio.sleep(delay)
+            yield
+
+    async def _run(self, query: str, args: tuple,
+                   event: Optional[QueryEvent] = None) -> Tuple[str, Tuple[str, ...], List[tuple]]:
+        statement, params = self._plan(query)
+        if len(args) != params:
+            raise asyncpg.InterfaceError('the server expects {} arguments for this query, {} were passed'.format(
+                params, len(args)))
+        run = getattr(self, '_run_' + type(statement).__name__[1:].lower())
+        async with self._connection(event):
+            if isinstance(statement, _Select):
+                result = run(statement, args)
+            else:
+                # statements are atomic, e.g. INSERT of many rows stops at unique violation without inserting any
+                with self._atomic():
+                    result = run(statement, args)
+            if event is not None:
+                event.executed()
+            return result
+
+    async def execute(self, query: str, *args: Union[str, int, bool, datetime]) -> str:
+        """
+        Run any supported statement, e.g. to create tables in tests
+        :param query: SQL query, may contain $n placeholders
+        :type query: str
+        :param args: arguments for query placeholders
+        :type args: Union[str, int, bool, datetime]
+        :return: Status of statement as returned by asyncpg, e.g. INSERT 0 1
+        :rtype: str
+        """
+        status, _, _ = await self._run(query, args)
+        if not status.startswith('SELECT'):
+            self._notify_write(written_table(query))
+        return status
+
+    def _run_create(self, statement: _Create, args: tuple) -> Tuple[str, tuple, list]:
+        if statement.table in self.tables:
+            if statement.if_not_exists:
+                return 'CREATE TABLE', (), []
+            raise asyncpg.DuplicateTableError('relation "{}" already exists'.format(statement.table))
+        columns = statement.columns
+        table = MemoryTable(statement.table, [column.name for column in columns],
+                            [column.default for column in columns],
+                            [position for position, column in enumerate(columns) if column.not_null])
+        for position, column in enumerate(columns):
+            if column.primary or column.unique:
+                table.add_index(position, unique=True)
+        self.tables[table.name] = table
+        self._log(lambda: self.tables.pop(table.name))
+        return 'CREATE TABLE', (), []
+
+    def _run_createindex(self, statement: _CreateIndex, args: tuple) -> Tuple[str, tuple, list]:
+        table = self._table(statement.table)
+        position = table.position(statement.column)
+        if position not in table.indexes or statement.unique and position not in table.unique:
+            old, was_unique = table.indexes.get(position), position in table.unique
+            table.add_index(position, statement.unique)
+
+            def undo() -> None:
+                if old is None:
+                    del table.indexes[position]
+                else:
+                    table.indexes[position] = old
+                if not was_unique:
+                    table.unique.discard(position)
+            self._log(undo)
+        return 'CREATE INDEX', (), []
+
+    def _run_drop(self, statement: _Drop, args: tuple) -> Tuple[str, tuple, list]:
+        table = self.tables.pop(statement.table, None)
+        if table is None:
+            if statement.if_exists:
+                return 'DROP TABLE', (), []
+            raise WrongTableNameQuery
+        self._log(lambda: self.tables.__setitem__(table.name, table))
+        return 'DROP TABLE', (), []
+
+    def _run_insert(self, statement: _Insert, args: tuple) -> Tuple[str, tuple, list]:
+        table = self._table(statement.table)
+        rows = [tuple(value(args) for value in values) for values in statement.rows]
+        self._insert_rows(table, rows, statement.columns)
+        return 'INSERT 0 {}'.format(len(rows)), (), []
+
+    def _insert_rows(self, table: MemoryTable, rows: Iterable[tuple], columns: Optional[Sequence[str]]) -> List[int]:
+        positions = range(len(table.columns)) if columns is None else [table.position(c) for c in columns]
+        ids = []
+        for values in rows:
+            if len(values) > len(positions):
+                raise asyncpg.PostgresSyntaxError('INSERT has more expressions than target columns')
+            row = list(table.defaults)
+            for position, value in zip(positions, values):
+                row[position] = value
+            row_id = table.insert(tuple(row))
+            self._log(lambda row_id=row_id: table.delete(row_id))
+            ids.append(row_id)
+        return ids
+
+    def _matching(self, table: MemoryTable, where: Tuple[_Condition, ...], args: tuple) -> List[int]:
+        conditions = []
+        candidates: Optional[Set[int]] = None
+        for condition in where:
+            if isinstance(condition.column, tuple):
+                positions = [table.position(column) for column in condition.column]
+                conditions.append((operator.itemgetter(*positions), condition.op, condition.value(args)))
+                continue
+            position = table.position(condition.column)
+            value = None if condition.value is None else condition.value(args)
+            index = table.indexes.get(position)
+            if candidates is None and index is not None and condition.op in ('=', 'in'):
+                try:
+                    if condition.op == '=':
+                        candidates = set() if value is None else set(index.get(value, ()))
+                    else:
+                        candidates = set().union(*(index.get(v, ()) for v in value if v is not None))
+                    continue
+                except TypeError:
+                    # unhashable value, table is scanned
+                    pass
+            conditions.append((operator.itemgetter(position), condition.op, value))
+        if candidates is None:
+            ids: Iterable[int] = table.rows
+        else:
+            ids = sorted(candidates)
+        rows = table.rows
+        return [row_id for row_id in ids if all(_matches(get(rows[row_id]), op, v) for get, op, v in conditions)]
+
+    def _run_select(self, statement: _Select, args: tuple) -> Tuple[str, tuple, list]:
+        if statement.table is None:
+            columns = tuple(alias for _, alias in statement.items)
+            return 'SELECT 1', columns, [tuple(value(args) for value, _ in statement.items)]
+        table = self._table(statement.table)
+        positions, columns = [], []
+        for column, alias in statement.items:
+            if column == '*':
+                positions.extend(range(len(table.columns)))
+                columns.extend(table.columns)
+            elif isinstance(column, str):
+                positions.append(table.position(column))
+                columns.append(alias)
+            else:
+                positions.append(column)
+                columns.append(alias)
+        rows = [table.rows[row_id] for row_id in self._matching(table, statement.where, args)]
+        for column, descending in reversed(statement.order):
+            position = table.position(column)
+            # NULLS LAST for ascending and NULLS FIRST for descending order, as postgres does
+            rows.sort(key=lambda row: (row[position] is None, row[position]), reverse=descending)
+        offset = statement.offset(args) if statement.offset is not None else 0
+        if statement.limit is not None:
+            rows = rows[offset:offset + statement.limit(args)]
+        elif offset:
+            rows = rows[offset:]
+        result = [tuple(row[p] if isinstance(p, int) else p(args) for p in positions) for row in rows]
+        return 'SELECT {}'.format(len(result)), tuple(columns), result
+
+    def _run_update(self, statement: _Update, args: tuple) -> Tuple[str, tuple, list]:
+        table = self._table(statement.table)
+        assignments = [(table.position(column), value(args)) for column, value in statement.assignments]
+        ids = self._matching(table, statement.where, args)
+        for row_id in ids:
+            row = list(table.rows[row_id])
+            for position, value in assignments:
+                row[position] = value
+            old = table.update(row_id, tuple(row))
+            self._log(lambda row_id=row_id, old=old: table.update(row_id, old))
+        return 'UPDATE {}'.format(len(ids)), (), []
+
+    def _run_delete(self, statement: _Delete, args: tuple) -> Tuple[str, tuple, list]:
+        table = self._table(statement.table)
+        ids = self._matching(table, statement.where, args)
+        for row_id in ids:
+            old = table.delete(row_id)
+            self._log(lambda row_id=row_id, old=old: table.insert(old, row_id))
+        return 'DELETE {}'.format(len(ids)), (), []
+
+    async def _fetch(self, query: str, args: tuple, event: Optional[QueryEvent]) -> List[MemoryRecord]:
+        _, columns, rows = await self._run(query, args, event)
+        index = {}
+        for position, column in enumerate(columns):
+            index.setdefault(column, position)
+        return [MemoryRecord(index, row) for row in rows]
+
+    async def fetchOne(self, query: str, *args: Union[str, int, bool, datetime], raw: bool = False):
+        with self._observe(query) as event:
+            rows = await self._fetch(query, args, event)
+            if not rows:
+                raise RowNotFound
+            row = rows[0] if raw else tuple(rows[0].items())
+            if event is not None:
+                event.decoded()
+                event.rows = 1
+            return row
+
+    async def fetchMany(self, query: str, *args: Union[str, int, bool, datetime], raw: bool = False):
+        with self._observe(query) as event:
+            rows = await self._fetch(query, args, event)
+            if not raw:
+                rows = [tuple(r.items()) for r in rows]
+            if event is not None:
+                event.decoded()
+                event.rows = len(rows)
+            return rows
+
+    async def stream(self, query: str, *args: Union[str, int, bool, datetime], batch_size: int = 100,
+                     batches: bool = False, raw: bool = False) -> AsyncIterator:
+        assert batch_size > 0, 'batch_size must be positive'
+        with self._observe(query) as event:
+            rows = await self._fetch(query, args, event)
+            if event is not None:
+                event.rows = len(rows)
+            for start in range(0, len(rows), batch_size):
+                if event is not None:
+                    event.resume()
+                batch = rows[start:start + batch_size]
+                decoded = batch if raw else [tuple(r.items()) for r in batch]
+                if event is not None:
+                    event.decoded()
+                if batches:
+                    yield decoded
+                else:
+                    for r in decoded:
+                        yield r
+
+    @contextlib.contextmanager
+    def _atomic(self) -> Iterator[None]:
+        bound = self._bound.get()
+        if bound is not None:
+            # savepoint
+            mark = len(bound.undo)
+            try:
+                yield
+            except BaseException:
+                self._rollback(bound, mark)
+                raise
+            return
+        bound = MemoryTransaction()
+        token = self._bound.set(bound)
+        try:
+            yield
+        except BaseException:
+            self._rollback(bound, 0)
+            raise
+        finally:
+            self._bound.reset(token)
+            # rolled back rows were visible to other tasks, so their caches are invalidated too
+            for table in bound.written:
+                self._notify_write(table)
+
+    @staticmethod
+    def _rollback(bound: MemoryTransaction, mark: int) -> None:
+        while len(bound.undo) > mark:
+            bound.undo.pop()()
+
+    @contextlib.asynccontextmanager
+    async def transaction(self) -> AsyncIterator[None]:
+        """
+        Transaction rolled back by undo log, changes are visible to other tasks before commit
+        """
+        acquire = self._connections if self._connections is not None and self._bound.get() is None \
+            else contextlib.nullcontext()
+        async with acquire:
+            with self._atomic():
+                yield
+
+    async def insert(self, query: str, *args: Union[str, int, bool, datetime]) -> None:
+        with self._observe(query) as event:
+            await self._run(query, args, event)
+        self._notify_write(written_table(query))
+
+    async def insert_many(self, table: str,
+                          rows: Iterable[Union[Tuple[Tuple[str, Union[str, bool, datetime, int]]],
+                                               Tuple[Union[str, bool, datetime, int]]]],
+                          columns: Optional[Sequence[str]] = None, chunk_size: int = 10000) -> None:
+        assert chunk_size > 0, 'chunk_size must be positive'
+        columns, records = split_rows(rows, columns)
+        if not records:
+            return
+        name = table_name(table)
+        with self._observe('COPY ' + table) as event:
+            async with self._connection(event):
+                target = self._table(name)
+                for start in range(0, len(records), chunk_size):
+                    with self._atomic():
+                        self._insert_rows(target, records[start:start + chunk_size], columns)
+                    self._notify_write(name)
+                if event is not None:
+                    event.executed()
+                    event.rows = len(records)
+
+    def _find(self, table: MemoryTable, positions: Sequence[int], values: tuple) -> List[int]:
+        index = table.indexes.get(positions[0])
+        ids = table.rows if index is None else index.get(values[0], ())
+        rows = table.rows
+        return [row_id for row_id in ids if all(rows[row_id][p] == v for p, v in zip(positions, values))]
+
+    async def _write_records(self, query: str, table: str, write: Callable[[MemoryTable], List[tuple]],
+                             returning: bool) -> List[MemoryRecord]:
+        name = table.rpartition('.')[2]
+        with self._observe(query) as event:
+            async with self._connection(event):
+                target = self._table(name)
+                with self._atomic():
+                    rows = write(target)
+                if event is not None:
+                    event.executed()
+                    event.rows = len(rows)
+        self._notify_write(name)
+        index = target.positions
+        return [MemoryRecord(index, row) for row in rows] if returning else []
+
+    async def _upsert_rows(self, table: str, columns: Sequence[str], records: List[tuple], conflict: Sequence[str],
+                           update: Sequence[str], returning: bool) -> list:
+        def write(target: MemoryTable) -> List[tuple]:
+            keys = [target.position(column) for column in conflict]
+            if len(keys) != 1 or keys[0] not in target.unique:
+                raise asyncpg.InvalidColumnReferenceError(
+                    'there is no unique or exclusion constraint matching the ON CONFLICT specification')
+            positions = [target.position(column) for column in columns]
+            updated = [target.position(column) for column in update]
+            key = positions.index(keys[0]) if keys[0] in positions else None
+            written = []
+            for record in records:
+                found = [] if key is None else self._find(target, keys, (record[key],))
+                if not found:
+                    row_id, = self._insert_rows(target, [record], columns)
+                    written.append(target.rows[row_id])
+                elif updated:
+                    values = dict(zip(positions, record))
+                    written.append(self._update_row(target, found[0], {p: values[p] for p in updated}))
+            return written
+        query = upsert_query(table, columns, len(records), conflict, update, returning)
+        return await self._write_records(query, table, write, returning)
+
+    async def _update_rows(self, table: str, columns: Sequence[str], records: List[tuple], key: Sequence[str],
+                           returning: bool) -> list:
+        def write(target: MemoryTable) -> List[tuple]:
+            positions = [target.position(column) for column in columns]
+            keys = [positions[columns.index(column)] for column in key]
+            written = []
+            for record in records:
+                values = dict(zip(positions, record))
+                for row_id in self._find(target, keys, tuple(values[p] for p in keys)):
+                    written.append(self._update_row(target, row_id, values))
+            return written
+        query = update_query(table, columns, len(records), key, None, returning)
+        return await self._write_records(query, table, write, returning)
+
+    def _update_row(self, table: MemoryTable, row_id: int, values: Dict[int, Any]) -> tuple:
+        row = list(table.rows[row_id])
+        for position, value in values.items():
+            row[position] = value
+        row = tuple(row)
+        old = table.update(row_id, row)
+        self._log(lambda: table.update(row_id, old))
+        return row
+
+
+def _constant(value: Any) -> Value:
+    return lambda args: value
+
+
+def _cast(value: Value, cast: Callable[[Any], Any]) -> Value:
+    def cast_value(args: tuple) -> Any:
+        result = value(args)
+        return None if result is None else cast(result)
+    return cast_value
+
+
+def _list(values: Tuple[Value, ...]) -> Value:
+    return lambda args: [value(args) for value in values]
+
+
+def _row(values: Tuple[Value, ...]) -> Value:
+    return lambda args: tuple(value(args) for value in values)
+
+
+def _matches(value: Any, op: str, expected: Any) -> bool:
+    if op == 'is null':
+        return value is None
+    if op == 'is not null':
+        return value is not None
+    if value is None:
+        return False
+    if op == 'in':
+        return value in expected
+    if op == 'not in':
+        return None not in expected and value not in expected
+    if expected is None:
+        return False
+    if isinstance(value, tuple) and (None in value or None in expected):
+        # row comparison with NULL member is treated as unknown
+        return False
+    return _COMPARISONS[op](value, expected)
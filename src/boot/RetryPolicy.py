@@ -0,0 +1,97 @@
+import asyncio
+import random
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from src.tools.exceptions import RetriesExhausted
+
+T = TypeVar('T')
+
+
+class RetryPolicy:
+    def __init__(self, attempts: int = 3, base_delay: float = 0.05, max_delay: float = 2.0,
+                 budget_ratio: float = 0.1, budget_burst: float = 10.0, seed: Optional[int] = None) -> None:
+        """
+        Retry of calls failed with transient error, with exponential backoff and full jitter.
+        Retry budget limits retries to budget_ratio of calls: every call deposits budget_ratio tokens,
+        every retry takes one, at most budget_burst tokens are kept, so retries can not multiply load
+        while database is struggling
+        :param attempts: Maximum attempts of one call, first one included
+        :type attempts: int
+        :param base_delay: Seconds of backoff before first retry, doubled for every next one
+        :type base_delay: float
+        :param max_delay: Maximum seconds of backoff
+        :type max_delay: float
+        :param budget_ratio: Retries allowed per call
+        :type budget_ratio: float
+        :param budget_burst: Retries allowed at once, budget is full at start
+        :type budget_burst: float
+        :param seed: Random seed of jitter, e.g. for repeatable tests
+        :type seed: Optional[int]
+        """
+        assert attempts > 0, 'attempts must be positive'
+        assert 0 <= base_delay <= max_delay, 'base_delay must be between 0 and max_delay'
+        assert budget_ratio >= 0, 'budget_ratio must not be negative'
+        assert budget_burst >= 1, 'budget_burst must allow at least one retry'
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget_ratio = budget_ratio
+        self.budget_burst = budget_burst
+        self.tokens = budget_burst
+        self.calls = 0
+        self.retries = 0
+        self.exhausted = 0
+        self.budget_rejected = 0
+        self._random = random.Random(seed)
+
+    def delay(self, retry: int) -> float:
+        """
+        Backoff before retry, random between 0 and base_delay * 2 ** (retry - 1) capped by max_delay
+        :param retry: Number of retry, starting from 1
+        :type retry: int
+        :return: Seconds to sleep
+        :rtype: float
+        """
+        return self._random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (retry - 1)))
+
+    def _withdraw(self) -> bool:
+        if self.tokens < 1:
+            self.budget_rejected += 1
+            return False
+        self.tokens -= 1
+        return True
+
+    async def run(self, call: Callable[[], Awaitable[T]], transient: Callable[[BaseException], bool]) -> T:
+        """
+        Await call, repeating it after transient errors while attempts and budget allow
+        :param call: Function creating new awaitable for every attempt
+        :type call: Callable[[], Awaitable[T]]
+        :param transient: Whether error may not happen again
+        :type transient: Callable[[BaseException], bool]
+        :return: Result of call
+        :rtype: T
+        """
+        self.calls += 1
+        self.tokens = min(self.budget_burst, self.tokens + self.budget_ratio)
+        attempt = 1
+        while True:
+            try:
+                return await call()
+            except Exception as error:
+                if not transient(error):
+                    raise
+                if attempt >= self.attempts or not self._withdraw():
+                    self.exhausted += 1
+                    raise RetriesExhausted('call failed after {} attempts: {!r}'.format(attempt, error)) from error
+            self.retries += 1
+            await asyncio.sleep(self.delay(attempt))
+            attempt += 1
+
+    def info(self) -> dict:
+        """
+        Retry statistics
+        :return: dict with calls, retries, exhausted calls, retries rejected by budget and budget tokens left
+        :rtype: dict
+        """
+        return dict(calls=self.calls, retries=self.retries, exhausted=self.exhausted,
+                    budget_rejected=self.budget_rejected, tokens=self.tokens)
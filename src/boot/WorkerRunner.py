@@ -0,0 +1,261 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import time
+from multiprocessing.connection import wait
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from src.boot.Boot import Boot
+from src.boot.Config import Config, IConfig, env_number
+from src.boot.IDatabase import IDatabase
+
+logger = logging.getLogger(__name__)
+
+Worker = Callable[[IDatabase, asyncio.Event], Awaitable[None]]
+
+
+def worker_config(config: IConfig, workers: int, budget: Optional[int] = None) -> IConfig:
+    """
+    Config of one of workers processes, pools are sized so all workers together open
+    at most budget connections to every database server
+    :param config: Shared config
+    :type config: IConfig
+    :param workers: Number of workers processes
+    :type workers: int
+    :param budget: Connections allowed to every server, e.g. part of postgres max_connections, None keeps pool sizes
+    :type budget: Optional[int]
+    :return: Config with db_min_size and db_max_size of one worker
+    :rtype: IConfig
+    """
+    assert workers > 0, 'workers must be positive'
+    assert budget is None or budget >= workers, 'connection budget must give every worker at least one connection'
+    max_size = config.db_max_size if budget is None else min(config.db_max_size, budget // workers)
+    return Config(port=config.port, db_host=config.db_host, db_port=config.db_port, db_name=config.db_name,
+                  db_user=config.db_user, db_password=config.db_password, db_replicas=config.db_replicas,
+                  db_min_size=min(config.db_min_size, max_size), db_max_size=max_size,
+                  db_max_queries=config.db_max_queries, db_max_inactive_lifetime=config.db_max_inactive_lifetime,
+                  db_command_timeout=config.db_command_timeout,
+                  db_statement_cache_size=config.db_statement_cache_size)
+
+
+def _run_worker(worker: Worker, config: IConfig, database_factory: Optional[Callable[[IConfig], IDatabase]],
+                drain_timeout: float) -> None:
+    # forked process must not run parent handlers
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGHUP, signal.SIG_DFL)
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    stopping = asyncio.Event()
+    # handler is installed before boot, SIGTERM sent earlier was kept pending by mask inherited from _spawn
+    loop.add_signal_handler(signal.SIGTERM, stopping.set)
+    if hasattr(signal, 'pthread_sigmask'):
+        signal.pthread_sigmask(signal.SIG_UNBLOCK, {signal.SIGTERM})
+    try:
+        loop.run_until_complete(_serve(worker, config, database_factory, drain_timeout, stopping))
+    finally:
+        loop.close()
+
+
+async def _serve(worker: Worker, config: IConfig, database_factory: Optional[Callable[[IConfig], IDatabase]],
+                 drain_timeout: float, stopping: asyncio.Event) -> None:
+    boot = Boot(lambda: config, database_factory)
+    db = await boot.start()
+    try:
+        if stopping.is_set():
+            # terminated while booting, worker is not started
+            return
+        task = asyncio.ensure_future(worker(db, stopping))
+        waiter = asyncio.ensure_future(stopping.wait())
+        await asyncio.wait((task, waiter), return_when=asyncio.FIRST_COMPLETED)
+        waiter.cancel()
+        if not task.done():
+            # draining: worker finishes requests it has already taken
+            done, _ = await asyncio.wait((task,), timeout=drain_timeout)
+            if not done:
+                logger.warning('worker %d did not drain in %.1fs, cancelling it', os.getpid(), drain_timeout)
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                return
+        await task
+    finally:
+        await boot.stop()
+
+
+class WorkerRunner:
+    def __init__(self, worker: Worker, config: IConfig, workers: Optional[int] = None,
+                 connection_budget: Optional[int] = None,
+                 database_factory: Optional[Callable[[IConfig], IDatabase]] = None, drain_timeout: float = 30.0,
+                 restart_delay: float = 1.0) -> None:
+        """
+        Pre-fork runner: config is loaded once in parent process, every worker process opens its own pool,
+        sized from connection budget. Workers which exit are started again.
+        SIGTERM and SIGINT drain and stop all workers, SIGHUP restarts them one by one.
+        :param worker: Coroutine function serving with database until stopping event is set
+        :type worker: Callable[[IDatabase, asyncio.Event], Awaitable[None]]
+        :param config: Config shared by all workers
+        :type config: IConfig
+        :param workers: Number of workers processes, number of CPUs by default
+        :type workers: Optional[int]
+        :param connection_budget: Connections all workers may open to every database server, None keeps pool sizes
+        :type connection_budget: Optional[int]
+        :param database_factory: Creates database from worker config, Database by default
+        :type database_factory: Optional[Callable[[IConfig], IDatabase]]
+        :param drain_timeout: Seconds worker has to finish after stopping event is set, then it is cancelled
+        :type drain_timeout: float
+        :param restart_delay: Seconds before exited worker is started again
+        :type restart_delay: float
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.config = worker_config(config, self.workers, connection_budget)
+        self._worker = worker
+        self._database_factory = database_factory
+        self._drain_timeout = drain_timeout
+        self._restart_delay = restart_delay
+        self._context = multiprocessing.get_context('fork' if hasattr(os, 'fork') else 'spawn')
+        self._processes: List[Optional[multiprocessing.process.BaseProcess]] = [None] * self.workers
+        self._stopping = False
+        self._restart_requested = False
+        self.restarts = 0
+
+    @classmethod
+    def from_env(cls, worker: Worker, **kwargs) -> 'WorkerRunner':
+        """
+        Create runner from Config.from_env and environment variables:
+        workers from optional WORKERS
+        connection_budget from optional DB_CONNECTION_BUDGET
+        :param worker: Coroutine function serving with database until stopping event is set
+        :type worker: Callable[[IDatabase, asyncio.Event], Awaitable[None]]
+        :return: Runner
+        :rtype: WorkerRunner
+        """
+        return cls(worker, Config.from_env(), workers=env_number('WORKERS', int, None, minimum=1),
+                   connection_budget=env_number('DB_CONNECTION_BUDGET', int, None, minimum=1), **kwargs)
+
+    @property
+    def pids(self) -> List[Optional[int]]:
+        return [process.pid if process is not None else None for process in self._processes]
+
+    def _spawn(self, index: int) -> None:
+        process = self._context.Process(target=_run_worker, name='worker-{}'.format(index), daemon=True,
+                                        args=(self._worker, self.config, self._database_factory, self._drain_timeout))
+        if not hasattr(signal, 'pthread_sigmask'):
+            process.start()
+        else:
+            # forked worker starts with SIGTERM blocked, so terminate is not lost before its handler is installed
+            blocked = signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGTERM})
+            try:
+                process.start()
+            finally:
+                signal.pthread_sigmask(signal.SIG_SETMASK, blocked)
+        self._processes[index] = process
+        logger.info('started worker %d with pid %d', index, process.pid)
+
+    def _drain(self, process: multiprocessing.process.BaseProcess) -> None:
+        if process.is_alive():
+            process.terminate()
+        process.join(self._drain_timeout + 5)
+        if process.is_alive():
+            logger.warning('worker with pid %d did not stop, killing it', process.pid)
+            process.kill()
+            process.join()
+
+    def start(self) -> None:
+        """
+        Start all workers processes
+        :return: None
+        :rtype: None
+        """
+        self._stopping = False
+        for index, process in enumerate(self._processes):
+            if process is None or not process.is_alive():
+                self._spawn(index)
+
+    def stop(self) -> None:
+        """
+        Drain and stop all workers, waits until they exit
+        :return: None
+        :rtype: None
+        """
+        self._stopping = True
+        for process in self._processes:
+            if process is not None and process.is_alive():
+                process.terminate()
+        for index, process in enumerate(self._processes):
+            if process is not None:
+                self._drain(process)
+                self._processes[index] = None
+
+    def restart(self) -> None:
+        """
+        Graceful restart: workers are drained and started again one by one,
+        so connection budget is never exceeded and other workers keep serving
+        :return: None
+        :rtype: None
+        """
+        for index, process in enumerate(self._processes):
+            if self._stopping:
+                return
+            if process is not None:
+                self._drain(process)
+            self._spawn(index)
+            self.restarts += 1
+
+    def supervise(self, timeout: Optional[float] = None) -> None:
+        """
+        Start again workers which exited, until stop is called or timeout passes
+        :param timeout: Seconds to supervise, None until stop
+        :type timeout: Optional[float]
+        :return: None
+        :rtype: None
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        # exited workers are started again when their deadline passes, without blocking supervision
+        restart_at: Dict[int, float] = {}
+        while not self._stopping:
+            if self._restart_requested:
+                self._restart_requested = False
+                restart_at.clear()
+                self.restart()
+                continue
+            now = time.monotonic()
+            for index, process in enumerate(self._processes):
+                if index not in restart_at and process is not None and not process.is_alive():
+                    logger.warning('worker %d with pid %d exited with code %s', index, process.pid, process.exitcode)
+                    process.join()
+                    restart_at[index] = now + self._restart_delay
+            for index, at in list(restart_at.items()):
+                if at <= now:
+                    del restart_at[index]
+                    self._spawn(index)
+                    self.restarts += 1
+            remaining = None if deadline is None else deadline - now
+            if remaining is not None and remaining <= 0:
+                return
+            timeouts = [1.0] + [at - now for at in restart_at.values()] + ([] if remaining is None else [remaining])
+            sentinels = [process.sentinel for index, process in enumerate(self._processes)
+                         if process is not None and index not in restart_at]
+            wait(sentinels, timeout=max(0.0, min(timeouts)))
+
+    def run(self) -> None:
+        """
+        Start workers and supervise them until SIGTERM or SIGINT, SIGHUP restarts workers
+        :return: None
+        :rtype: None
+        """
+        def request_stop(signum, frame) -> None:
+            self._stopping = True
+
+        def request_restart(signum, frame) -> None:
+            self._restart_requested = True
+
+        previous = {signum: signal.signal(signum, handler) for signum, handler in (
+            (signal.SIGTERM, request_stop), (signal.SIGINT, request_stop), (signal.SIGHUP, request_restart))}
+        try:
+            self.start()
+            self.supervise()
+        finally:
+            self.stop()
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
@@ -0,0 +1,121 @@
+import asyncio
+import time
+from datetime import datetime
+from typing import Callable, Dict, Hashable, Optional, Sequence, Tuple, Type, Union
+
+from src.boot.IDatabase import IDatabase, quote_ident, quote_table, table_name
+from src.models.IBaseModel import IBaseModel
+from src.tools.LRUCache import LRUCache
+
+
+class CachedRepository:
+    model: Type[IBaseModel] = None
+    keys: Sequence[str] = ('id',)
+
+    def __init__(self, db: IDatabase, maxsize: int = 1024, ttl: Optional[float] = 60.0,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        """
+        Read-through cache of models looked up by primary key or unique fields.
+        Cached models are dropped when database reports write to model table, any write drops all of them,
+        as written rows are not known.
+        Lookups inside transaction bypass cache, as they may see rows which are rolled back.
+        Returned models are shared between callers and must not be modified.
+        :param db: IDatabase-like object
+        :type db: IDatabase
+        :param maxsize: Maximum number of cached lookups
+        :type maxsize: int
+        :param ttl: Seconds after which cached model expires, None to keep models until evicted
+        :type ttl: Optional[float]
+        :param clock: Time source for ttl
+        :type clock: Callable[[], float]
+        """
+        assert self.model is not None and self.model.__table__ is not None, \
+            'CachedRepository subclass must define model with __table__'
+        self._db = db
+        self._cache = LRUCache(maxsize, ttl=ttl, clock=clock)
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._generation = 0
+        # table is named in queries and compared with written tables in the same folded form
+        self._table = table_name(self.model.__table__)
+        self._queries = {key: 'SELECT * FROM {} WHERE {} = $1'.format(quote_table(self.model.__table__),
+                                                                       quote_ident(key))
+                         for key in self.keys}
+        self.coalesced = 0
+        self.invalidations = 0
+        db.add_write_listener(self._on_write)
+
+    def close(self) -> None:
+        """
+        Stop listening database writes and drop cached models
+        :return: None
+        :rtype: None
+        """
+        self._db.remove_write_listener(self._on_write)
+        self.invalidate()
+
+    def _on_write(self, table: Optional[str]) -> None:
+        if table is None or table_name(table) == self._table:
+            self.invalidate()
+
+    def invalidate(self) -> None:
+        """
+        Drop all cached models, lookups running now will not be cached
+        :return: None
+        :rtype: None
+        """
+        self._cache.clear()
+        self._generation += 1
+        self.invalidations += 1
+
+    async def get(self, key: str, value: Union[str, int, bool, datetime]) -> IBaseModel:
+        """
+        Get model by unique field, concurrent lookups of the same value share one query,
+        if model not found raises RowNotFound
+        :param key: Name of unique field, one of keys
+        :type key: str
+        :param value: Field value
+        :type value: Union[str, int, bool, datetime]
+        :return: Cached or fetched model
+        :rtype: IBaseModel
+        """
+        assert key in self._queries, '{} is not a cached key'.format(key)
+        if self._db.in_transaction():
+            return self.model.from_row(await self._db.fetchOne(self._queries[key], value, raw=True))
+        cache_key: Tuple[str, Hashable] = (key, value)
+        model = self._cache.get(cache_key)
+        if model is not None:
+            return model
+        task = self._inflight.get(cache_key)
+        if task is None:
+            # query runs in own task, so cancelled caller does not cancel it for coalesced waiters
+            task = asyncio.ensure_future(self._fetch(key, value, cache_key, self._generation))
+            task.add_done_callback(self._retrieve_exception)
+            self._inflight[cache_key] = task
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    async def _fetch(self, key: str, value: Union[str, int, bool, datetime], cache_key: Tuple[str, Hashable],
+                     generation: int) -> IBaseModel:
+        try:
+            model = self.model.from_row(await self._db.fetchOne(self._queries[key], value, raw=True))
+        finally:
+            del self._inflight[cache_key]
+        if generation == self._generation:
+            for name in self.keys:
+                self._cache.put((name, getattr(model, name)), model)
+        return model
+
+    @staticmethod
+    def _retrieve_exception(task: asyncio.Task) -> None:
+        # exception is delivered to waiters, retrieve it to keep loop quiet if all of them are cancelled
+        if not task.cancelled():
+            task.exception()
+
+    def info(self) -> dict:
+        """
+        Cache statistics
+        :return: dict with hits, misses, evictions, expirations, size, maxsize, coalesced and invalidations
+        :rtype: dict
+        """
+        return dict(self._cache.info(), coalesced=self.coalesced, invalidations=self.invalidations)
@@ -0,0 +1,16 @@
+from src.models.CachedRepository import CachedRepository
+from src.models.UserModel import UserModel
+
+
+class CachedUserRepository(CachedRepository):
+    model = UserModel
+    keys = ('id', 'username', 'email')
+
+    async def get_by_id(self, id: int) -> UserModel:
+        return await self.get('id', id)
+
+    async def get_by_username(self, username: str) -> UserModel:
+        return await self.get('username', username)
+
+    async def get_by_email(self, email: str) -> UserModel:
+        return await self.get('email', email)
@@ -1,11 +1,26 @@
 import abc
+from collections.abc import Mapping
 from datetime import datetime
-from typing import List, Tuple, Union
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Sequence, Tuple, Union
 
-from src.boot.Database import IDatabase
+from src.boot.IDatabase import IDatabase
+from src.models.ModelSchema import ModelSchema
+from src.models.Page import Page
+from src.models.RowDecoder import RowDecoder
+from src.tools.exceptions import NotEnoughData
 
 
 class IBaseModel(abc.ABC):
+    __slots__ = ()
+    __table__: Optional[str] = None
+    __schema__: ModelSchema = ModelSchema(())
+    _row_plans: Dict[Tuple[str, ...], Tuple[int, ...]] = {}
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        cls.__schema__ = ModelSchema.from_init(cls)
+        cls._row_plans = {}
+
     @abc.abstractmethod
     def to_dict(self) -> dict:
         """
@@ -18,7 +33,7 @@ class IBaseModel(abc.ABC):
     @abc.abstractmethod
     def from_row(cls, data: Tuple[Tuple[str, Union[str, bool, datetime, int]]]) -> 'IBaseModel':
         """
-        Must return model, constructed from given tuple
+        Must return model, constructed from given tuple, asyncpg.Record or mapping
         :param data: Row from database
         :type data: Tuple[Tuple[str, Union[str, bool, datetime, int]]]
         :return: Model from dict
@@ -32,3 +47,143 @@ class IBaseModel(abc.ABC):
         :return: Row for db insert
         :rtype: Tuple[Tuple[str, Union[str, bool, datetime, int]]]
         """
+
+    @classmethod
+    def decoder(cls) -> RowDecoder:
+        """
+        Decoder validating and coercing rows to field types in one pass, created once per model class
+        :return: Row decoder of model
+        :rtype: RowDecoder
+        """
+        decoder = cls.__dict__.get('_decoder')
+        if decoder is None:
+            decoder = RowDecoder(cls)
+            cls._decoder = decoder
+        return decoder
+
+    @classmethod
+    def field_names(cls) -> Tuple[str, ...]:
+        """
+        Names of model fields in constructor arguments order, taken from class schema
+        :return: Fields names
+        :rtype: Tuple[str, ...]
+        """
+        return cls.__schema__.names
+
+    @classmethod
+    def row_plan(cls, columns: Tuple[str, ...]) -> Tuple[int, ...]:
+        """
+        Positions of model fields in rows with given columns, resolved once per columns shape,
+        if some fields are not in columns raises NotEnoughData
+        :param columns: Columns names of row
+        :type columns: Tuple[str, ...]
+        :return: Column position for every field from field_names
+        :rtype: Tuple[int, ...]
+        """
+        plan = cls._row_plans.get(columns)
+        if plan is None:
+            positions = {}
+            for position, column in enumerate(columns):
+                positions.setdefault(column, position)
+            fields = cls.__schema__.names
+            missing = [field for field in fields if field not in positions]
+            if missing:
+                raise NotEnoughData(missing)
+            plan = tuple(positions[field] for field in fields)
+            cls._row_plans[columns] = plan
+        return plan
+
+    @classmethod
+    def from_record(cls, record: Any) -> 'IBaseModel':
+        """
+        Construct model from asyncpg.Record, or any mapping, without converting it to tuple of pairs,
+        if some fields has no values raises NotEnoughData
+        :param record: Record fetched with raw=True or mapping from field name to value
+        :type record: Any
+        :return: Model from record
+        :rtype: IBaseModel
+        """
+        if isinstance(record, Mapping):
+            fields = cls.__schema__.names
+            missing = [field for field in fields if field not in record]
+            if missing:
+                raise NotEnoughData(missing)
+            return cls(*[record[field] for field in fields])
+        return cls(*[record[position] for position in cls.row_plan(tuple(record.keys()))])
+
+    @classmethod
+    def from_records(cls, records: Iterable[Any]) -> List['IBaseModel']:
+        """
+        Construct models from records of one query, columns positions are resolved by first record only
+        :param records: Records fetched with raw=True
+        :type records: Iterable[Any]
+        :return: Models from records
+        :rtype: List[IBaseModel]
+        """
+        records = iter(records)
+        first = next(records, None)
+        if first is None:
+            return []
+        if isinstance(first, Mapping):
+            return [cls.from_record(first)] + [cls.from_record(record) for record in records]
+        plan = cls.row_plan(tuple(first.keys()))
+        out = [cls(*[first[position] for position in plan])]
+        out.extend(cls(*[record[position] for position in plan]) for record in records)
+        return out
+
+    @classmethod
+    async def stream_from_query(cls, db: IDatabase, query: str, *args: Union[str, int, bool, datetime],
+                                batch_size: int = 100) -> AsyncIterator['IBaseModel']:
+        """
+        Iterate models constructed from rows of query, rows are streamed from database by batch_size
+        :param db: IDatabase-like object
+        :type db: IDatabase
+        :param query: SQL query, may contain $n placeholders
+        :type query: str
+        :param args: arguments for query placeholders
+        :type args: Union[str, int, bool, datetime]
+        :param batch_size: number of rows fetched from database at once
+        :type batch_size: int
+        :return: Async iterator over models
+        :rtype: AsyncIterator[IBaseModel]
+        """
+        async for batch in db.stream(query, *args, batch_size=batch_size, batches=True, raw=True):
+            for model in cls.from_records(batch):
+                yield model
+
+    @classmethod
+    async def page(cls, db: IDatabase, cursor: Optional[str] = None, size: int = 100, key: Sequence[str] = ('id',),
+                   descending: bool = False, where: Optional[str] = None, args: Sequence[Any] = (),
+                   table: Optional[str] = None, prefetch: bool = True) -> Page:
+        """
+        Page of models by keyset pagination: rows are ordered by key and next page starts after key of
+        last row, so with index on key deep pages cost the same as first one and rows written meanwhile
+        do not shift pages. Next page is prefetched in background while current one is used
+        :param db: IDatabase-like object
+        :type db: IDatabase
+        :param cursor: Cursor of page from previous Page.cursor, None for first page, raises InvalidCursor if wrong
+        :type cursor: Optional[str]
+        :param size: Models on page
+        :type size: int
+        :param key: Columns of order, together unique and not NULL
+        :type key: Sequence[str]
+        :param descending: Order from greatest key
+        :type descending: bool
+        :param where: Filter condition with $1..$n placeholders for args
+        :type where: Optional[str]
+        :param args: arguments for where placeholders
+        :type args: Sequence[Any]
+        :param table: Table name, model __table__ by default
+        :type table: Optional[str]
+        :param prefetch: Fetch next page in background
+        :type prefetch: bool
+        :return: Page with models and cursor of next page
+        :rtype: Page
+        """
+        assert size > 0, 'size must be positive'
+        assert key, 'key must have columns'
+        table = table or cls.__table__
+        assert table, '{} has no __table__, table must be given'.format(cls.__name__)
+        page = await Page.load(cls, db, table, key, size, cursor, descending, where, args, prefetch)
+        page.prefetch()
+        return page
@@ -0,0 +1,172 @@
+from array import array
+from collections.abc import Mapping
+from datetime import datetime
+from typing import Any, Iterable, Iterator, List, MutableSequence, Tuple, Type, Union
+
+from src.boot.IDatabase import IDatabase
+from src.models.IBaseModel import IBaseModel
+from src.tools.exceptions import NotEnoughData
+
+
+class ModelRow:
+    __slots__ = ('_batch', '_index')
+
+    def __init__(self, batch: 'ModelBatch', index: int) -> None:
+        """
+        Lightweight view of one row of ModelBatch, fields are read from batch columns on access
+        :param batch: Batch which holds row values
+        :type batch: ModelBatch
+        :param index: Row index in batch
+        :type index: int
+        """
+        self._batch = batch
+        self._index = index
+
+    def __getattr__(self, name: str) -> Any:
+        position = self._batch.model.__schema__.positions.get(name)
+        if position is None:
+            raise AttributeError(name)
+        return self._batch.columns[position][self._index]
+
+    def __repr__(self) -> str:
+        return '{}Row({})'.format(self._batch.model.__name__, self.to_dict())
+
+    def values(self) -> tuple:
+        index = self._index
+        return tuple(column[index] for column in self._batch.columns)
+
+    def to_dict(self) -> dict:
+        return dict(zip(self._batch.model.__schema__.names, self.values()))
+
+    def to_row(self) -> Tuple[Tuple[str, Union[str, bool, datetime, int]]]:
+        return tuple(zip(self._batch.model.__schema__.names, self.values()))
+
+    def to_model(self) -> IBaseModel:
+        return self._batch.model(*self.values())
+
+
+class ModelBatch:
+    model: Type[IBaseModel] = None
+
+    def __init__(self, models: Iterable[IBaseModel] = ()) -> None:
+        """
+        Column-oriented container of models, stores one list per field (array for int fields)
+        and gives out ModelRow views on demand
+        :param models: Models to fill batch with
+        :type models: Iterable[IBaseModel]
+        """
+        assert self.model is not None, 'ModelBatch subclass must define model'
+        self.columns: List[MutableSequence] = [array('q') if field_type is int else []
+                                               for field_type in self.model.__schema__.types]
+        self._length = 0
+        self.extend(models)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index: int) -> ModelRow:
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError('batch index out of range')
+        return ModelRow(self, index)
+
+    def __iter__(self) -> Iterator[ModelRow]:
+        return (ModelRow(self, index) for index in range(self._length))
+
+    def column(self, name: str) -> MutableSequence:
+        """
+        Values of one field for all rows
+        :param name: Field name
+        :type name: str
+        :return: Column values
+        :rtype: MutableSequence
+        """
+        return self.columns[self.model.__schema__.positions[name]]
+
+    def _extend_column(self, position: int, values: list) -> None:
+        column = self.columns[position]
+        size = len(column)
+        try:
+            column.extend(values)
+        except (TypeError, OverflowError):
+            # value does not fit typed array, e.g. None, keep column as plain list
+            del column[size:]
+            self.columns[position] = column.tolist() + values
+
+    def append(self, model: IBaseModel) -> None:
+        """
+        Add model values to batch
+        :param model: Model of batch model class
+        :type model: IBaseModel
+        :return: None
+        :rtype: None
+        """
+        for position, value in enumerate(self.model.__schema__.getter(model)):
+            self._extend_column(position, [value])
+        self._length += 1
+
+    def extend(self, models: Iterable[IBaseModel]) -> None:
+        """
+        Add values of many models to batch
+        :param models: Models of batch model class
+        :type models: Iterable[IBaseModel]
+        :return: None
+        :rtype: None
+        """
+        getter = self.model.__schema__.getter
+        rows = [getter(model) for model in models]
+        if not rows:
+            return
+        for position, values in enumerate(zip(*rows)):
+            self._extend_column(position, list(values))
+        self._length += len(rows)
+
+    def extend_records(self, records: List[Any]) -> None:
+        """
+        Fill batch columns directly from asyncpg.Record objects or mappings of one query,
+        if some fields are not in records raises NotEnoughData
+        :param records: Records fetched with raw=True
+        :type records: List[Any]
+        :return: None
+        :rtype: None
+        """
+        if not records:
+            return
+        if isinstance(records[0], Mapping):
+            names = self.model.__schema__.names
+            missing = [name for name in names if name not in records[0]]
+            if missing:
+                raise NotEnoughData(missing)
+            plan = names
+        else:
+            plan = self.model.row_plan(tuple(records[0].keys()))
+        for position, key in enumerate(plan):
+            self._extend_column(position, [record[key] for record in records])
+        self._length += len(records)
+
+    def to_models(self) -> List[IBaseModel]:
+        """
+        Construct model for every row
+        :return: Models
+        :rtype: List[IBaseModel]
+        """
+        model = self.model
+        return [model(*values) for values in zip(*self.columns)]
+
+    @classmethod
+    async def fetch(cls, db: IDatabase, query: str, *args: Union[str, int, bool, datetime]) -> 'ModelBatch':
+        """
+        Create batch filled from query rows, records are not converted to tuples of pairs or models
+        :param db: IDatabase-like object
+        :type db: IDatabase
+        :param query: SQL query, may contain $n placeholders
+        :type query: str
+        :param args: arguments for query placeholders
+        :type args: Union[str, int, bool, datetime]
+        :return: Filled batch
+        :rtype: ModelBatch
+        """
+        batch = cls()
+        batch.extend_records(await db.fetchMany(query, *args, raw=True))
+        return batch
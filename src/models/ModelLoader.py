@@ -0,0 +1,114 @@
+import asyncio
+import contextvars
+from typing import Dict, Hashable, List, Optional, Sequence, Set, Type
+
+from src.boot.IDatabase import IDatabase, quote_ident
+from src.models.IBaseModel import IBaseModel
+from src.tools.exceptions import RowNotFound
+
+
+class ModelLoader:
+    model: Type[IBaseModel] = None
+    key: str = 'id'
+
+    def __init__(self, db: IDatabase, max_batch_size: int = 1000) -> None:
+        """
+        Batching loader of models by key: lookups made in the same event loop tick are fetched
+        by one key = ANY($1) query, concurrent lookups of the same key share one model.
+        Returned models are shared between callers and must not be modified.
+        Batches are fetched in clean context, lookups inside transaction are not batched
+        and see rows of transaction.
+        :param db: IDatabase-like object
+        :type db: IDatabase
+        :param max_batch_size: Maximum number of keys fetched by one query
+        :type max_batch_size: int
+        """
+        assert self.model is not None and self.model.__table__ is not None, \
+            'ModelLoader subclass must define model with __table__'
+        assert max_batch_size > 0, 'max_batch_size must be positive'
+        self._db = db
+        self._max_batch_size = max_batch_size
+        self._query = 'SELECT * FROM {} WHERE {} = ANY($1)'.format(self.model.__table__, quote_ident(self.key))
+        self._batch: Optional[Dict[Hashable, asyncio.Future]] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self.loads = 0
+        self.batches = 0
+
+    async def load(self, key: Hashable) -> IBaseModel:
+        """
+        Get model by key, if model not found raises RowNotFound
+        :param key: Key field value
+        :type key: Hashable
+        :return: Fetched model
+        :rtype: IBaseModel
+        """
+        self.loads += 1
+        if self._db.in_transaction():
+            return await self._fetch_bound(key)
+        if self._batch is None:
+            self._batch = {}
+            # batch is shared by all tasks, it must not run in context of first caller
+            asyncio.get_running_loop().call_soon(self._dispatch, context=contextvars.Context())
+        future = self._batch.get(key)
+        if future is None:
+            future = self._batch[key] = asyncio.get_running_loop().create_future()
+        return await asyncio.shield(future)
+
+    async def load_many(self, keys: Sequence[Hashable]) -> List[IBaseModel]:
+        """
+        Get models by keys in keys order, all keys are fetched in one batch,
+        if some model not found raises RowNotFound
+        :param keys: Key field values
+        :type keys: Sequence[Hashable]
+        :return: Fetched models
+        :rtype: List[IBaseModel]
+        """
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    def _dispatch(self) -> None:
+        batch, self._batch = self._batch, None
+        keys = list(batch)
+        for start in range(0, len(keys), self._max_batch_size):
+            chunk = {key: batch[key] for key in keys[start:start + self._max_batch_size]}
+            task = asyncio.get_running_loop().create_task(self._fetch(chunk), context=contextvars.Context())
+            # keep reference, so task is not garbage collected while running
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _fetch_bound(self, key: Hashable) -> IBaseModel:
+        self.batches += 1
+        rows = await self._db.fetchMany(self._query, [key], raw=True)
+        if not rows:
+            raise RowNotFound
+        return self.model.from_row(rows[0])
+
+    async def _fetch(self, batch: Dict[Hashable, asyncio.Future]) -> None:
+        self.batches += 1
+        try:
+            rows = await self._db.fetchMany(self._query, list(batch), raw=True)
+        except BaseException as error:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(error)
+                    # waiter may be cancelled already, retrieve exception to keep loop quiet
+                    future.exception()
+            if not isinstance(error, Exception):
+                raise
+            return
+        for row in rows:
+            model = self.model.from_row(row)
+            future = batch.get(getattr(model, self.key))
+            if future is not None and not future.done():
+                future.set_result(model)
+        for future in batch.values():
+            if not future.done():
+                future.set_exception(RowNotFound())
+                future.exception()
+
+    def info(self) -> dict:
+        """
+        Loader statistics
+        :return: dict with loads and batches
+        :rtype: dict
+        """
+        return dict(loads=self.loads, batches=self.batches)
@@ -0,0 +1,75 @@
+import inspect
+import operator
+import typing
+from typing import Any, Callable, Dict, NamedTuple, Tuple
+
+
+class Missing:
+    """Default value of field which has no default"""
+
+    def __repr__(self) -> str:
+        return 'MISSING'
+
+
+MISSING = Missing()
+
+
+class Field(NamedTuple):
+    name: str
+    type: Any
+    default: Any = MISSING
+
+    @property
+    def required(self) -> bool:
+        return self.default is MISSING
+
+
+class ModelSchema:
+    __slots__ = ('fields', 'names', 'positions', 'types', 'defaults', 'getter')
+
+    def __init__(self, fields: Tuple[Field, ...]) -> None:
+        """
+        Fields metadata of model, computed once per model class
+        :param fields: Fields in constructor arguments order
+        :type fields: Tuple[Field, ...]
+        """
+        self.fields: Tuple[Field, ...] = fields
+        self.names: Tuple[str, ...] = tuple(field.name for field in fields)
+        self.positions: Dict[str, int] = {name: position for position, name in enumerate(self.names)}
+        self.types: Tuple[Any, ...] = tuple(field.type for field in fields)
+        self.defaults: Dict[str, Any] = {field.name: field.default for field in fields if not field.required}
+        if len(self.names) > 1:
+            self.getter: Callable[[Any], tuple] = operator.attrgetter(*self.names)
+        else:
+            names = self.names
+            self.getter: Callable[[Any], tuple] = lambda model: tuple(getattr(model, name) for name in names)
+
+    def __len__(self) -> int:
+        return len(self.fields)
+
+    def __repr__(self) -> str:
+        return 'ModelSchema({})'.format(', '.join(self.names))
+
+    @classmethod
+    def from_init(cls, model: type) -> 'ModelSchema':
+        """
+        Build schema from positional arguments of model constructor, their annotations and defaults
+        :param model: Model class
+        :type model: type
+        :return: Schema of model
+        :rtype: ModelSchema
+        """
+        init = model.__init__
+        if init is object.__init__:
+            return cls(())
+        try:
+            hints = typing.get_type_hints(init)
+        except (NameError, TypeError):
+            hints = getattr(init, '__annotations__', {})
+        fields = []
+        for parameter in list(inspect.signature(init).parameters.values())[1:]:
+            if parameter.kind is not inspect.Parameter.POSITIONAL_OR_KEYWORD:
+                continue
+            default = MISSING if parameter.default is inspect.Parameter.empty else parameter.default
+            fields.append(Field(parameter.name, hints.get(parameter.name, Any), default))
+        return cls(tuple(fields))
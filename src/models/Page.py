@@ -0,0 +1,128 @@
+import asyncio
+from typing import TYPE_CHECKING, Any, AsyncIterator, Iterator, List, Optional, Sequence, Type
+
+from src.boot.IDatabase import IDatabase, keyset_query
+from src.tools.cursor import decode_cursor, encode_cursor
+
+if TYPE_CHECKING:
+    from src.models.IBaseModel import IBaseModel
+
+
+class Page:
+    def __init__(self, items: List['IBaseModel'], cursor: Optional[str], model: Type['IBaseModel'], db: IDatabase,
+                 table: str, key: Sequence[str], size: int, descending: bool, where: Optional[str],
+                 args: Sequence[Any], prefetch: bool) -> None:
+        """
+        Page of models found by keyset pagination, created by IBaseModel.page
+        :param items: Models of page
+        :type items: List[IBaseModel]
+        :param cursor: Cursor of next page, None on last page
+        :type cursor: Optional[str]
+        :param model: Model class
+        :type model: Type[IBaseModel]
+        :param db: IDatabase-like object
+        :type db: IDatabase
+        :param table: Table name
+        :type table: str
+        :param key: Columns of order
+        :type key: Sequence[str]
+        :param size: Models on page
+        :type size: int
+        :param descending: Order from greatest key
+        :type descending: bool
+        :param where: Filter condition with placeholders for args
+        :type where: Optional[str]
+        :param args: arguments for where placeholders
+        :type args: Sequence[Any]
+        :param prefetch: Fetch next page in background
+        :type prefetch: bool
+        """
+        self.items = items
+        self.cursor = cursor
+        self._model = model
+        self._db = db
+        self._table = table
+        self._key = tuple(key)
+        self._size = size
+        self._descending = descending
+        self._where = where
+        self._args = tuple(args)
+        self._prefetch = prefetch
+        self._next: Optional[asyncio.Future] = None
+
+    @classmethod
+    async def load(cls, model: Type['IBaseModel'], db: IDatabase, table: str, key: Sequence[str], size: int,
+                   cursor: Optional[str] = None, descending: bool = False, where: Optional[str] = None,
+                   args: Sequence[Any] = (), prefetch: bool = True) -> 'Page':
+        """
+        Fetch page after cursor, one row more than size is fetched to know if there is next page,
+        arguments are described in IBaseModel.page
+        :return: Page, without prefetch started
+        :rtype: Page
+        """
+        after = [] if cursor is None else decode_cursor(cursor, key)
+        query = keyset_query(table, key, descending, where, len(args), cursor is not None)
+        records = await db.fetchMany(query, *args, *after, size + 1, raw=True)
+        next_cursor = None
+        if len(records) > size:
+            last = records[size - 1]
+            next_cursor = encode_cursor(key, [last[column] for column in key])
+        return cls(model.from_records(records[:size]), next_cursor, model, db, table, key, size, descending, where,
+                   args, prefetch)
+
+    @property
+    def has_next(self) -> bool:
+        return self.cursor is not None
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __iter__(self) -> Iterator['IBaseModel']:
+        return iter(self.items)
+
+    def _load_next(self) -> asyncio.Future:
+        if self._next is None:
+            self._next = asyncio.ensure_future(self.load(self._model, self._db, self._table, self._key, self._size,
+                                                         self.cursor, self._descending, self._where, self._args,
+                                                         self._prefetch))
+            # error of page which is never awaited is not logged, next raises it
+            self._next.add_done_callback(lambda future: future.cancelled() or future.exception())
+        return self._next
+
+    def prefetch(self) -> None:
+        """
+        Start fetching next page in background, only one page ahead of consumer.
+        Inside transaction nothing is prefetched, as queries can not run concurrently on its connection
+        :return: None
+        :rtype: None
+        """
+        if self._prefetch and self.cursor is not None and not self._db.in_transaction():
+            self._load_next()
+
+    async def next(self) -> Optional['Page']:
+        """
+        Next page, prefetched one if it was started, None after last page
+        :return: Next page
+        :rtype: Optional[Page]
+        """
+        if self.cursor is None:
+            return None
+        page = await self._load_next()
+        page.prefetch()
+        return page
+
+    def close(self) -> None:
+        """
+        Cancel prefetch of next page, e.g. when consumer stops paging
+        :return: None
+        :rtype: None
+        """
+        if self._next is not None and not self._next.done():
+            self._next.cancel()
+
+    async def __aiter__(self) -> AsyncIterator['IBaseModel']:
+        page = self
+        while page is not None:
+            for item in page.items:
+                yield item
+            page = await page.next()
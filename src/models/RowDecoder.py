@@ -0,0 +1,213 @@
+import typing
+from collections.abc import Mapping
+from datetime import date, datetime
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Type
+
+from src.models.ModelSchema import Field
+from src.tools.exceptions import InvalidValue, NotEnoughData
+
+if TYPE_CHECKING:
+    from src.models.IBaseModel import IBaseModel
+
+_TRUE = frozenset(('t', 'true', 'y', 'yes', 'on', '1'))
+_FALSE = frozenset(('f', 'false', 'n', 'no', 'off', '0'))
+
+
+def _to_bool(value: Any) -> bool:
+    if isinstance(value, str):
+        text = value.strip().lower()
+        if text in _TRUE:
+            return True
+        if text in _FALSE:
+            return False
+    elif isinstance(value, int) and value in (0, 1):
+        return bool(value)
+    raise ValueError
+
+
+def _to_int(value: Any) -> int:
+    if isinstance(value, str):
+        return int(value.strip())
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, int) and not isinstance(value, bool):
+        return int(value)
+    raise ValueError
+
+
+def _to_float(value: Any) -> float:
+    if isinstance(value, str):
+        return float(value.strip())
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    raise ValueError
+
+
+def _to_datetime(value: Any) -> datetime:
+    if isinstance(value, str):
+        return datetime.fromisoformat(value.strip())
+    if isinstance(value, datetime):
+        return value
+    raise ValueError
+
+
+def _to_date(value: Any) -> date:
+    if isinstance(value, str):
+        return date.fromisoformat(value.strip())
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    raise ValueError
+
+
+def _to_str(value: Any) -> str:
+    if isinstance(value, str):
+        return value
+    raise ValueError
+
+
+COERCIONS: Dict[type, Callable[[Any], Any]] = {bool: _to_bool, int: _to_int, float: _to_float, str: _to_str,
+                                               datetime: _to_datetime, date: _to_date}
+
+
+def _field_type(field: Field) -> Tuple[Any, bool]:
+    """
+    Type of field without Optional and whether field can be None
+    """
+    field_type = field.type
+    nullable = field.default is None
+    if typing.get_origin(field_type) is typing.Union:
+        args = [arg for arg in typing.get_args(field_type) if arg is not type(None)]
+        nullable = nullable or len(args) < len(typing.get_args(field_type))
+        field_type = args[0] if len(args) == 1 else Any
+    return field_type, nullable
+
+
+def converter(field: Field) -> Optional[Callable[[Any], Any]]:
+    """
+    Function validating and coercing value of field, None if field type is not checked
+    :param field: Field of model schema
+    :type field: Field
+    :return: Converter raising InvalidValue, or None
+    :rtype: Optional[Callable[[Any], Any]]
+    """
+    field_type, nullable = _field_type(field)
+    coerce = COERCIONS.get(field_type)
+    if coerce is None:
+        return None
+    name = field.name
+    type_name = field_type.__name__
+
+    def convert(value: Any) -> Any:
+        if value is None or (nullable and value == '' and field_type is not str):
+            # empty text is NULL of optional field, e.g. empty CSV cell
+            if nullable:
+                return None
+        else:
+            try:
+                return coerce(value)
+            except (TypeError, ValueError):
+                pass
+        raise InvalidValue('field "{}" value {!r} is not {}'.format(name, value, type_name))
+    return convert
+
+
+class RowDecoder:
+    def __init__(self, model: Type['IBaseModel'], defaults: bool = False) -> None:
+        """
+        Decoder of rows to models, validating and coercing values to field types in one pass,
+        e.g. bool, int, float and datetime from text of CSV files. For every columns shape of rows
+        function constructing model is generated once, values already of field type are not converted
+        :param model: Model class, fields types are taken from its schema
+        :type model: Type[IBaseModel]
+        :param defaults: Fields missing in rows get default values instead of raising NotEnoughData
+        :type defaults: bool
+        """
+        self.model = model
+        self.defaults = defaults
+        self._converters = [converter(field) for field in model.__schema__.fields]
+        self._plans: Dict[Tuple[str, ...], Callable[[Sequence[Any]], 'IBaseModel']] = {}
+
+    def compile(self, columns: Tuple[str, ...]) -> Callable[[Sequence[Any]], 'IBaseModel']:
+        """
+        Function constructing model from values of row with given columns, generated once per columns,
+        if some fields are not in columns raises NotEnoughData with all of them
+        :param columns: Columns names of row
+        :type columns: Tuple[str, ...]
+        :return: Function taking row values in columns order
+        :rtype: Callable[[Sequence[Any]], IBaseModel]
+        """
+        plan = self._plans.get(columns)
+        if plan is not None:
+            return plan
+        positions = {}
+        for position, column in enumerate(columns):
+            positions.setdefault(column, position)
+        fields = self.model.__schema__.fields
+        missing = [field.name for field in fields
+                   if field.name not in positions and (field.required or not self.defaults)]
+        if missing:
+            raise NotEnoughData(missing)
+        namespace: Dict[str, Any] = {'model': self.model}
+        args = []
+        for index, (field, convert) in enumerate(zip(fields, self._converters)):
+            if field.name not in positions:
+                namespace['_d{}'.format(index)] = field.default
+                args.append('_d{}'.format(index))
+                continue
+            value = 'row[{}]'.format(positions[field.name])
+            if convert is None:
+                args.append(value)
+                continue
+            namespace['_t{}'.format(index)] = _field_type(field)[0]
+            namespace['_c{}'.format(index)] = convert
+            # values of exact field type skip converter call
+            args.append('(_v if (_v := {0}).__class__ is _t{1} else _c{1}(_v))'.format(value, index))
+        source = 'def decode(row):\n    return model({})\n'.format(', '.join(args))
+        exec(compile(source, '<{} decoder>'.format(self.model.__name__), 'exec'), namespace)
+        plan = namespace['decode']
+        self._plans[columns] = plan
+        return plan
+
+    def decode(self, row: Any) -> 'IBaseModel':
+        """
+        Construct model from one row
+        :param row: Tuple of (name, value) pairs, mapping, e.g. csv.DictReader row, or asyncpg.Record
+        :type row: Any
+        :return: Model from row
+        :rtype: IBaseModel
+        """
+        if isinstance(row, tuple):
+            return self.compile(tuple(pair[0] for pair in row))([pair[1] for pair in row])
+        if isinstance(row, Mapping):
+            return self.compile(tuple(row))(tuple(row.values()))
+        return self.compile(tuple(row.keys()))(row)
+
+    def decode_many(self, rows: Iterable[Any]) -> List['IBaseModel']:
+        """
+        Construct models from rows, records are assumed to share columns of first one,
+        other rows are checked for columns change
+        :param rows: Tuples of (name, value) pairs, mappings or records of one query
+        :type rows: Iterable[Any]
+        :return: Models from rows
+        :rtype: List[IBaseModel]
+        """
+        out = []
+        columns: Optional[Tuple[str, ...]] = None
+        plan: Optional[Callable[[Sequence[Any]], 'IBaseModel']] = None
+        record_plan: Optional[Callable[[Sequence[Any]], 'IBaseModel']] = None
+        for row in rows:
+            if isinstance(row, tuple):
+                shape, values = tuple(pair[0] for pair in row), [pair[1] for pair in row]
+            elif isinstance(row, Mapping):
+                shape, values = tuple(row), tuple(row.values())
+            else:
+                if record_plan is None:
+                    record_plan = self.compile(tuple(row.keys()))
+                out.append(record_plan(row))
+                continue
+            if shape != columns:
+                columns, plan = shape, self.compile(shape)
+            out.append(plan(values))
+        return out
@@ -0,0 +1,10 @@
+from src.models.ModelLoader import ModelLoader
+from src.models.UserModel import UserModel
+
+
+class UserLoader(ModelLoader):
+    model = UserModel
+    key = 'id'
+
+    async def get_by_id(self, id: int) -> UserModel:
+        return await self.load(id)
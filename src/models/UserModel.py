@@ -1,12 +1,15 @@
 import abc
 from datetime import datetime
-from typing import List, Tuple, Union
+from typing import Tuple, Union
 
 from src.models.IBaseModel import IBaseModel
+from src.models.ModelBatch import ModelBatch
 from src.tools.exceptions import NotEnoughData
 
 
 class IUserModel(IBaseModel, abc.ABC):
+    __slots__ = ()
+
     @abc.abstractmethod
     def __init__(self, username: str = '', password: str = '', email: str = '', active: bool = True) -> None:
         """
@@ -27,31 +30,49 @@ class IUserModel(IBaseModel, abc.ABC):
 
 
 class UserModel(IUserModel):
+    __table__ = 'users'
+
     def __init__(self, id: int = -1, username: str = '', password: str = '', email: str = '',
                  active: bool = True) -> None:
-        super().__init__(username, password, email, active)
+        # explicit base call, so SlottedUserModel can reuse constructor
+        IUserModel.__init__(self, username, password, email, active)
         self.id = id
 
     @classmethod
     def from_row(cls, data: Tuple[Tuple[str, Union[str, bool, datetime, int]]]) -> 'IBaseModel':
-        fields: List[str] = list(UserModel().__dict__.keys())
+        if not isinstance(data, tuple):
+            return cls.from_record(data)
+        schema = cls.__schema__
+        fields = schema.positions
         data_dict = {}
-        for field in data:
-            key: str = field[0]
-            value: Union[str, bool, datetime, int] = field[1]
-            if key in fields:
+        for key, value in data:
+            if key in fields and key not in data_dict:
                 data_dict[key] = value
-                fields.remove(key)
-        if len(fields) > 0:
-            raise NotEnoughData(fields)
+        if len(data_dict) < len(fields):
+            raise NotEnoughData([field for field in schema.names if field not in data_dict])
         return cls(**data_dict)
 
     def to_dict(self) -> dict:
-        return self.__dict__
+        schema = self.__schema__
+        return dict(zip(schema.names, schema.getter(self)))
 
     def to_row(self) -> Tuple[Tuple[str, Union[str, bool, datetime, int]]]:
-        out = tuple()
-        fields: List[str] = list(UserModel().__dict__.keys())
-        for field in fields:
-            out += ((field, self.__getattribute__(field)),)
-        return out
+        schema = self.__schema__
+        return tuple(zip(schema.names, schema.getter(self)))
+
+
+class SlottedUserModel(IUserModel):
+    """
+    UserModel storing fields in __slots__ instead of per-instance __dict__, it is not subclass of UserModel
+    """
+    __slots__ = ('id', 'active', 'email', 'password', 'username')
+    __table__ = UserModel.__table__
+
+    __init__ = UserModel.__init__
+    from_row = classmethod(UserModel.from_row.__func__)
+    to_dict = UserModel.to_dict
+    to_row = UserModel.to_row
+
+
+class UserBatch(ModelBatch):
+    model = UserModel
@@ -0,0 +1,116 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+class LRUCache:
+    def __init__(self, maxsize: int = 128, ttl: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        """
+        Bounded mapping which evicts least recently used entries
+        :param maxsize: Maximum number of entries, 0 disables caching
+        :type maxsize: int
+        :param ttl: Seconds after which entry expires, None to keep entries until evicted
+        :type ttl: Optional[float]
+        :param clock: Time source for ttl
+        :type clock: Callable[[], float]
+        """
+        assert maxsize >= 0, 'LRUCache maxsize must not be negative'
+        assert ttl is None or ttl > 0, 'LRUCache ttl must be positive'
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._clock = clock
+        self._entries: 'OrderedDict[Hashable, Any]' = OrderedDict()
+        self._expires: dict = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries and not self._expired(key)
+
+    def _expired(self, key: Hashable) -> bool:
+        if self.ttl is None or self._expires[key] > self._clock():
+            return False
+        del self._entries[key]
+        del self._expires[key]
+        self.expirations += 1
+        return True
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Optional[Any]:
+        """
+        Get value by key and mark it as recently used
+        :param key: Entry key
+        :type key: Hashable
+        :param default: Value returned when key is not cached or expired
+        :type default: Optional[Any]
+        :return: Cached value or default
+        :rtype: Optional[Any]
+        """
+        try:
+            value = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        if self._expired(key):
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """
+        Store value, evicting least recently used entries over maxsize
+        :param key: Entry key
+        :type key: Hashable
+        :param value: Entry value
+        :type value: Any
+        :return: None
+        :rtype: None
+        """
+        if self.maxsize == 0:
+            return
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if self.ttl is not None:
+            self._expires[key] = self._clock() + self.ttl
+        while len(self._entries) > self.maxsize:
+            evicted, _ = self._entries.popitem(last=False)
+            self._expires.pop(evicted, None)
+            self.evictions += 1
+
+    def pop(self, key: Hashable, default: Optional[Any] = None) -> Optional[Any]:
+        """
+        Remove entry without counting it as eviction
+        :param key: Entry key
+        :type key: Hashable
+        :param default: Value returned when key is not cached
+        :type default: Optional[Any]
+        :return: Removed value or default
+        :rtype: Optional[Any]
+        """
+        self._expires.pop(key, None)
+        return self._entries.pop(key, default)
+
+    def clear(self) -> None:
+        """
+        Remove all entries, counters are kept
+        :return: None
+        :rtype: None
+        """
+        self._entries.clear()
+        self._expires.clear()
+
+    def info(self) -> dict:
+        """
+        Cache statistics
+        :return: dict with hits, misses, evictions, expirations, size and maxsize
+        :rtype: dict
+        """
+        return dict(hits=self.hits, misses=self.misses, evictions=self.evictions, expirations=self.expirations,
+                    size=len(self._entries), maxsize=self.maxsize)
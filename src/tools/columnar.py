@@ -0,0 +1,91 @@
+from datetime import date, datetime, timezone
+from typing import TYPE_CHECKING, Any, Dict, Optional, Sequence
+
+if TYPE_CHECKING:
+    import numpy
+
+# numpy dtype of postgres types, other types are kept in object arrays
+POSTGRES_DTYPES = dict(int2='int16', int4='int32', int8='int64', oid='int64', float4='float32', float8='float64',
+                       numeric='float64', bool='bool', timestamp='datetime64[us]', timestamptz='datetime64[us]',
+                       date='datetime64[D]')
+# dtype used when integer or bool column contains NULL
+NULLABLE_DTYPES = dict(int16='float64', int32='float64', int64='float64', bool='object')
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError('numpy is required for columnar results, install it with: pip install numpy') from None
+    return numpy
+
+
+def infer_dtype(values: Sequence[Any]) -> str:
+    """
+    Dtype of column from its python values, used when column type is not known
+    :param values: Column values
+    :type values: Sequence[Any]
+    :return: numpy dtype name
+    :rtype: str
+    """
+    kinds = {type(value) for value in values if value is not None}
+    if kinds == {bool}:
+        return 'bool'
+    if kinds == {int}:
+        return 'int64'
+    if kinds and kinds <= {int, float}:
+        return 'float64'
+    if kinds == {datetime}:
+        return 'datetime64[us]'
+    if kinds == {date}:
+        return 'datetime64[D]'
+    return 'object'
+
+
+def to_array(values: Sequence[Any], dtype: str) -> 'numpy.ndarray':
+    """
+    Convert column values to numpy array, NULL becomes NaN in numeric and NaT in timestamp arrays
+    :param values: Column values
+    :type values: Sequence[Any]
+    :param dtype: numpy dtype name, integer and bool columns with NULL are widened by NULLABLE_DTYPES
+    :type dtype: str
+    :return: Column array
+    :rtype: numpy.ndarray
+    """
+    numpy = _numpy()
+    if dtype == 'object':
+        array = numpy.empty(len(values), dtype=object)
+        array[:] = values
+        return array
+    if dtype in NULLABLE_DTYPES and None in values:
+        return to_array(values, NULLABLE_DTYPES[dtype])
+    if dtype.startswith('float'):
+        return numpy.array([numpy.nan if value is None else value for value in values], dtype=dtype)
+    if dtype == 'datetime64[us]':
+        # aware timestamps are converted to naive UTC, numpy has no time zones
+        values = [value.astimezone(timezone.utc).replace(tzinfo=None)
+                  if value is not None and value.tzinfo is not None else value for value in values]
+    return numpy.array(values, dtype=dtype)
+
+
+def to_columns(names: Sequence[str], records: Sequence[Any],
+               dtypes: Optional[Sequence[Optional[str]]] = None) -> Dict[str, 'numpy.ndarray']:
+    """
+    Transpose records to one numpy array per column
+    :param names: Columns names, read once from result description
+    :type names: Sequence[str]
+    :param records: Records indexed by column position, e.g. asyncpg.Record
+    :type records: Sequence[Any]
+    :param dtypes: numpy dtype of every column, None to infer it from values
+    :type dtypes: Optional[Sequence[Optional[str]]]
+    :return: Column name to array
+    :rtype: Dict[str, numpy.ndarray]
+    """
+    if len(set(names)) < len(names):
+        raise ValueError('columnar result needs unique column names, got {}'.format(', '.join(names)))
+    columns = {}
+    for position, name in enumerate(names):
+        values = [record[position] for record in records]
+        dtype = dtypes[position] if dtypes is not None else None
+        columns[name] = to_array(values, dtype or infer_dtype(values))
+    return columns
@@ -0,0 +1,68 @@
+import base64
+import json
+from datetime import date, datetime, time
+from decimal import Decimal, InvalidOperation
+from typing import Any, List, Sequence
+from uuid import UUID
+
+from src.tools.exceptions import InvalidCursor
+
+
+# datetime is date subclass, so it is checked first
+_ENCODERS = ((datetime, 'datetime', datetime.isoformat), (date, 'date', date.isoformat),
+             (time, 'time', time.isoformat), (UUID, 'uuid', str), (Decimal, 'decimal', str))
+_DECODERS = {'datetime': datetime.fromisoformat, 'date': date.fromisoformat, 'time': time.fromisoformat,
+             'uuid': UUID, 'decimal': Decimal}
+
+
+def _encode_value(column: str, value: Any) -> dict:
+    for value_type, name, encode in _ENCODERS:
+        if isinstance(value, value_type):
+            return {name: encode(value)}
+    raise TypeError('{} value of {} column can not be stored in cursor'.format(type(value).__name__, column))
+
+
+def _decode_value(value: dict) -> Any:
+    if len(value) == 1:
+        name, encoded = next(iter(value.items()))
+        if name in _DECODERS:
+            return _DECODERS[name](encoded)
+    return value
+
+
+def encode_cursor(key: Sequence[str], values: Sequence[Any]) -> str:
+    """
+    Opaque page cursor holding key values of last row, url safe
+    :param key: Columns of order
+    :type key: Sequence[str]
+    :param values: Values of key columns, JSON types, datetime, date, time, UUID or Decimal
+    :type values: Sequence[Any]
+    :return: Cursor
+    :rtype: str
+    """
+    assert len(key) == len(values), 'every key column must have value'
+    encoded = [value if value is None or isinstance(value, (str, int, float)) else _encode_value(column, value)
+               for column, value in zip(key, values)]
+    data = json.dumps([list(key), encoded], separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, key: Sequence[str]) -> List[Any]:
+    """
+    Key values from cursor made by encode_cursor, raises InvalidCursor if cursor is malformed
+    or was made for other key
+    :param cursor: Cursor
+    :type cursor: str
+    :param key: Columns of order
+    :type key: Sequence[str]
+    :return: Values of key columns
+    :rtype: List[Any]
+    """
+    try:
+        data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        names, values = json.loads(data, object_hook=_decode_value)
+    except (TypeError, ValueError, InvalidOperation):
+        raise InvalidCursor('cursor is malformed') from None
+    if names != list(key) or not isinstance(values, list) or len(values) != len(key):
+        raise InvalidCursor('cursor was not made for order by {}'.format(', '.join(key)))
+    return values
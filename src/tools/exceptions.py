@@ -18,3 +18,27 @@ class WrongTableNameQuery(Error):
 
 class NotEnoughData(Error):
     """Raised when deserializing db row was not successful due to some fields has no values"""
+
+
+class PoolOverloaded(Error):
+    """Raised when database call is rejected because connection wait queue is full"""
+
+
+class AcquireTimeout(Error):
+    """Raised when database connection was not acquired in time"""
+
+
+class RetriesExhausted(Error):
+    """Raised when database call failed with transient error and retry attempts or retry budget ran out"""
+
+
+class CircuitOpen(Error):
+    """Raised without calling database when circuit breaker is open after consecutive connection failures"""
+
+
+class InvalidValue(Error):
+    """Raised when deserializing db row was not successful due to some field value can not be converted to its type"""
+
+
+class InvalidCursor(Error):
+    """Raised when page cursor is malformed or was created for other order"""